@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class AnnouncementsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'announcements'
+    
+    def ready(self):
+        from backend import images
+        from . import signals  # noqa: F401
+        images.register(self.get_model('Announcement'), 'media')
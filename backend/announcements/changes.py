@@ -0,0 +1,66 @@
+"""
+Delta sync for announcement clients.
+
+Every write to an announcement records it in AnnouncementChange (see
+signals.py); a client keeps the id of the last change it has seen as its
+token and asks only for what changed after it. Like counts are not
+logged, as that would put a write back on the sharded like path; they
+arrive over the events stream or with the next change to the row.
+
+Ids are taken at insert but become visible at commit, so a transaction
+can commit a lower id after a reader has moved its token past it. Reads
+therefore stop at the first row newer than ANNOUNCEMENT_CHANGES_LAG_SECONDS,
+which must outlast any write transaction.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import AnnouncementChange
+
+PAGE_SIZE = 100
+
+
+def record(announcement_ids, deleted=False):
+    """Log a change to each announcement, replacing its previous log row."""
+    announcement_ids = list(announcement_ids)
+    if not announcement_ids:
+        return
+    AnnouncementChange.objects.filter(announcement_id__in=announcement_ids).delete()
+    AnnouncementChange.objects.bulk_create(
+        AnnouncementChange(announcement_id=announcement_id, deleted=deleted)
+        for announcement_id in announcement_ids
+    )
+
+
+def record_announcement(announcement, was_published=False):
+    if announcement.is_published:
+        record([announcement.id])
+    elif was_published:
+        # An unpublished announcement disappears from clients just like a deleted one;
+        # a draft that was never published was never theirs to drop
+        record([announcement.id], deleted=True)
+
+
+def changes_since(token, limit=None):
+    """
+    (changed announcement ids in change order, tombstoned ids, next token,
+    whether more changes are waiting, including rows still inside the lag).
+    """
+    limit = limit or PAGE_SIZE
+    log = list(
+        AnnouncementChange.objects.filter(id__gt=token).order_by('id').values_list(
+            'id', 'announcement_id', 'deleted', 'changed_at'
+        )[:limit + 1]
+    )
+    # Rows this recent may still have uncommitted neighbours below them
+    cutoff = timezone.now() - timedelta(seconds=settings.ANNOUNCEMENT_CHANGES_LAG_SECONDS)
+    settled = next((index for index, row in enumerate(log) if row[3] > cutoff), len(log))
+    page = log[:min(settled, limit)]
+    has_more = len(log) > len(page)
+    log = page
+    changed = [announcement_id for _, announcement_id, deleted, _ in log if not deleted]
+    deleted = [announcement_id for _, announcement_id, deleted, _ in log if deleted]
+    next_token = log[-1][0] if log else token
+    return changed, deleted, next_token, has_more
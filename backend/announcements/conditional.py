@@ -0,0 +1,81 @@
+import hashlib
+from calendar import timegm
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+from . import stats
+from .fastpath import FEED_VALUES
+from .models import Announcement
+
+# The author has no timestamp of its own, so its embedded columns go into the detail ETag
+AUTHOR_VALUES = [name for name in FEED_VALUES if name.startswith('author__')]
+
+
+def make_etag(*parts):
+    digest = hashlib.md5('|'.join(str(part) for part in parts).encode(), usedforsecurity=False).hexdigest()
+    # Weak: equal tags mean the same data, not byte-identical bodies
+    return f'W/"{digest}"'
+
+
+def representation(request):
+    # JSON and MessagePack bodies of the same data must not share a validator
+    return getattr(request, 'accepted_media_type', '')
+
+
+def latest(*stamps):
+    stamps = [stamp for stamp in stamps if stamp is not None]
+    return max(stamps) if stamps else None
+
+
+def feed_validators(request, queryset):
+    """
+    ETag and Last-Modified for a filtered feed queryset: one aggregate over
+    the matching rows plus the stats stamp, which moves on every like,
+    comment, hashtag, category or author profile change that does not
+    touch updated_at.
+    """
+    version = queryset.order_by().aggregate(last=Max('updated_at'), total=Count('id'))
+    changed = stats.last_changed()
+    etag = make_etag(
+        request.get_full_path(), representation(request), version['total'], version['last'], changed
+    )
+    return etag, latest(version['last'], changed)
+
+
+def announcement_validators(request, pk):
+    row = Announcement.objects.filter(pk=pk).with_like_total().annotate(
+        comment_total=Count('comments'),
+        comment_last=Max('comments__updated_at'),
+        lists_changed=stats.lists_changed(),
+    ).values(
+        'updated_at', 'like_total', 'comment_total', 'comment_last', 'lists_changed', *AUTHOR_VALUES
+    ).first()
+    if row is None:
+        return None, None
+    etag = make_etag(
+        request.get_full_path(), representation(request), row['updated_at'], row['like_total'],
+        row['comment_total'], row['comment_last'], row['lists_changed'], *(row[name] for name in AUTHOR_VALUES)
+    )
+    return etag, latest(row['updated_at'], row['comment_last'], row['lists_changed'])
+
+
+def not_modified(request, etag, last_modified):
+    """Return a 304 response if the client's validators still match, else None."""
+    if etag is None:
+        return None
+    timestamp = timegm(last_modified.utctimetuple()) if last_modified else None
+    return get_conditional_response(request, etag=etag, last_modified=timestamp)
+
+
+def set_validators(response, etag, last_modified):
+    if etag is None:
+        return response
+    response.headers['ETag'] = etag
+    if last_modified:
+        response.headers['Last-Modified'] = http_date(timegm(last_modified.utctimetuple()))
+    # Let clients keep the body but always revalidate
+    patch_cache_control(response, no_cache=True)
+    patch_vary_headers(response, ['Accept'])
+    return response
@@ -0,0 +1,58 @@
+import random
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import Announcement, AnnouncementLikeShard
+
+
+def bump_likes(announcement_id, delta):
+    """Add delta to one randomly chosen like shard of the announcement."""
+    shard = random.randrange(settings.LIKE_COUNTER_SHARDS)
+    shards = AnnouncementLikeShard.objects.filter(announcement_id=announcement_id, shard=shard)
+    if shards.update(count=F('count') + delta):
+        return
+    try:
+        with transaction.atomic():
+            AnnouncementLikeShard.objects.create(announcement_id=announcement_id, shard=shard, count=delta)
+    except IntegrityError:
+        # Another writer created the shard first
+        shards.update(count=F('count') + delta)
+
+
+def like_total(announcement_id):
+    return Announcement.objects.filter(id=announcement_id).with_like_total().values_list(
+        'like_total', flat=True
+    ).first()
+
+
+def group_by_value(pairs):
+    groups = defaultdict(list)
+    for key, value in pairs:
+        groups[value].append(key)
+    return groups
+
+
+@transaction.atomic
+def rollup_like_shards():
+    """
+    Fold pending shard counts into Announcement.likes. Shards are decremented
+    by the amount observed rather than zeroed, so likes that land while the
+    roll-up runs are kept for the next pass. Returns the number of
+    announcements updated.
+    """
+    pending = list(AnnouncementLikeShard.objects.exclude(count=0).values_list('id', 'announcement_id', 'count'))
+    totals = defaultdict(int)
+    for _, announcement_id, count in pending:
+        totals[announcement_id] += count
+    
+    # One UPDATE per distinct delta instead of one per row
+    for total, announcement_ids in group_by_value(totals.items()).items():
+        if total:
+            Announcement.objects.filter(id__in=announcement_ids).update(likes=F('likes') + total)
+    for count, shard_ids in group_by_value((id, count) for id, _, count in pending).items():
+        AnnouncementLikeShard.objects.filter(id__in=shard_ids).update(count=F('count') - count)
+    
+    return len(totals)
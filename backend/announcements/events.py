@@ -0,0 +1,129 @@
+"""
+In-process fan-out of live announcement events to Server-Sent Events streams.
+
+Writers call publish() (from any thread, after their transaction commits);
+each connected stream owns a bounded asyncio.Queue on the server's event
+loop, so an idle connection costs one suspended coroutine. Recent events
+are kept in a ring buffer so a reconnecting client that sends
+Last-Event-ID misses nothing; a client that fell further behind, whose
+queue overflowed or who connected to a restarted server gets a ``reset``
+event and should refetch the feed.
+
+The broadcaster lives in one process: run the ASGI app as a single
+process (e.g. ``uvicorn backend.asgi:application``) for every client to
+see every event.
+"""
+import asyncio
+import itertools
+import json
+import threading
+import time
+from collections import deque
+
+from django.db import transaction
+
+HEARTBEAT_SECONDS = 15
+QUEUE_SIZE = 256
+HISTORY_SIZE = 1024
+
+
+class Subscriber:
+    def __init__(self, loop):
+        self.loop = loop
+        self.queue = asyncio.Queue(QUEUE_SIZE)
+        self.overflowed = False
+
+    def deliver(self, event):
+        # Runs on the subscriber's loop
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+            self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+
+class Broadcaster:
+    def __init__(self, history_size=HISTORY_SIZE):
+        self.lock = threading.Lock()
+        self.subscribers = set()
+        self.history = deque(maxlen=history_size)
+        self.ids = itertools.count(1)
+        # Event ids are "<epoch>-<n>" so ids from before a restart are recognised
+        self.epoch = format(time.time_ns() // 1000000, 'x')
+
+    def publish(self, name, data):
+        with self.lock:
+            event = (next(self.ids), name, data)
+            self.history.append(event)
+            subscribers = list(self.subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.loop.call_soon_threadsafe(subscriber.deliver, event)
+            except RuntimeError:
+                # Loop already closed; the stream is gone
+                self.unsubscribe(subscriber)
+        return event
+
+    def event_id(self, event):
+        return f'{self.epoch}-{event[0]}'
+
+    def subscribe(self, last_event_id=None):
+        """A new subscriber plus the events it missed, or None if they are no longer buffered."""
+        subscriber = Subscriber(asyncio.get_running_loop())
+        with self.lock:
+            self.subscribers.add(subscriber)
+            if not last_event_id:
+                return subscriber, []
+            epoch, _, number = last_event_id.partition('-')
+            newest = self.history[-1][0] if self.history else 0
+            oldest = self.history[0][0] if self.history else 1
+            if epoch != self.epoch or not number.isdigit() or not oldest - 1 <= int(number) <= newest:
+                return subscriber, None
+            return subscriber, [event for event in self.history if event[0] > int(number)]
+
+    def unsubscribe(self, subscriber):
+        with self.lock:
+            self.subscribers.discard(subscriber)
+
+
+broadcaster = Broadcaster()
+
+
+def publish(name, data):
+    """Queue an event for every stream once the current transaction commits."""
+    transaction.on_commit(lambda: broadcaster.publish(name, data))
+
+
+def format_event(source, event):
+    _, name, data = event
+    return f'id: {source.event_id(event)}\nevent: {name}\ndata: {json.dumps(data, separators=(",", ":"))}\n\n'
+
+
+async def stream(last_event_id=None, heartbeat=HEARTBEAT_SECONDS, source=None):
+    """Server-Sent Events body for one client."""
+    source = source or broadcaster
+    subscriber, backlog = source.subscribe(last_event_id)
+    try:
+        # Tell EventSource to wait 3s before reconnecting
+        yield 'retry: 3000\n\n'
+        if backlog is None:
+            yield 'event: reset\ndata: {}\n\n'
+            backlog = []
+        for event in backlog:
+            yield format_event(source, event)
+        while True:
+            try:
+                event = await asyncio.wait_for(subscriber.queue.get(), heartbeat)
+            except asyncio.TimeoutError:
+                # Comment line: keeps proxies from closing an idle connection
+                yield ': keep-alive\n\n'
+                continue
+            if event is None:
+                yield 'event: reset\ndata: {}\n\n'
+                return
+            yield format_event(source, event)
+    finally:
+        source.unsubscribe(subscriber)
@@ -0,0 +1,104 @@
+"""
+values()-based rendering of the announcement feed.
+
+Produces the same data as AnnouncementListSerializer for the default
+fieldset, without instantiating models or serializers per row.
+"""
+from backend.fastpath import file_url, file_variants, format_date, format_datetime, group_rows
+from users.models import User
+from .models import Announcement
+
+FEED_VALUES = [
+    'id', 'title', 'description', 'timestamp', 'updated_at', 'like_total', 'media', 'media_variants',
+    'is_pinned', 'is_published', 'num_comments',
+    'category_id', 'category__name', 'category__slug', 'category__description',
+    'category__color', 'category__is_active',
+    'author_id', 'author__username', 'author__email', 'author__first_name', 'author__last_name',
+    'author__phone', 'author__location', 'author__department', 'author__position',
+    'author__join_date', 'author__bio', 'author__avatar', 'author__avatar_variants', 'author__role',
+]
+
+
+def feed_values(queryset):
+    """The feed queryset as flat values() rows, related columns joined in."""
+    return queryset.with_like_total().with_comment_count().values(*FEED_VALUES)
+
+
+def render_author(row, request):
+    # Mirrors users.serializers.UserSerializer
+    return {
+        'id': row['author_id'],
+        'username': row['author__username'],
+        'email': row['author__email'],
+        'firstName': row['author__first_name'],
+        'lastName': row['author__last_name'],
+        'phone': row['author__phone'],
+        'location': row['author__location'],
+        'department': row['author__department'],
+        'position': row['author__position'],
+        'join_date': format_date(row['author__join_date']),
+        'bio': row['author__bio'],
+        'avatar': file_url(User, 'avatar', row['author__avatar'], request),
+        'avatar_variants': file_variants(
+            User, 'avatar', row['author__avatar'], row['author__avatar_variants'], request
+        ),
+        'role': row['author__role'],
+    }
+
+
+def render_category(row):
+    # Mirrors CategorySerializer
+    if row['category_id'] is None:
+        return None
+    return {
+        'id': row['category_id'],
+        'name': row['category__name'],
+        'slug': row['category__slug'],
+        'description': row['category__description'],
+        'color': row['category__color'],
+        'is_active': row['category__is_active'],
+    }
+
+
+def hashtags_by_announcement(announcement_ids):
+    # Same order as the hashtags prefetch (Hashtag.Meta.ordering)
+    rows = Announcement.hashtags.through.objects.filter(
+        announcement_id__in=announcement_ids
+    ).order_by('-hashtag__usage_count', 'hashtag__name').values(
+        'announcement_id', 'hashtag_id', 'hashtag__name', 'hashtag__slug', 'hashtag__usage_count'
+    )
+    return group_rows(rows, 'announcement_id')
+
+
+def render_feed(rows, request):
+    rows = list(rows)
+    hashtags = hashtags_by_announcement([row['id'] for row in rows])
+    data = []
+    for row in rows:
+        tags = hashtags.get(row['id'], [])
+        data.append({
+            'id': row['id'],
+            'title': row['title'],
+            'description': row['description'],
+            'category': render_category(row),
+            'author': render_author(row, request),
+            'timestamp': format_datetime(row['timestamp']),
+            'updated_at': format_datetime(row['updated_at']),
+            'likes': row['like_total'],
+            'media': file_url(Announcement, 'media', row['media'], request),
+            'media_variants': file_variants(Announcement, 'media', row['media'], row['media_variants'], request),
+            'hashtags': [
+                {
+                    'id': tag['hashtag_id'],
+                    'name': tag['hashtag__name'],
+                    'slug': tag['hashtag__slug'],
+                    'usage_count': tag['hashtag__usage_count'],
+                }
+                for tag in tags
+            ],
+            'hashtag_list': [tag['hashtag__name'] for tag in tags],
+            'comments_count': row['num_comments'],
+            'is_pinned': row['is_pinned'],
+            'is_published': row['is_published'],
+        })
+    return data
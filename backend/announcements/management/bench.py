@@ -0,0 +1,49 @@
+"""
+Shared setup for the bench_* management commands: a rolled-back
+transaction to seed into, the benchmark author and a seeded feed.
+"""
+from contextlib import contextmanager
+
+from django.db import transaction
+
+from announcements.models import Announcement, Comment
+from announcements.serializers import resolve_hashtags
+from users.models import User
+
+
+class Rollback(Exception):
+    pass
+
+
+@contextmanager
+def rolled_back():
+    """Run the block in a transaction that is rolled back afterwards."""
+    try:
+        with transaction.atomic():
+            yield
+            raise Rollback
+    except Rollback:
+        pass
+
+
+def create_author():
+    return User.objects.create_user(
+        username='bench-author', email='bench-author@example.invalid',
+        password='bench-password', first_name='Bench', last_name='Author'
+    )
+
+
+def seed_feed(author, rows):
+    """rows announcements by author, each with one to five tags and a comment."""
+    tags = resolve_hashtags([f'bench{i}' for i in range(5)])
+    announcements = Announcement.objects.bulk_create(
+        Announcement(title=f'Benchmark post {i}', description='Benchmark body ' * 20, author=author)
+        for i in range(rows)
+    )
+    for i, announcement in enumerate(announcements):
+        announcement.hashtags.add(*tags[:i % 5 + 1])
+    Comment.objects.bulk_create(
+        Comment(announcement=announcement, author=author, content='Benchmark')
+        for announcement in announcements
+    )
+    return announcements
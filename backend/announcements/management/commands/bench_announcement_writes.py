@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from announcements.management.bench import create_author, rolled_back
+from announcements.serializers import AnnouncementCreateUpdateSerializer
+
+
+class Command(BaseCommand):
+    help = 'Measure queries and latency of the announcement write path as the tag count grows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tags', type=int, nargs='+', default=[0, 1, 5, 15, 30])
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'tags':>6} {'queries':>8} {'ms/post':>9}")
+        for tag_count in options['tags']:
+            queries, elapsed = self.measure(tag_count, options['repeat'])
+            self.stdout.write(f'{tag_count:>6} {queries:>8} {elapsed * 1000:>9.2f}')
+
+    def measure(self, tag_count, repeat):
+        result = {}
+        with rolled_back():
+            author = create_author()
+            timings = []
+            for run in range(repeat):
+                data = {
+                    'title': f'Benchmark post {run}',
+                    'description': 'Benchmark body',
+                    # Half of the tags already exist after the first run
+                    'hashtag_names': [f'bench{run % 2}-{i}' for i in range(tag_count)],
+                }
+                serializer = AnnouncementCreateUpdateSerializer(data=data)
+                serializer.is_valid(raise_exception=True)
+                with CaptureQueriesContext(connection) as ctx:
+                    start = time.perf_counter()
+                    serializer.save(author=author)
+                    timings.append(time.perf_counter() - start)
+                result['queries'] = len(ctx.captured_queries)
+            result['elapsed'] = sorted(timings)[len(timings) // 2]
+        return result['queries'], result['elapsed']
@@ -0,0 +1,92 @@
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from rest_framework.test import APIRequestFactory
+
+from announcements.management.bench import create_author, rolled_back, seed_feed
+from announcements.views import AnnouncementListCreateView
+from colleges.models import College, Department
+from colleges.views import CollegeListCreateView
+from leaders.models import Leader, LeaderAchievement
+from leaders.views import LeaderListCreateView
+
+
+ENDPOINTS = [
+    ('announcements', AnnouncementListCreateView, '/api/announcements/'),
+    ('leaders', LeaderListCreateView, '/api/leaders/'),
+    ('colleges', CollegeListCreateView, '/api/colleges/'),
+]
+
+
+class Command(BaseCommand):
+    help = 'Compare the values() fast path of the hot list endpoints with the ModelSerializer path'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=50, help='Rows seeded per endpoint')
+        parser.add_argument('--requests', type=int, default=50)
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{'endpoint':<14} {'path':<11} {'req/s':>9} {'KiB/row':>9} {'identical':>10}"
+        )
+        with rolled_back():
+            self.seed(options['rows'])
+            for name, view_class, path in ENDPOINTS:
+                self.compare(name, view_class, path, options)
+
+    def seed(self, rows):
+        seed_feed(create_author(), rows)
+        colleges = []
+        for i in range(rows):
+            college = College.objects.create(name=f'Bench college {i}', leader_name='Dean')
+            Department.objects.bulk_create(
+                Department(college=college, name=f'Dept {j}', leader_name='Head',
+                           email='dept@example.invalid', phone='0')
+                for j in range(3)
+            )
+            colleges.append(college)
+        for i in range(rows):
+            leader = Leader.objects.create(
+                name=f'Bench leader {i}', position='Minister', department='Bench',
+                college=colleges[i], description='Benchmark', email='leader@example.invalid',
+                phone='0', location='Campus'
+            )
+            LeaderAchievement.objects.bulk_create(
+                LeaderAchievement(leader=leader, achievement=f'Achievement {j}', order=j)
+                for j in range(3)
+            )
+
+    def compare(self, name, view_class, path, options):
+        host = next((h for h in settings.ALLOWED_HOSTS if h and h != '*'), 'localhost').lstrip('.')
+        request_factory = APIRequestFactory()
+        bodies = {}
+        for fast_path in (False, True):
+            view = view_class.as_view(fast_path=fast_path)
+
+            def get():
+                request = request_factory.get(path, HTTP_HOST=host)
+                response = view(request)
+                response.render()
+                return response
+
+            response = get()
+            rows = max(len(response.data.get('results', response.data)), 1)
+            bodies[fast_path] = response.content
+
+            tracemalloc.start()
+            get()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            start = time.perf_counter()
+            for _ in range(options['requests']):
+                get()
+            rate = options['requests'] / (time.perf_counter() - start)
+
+            label = 'values()' if fast_path else 'serializer'
+            identical = '' if not fast_path else ('yes' if bodies[True] == bodies[False] else 'NO')
+            self.stdout.write(
+                f'{name:<14} {label:<11} {rate:>9.1f} {peak / 1024 / rows:>9.2f} {identical:>10}'
+            )
@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from announcements.fastpath import feed_values, render_feed
+from announcements.management.bench import create_author, rolled_back, seed_feed
+from announcements.models import Announcement
+from backend.renderers import MessagePackRenderer, ORJSONRenderer
+
+
+RENDERERS = [
+    ('json (stdlib)', JSONRenderer),
+    ('json (orjson)', ORJSONRenderer),
+    ('msgpack', MessagePackRenderer),
+]
+
+
+class Command(BaseCommand):
+    help = 'Measure encode time and payload size of the feed in each response format'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[10, 100, 1000])
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'rows':>6} {'format':<14} {'ms/encode':>10} {'bytes':>10}")
+        with rolled_back():
+            seed_feed(create_author(), max(options['rows']))
+            request = APIRequestFactory().get('/api/announcements/', HTTP_HOST='localhost')
+            feed = render_feed(feed_values(Announcement.objects.order_by('-timestamp')), request)
+            for rows in options['rows']:
+                self.measure(feed[:rows], options['repeat'])
+
+    def measure(self, data, repeat):
+        # Payloads as views hand them to renderers: a paginated envelope
+        payload = {'count': len(data), 'next': None, 'previous': None, 'results': data}
+        for name, renderer_class in RENDERERS:
+            renderer = renderer_class()
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                body = renderer.render(payload, renderer.media_type, {})
+                timings.append(time.perf_counter() - start)
+            elapsed = sorted(timings)[len(timings) // 2]
+            self.stdout.write(f'{len(data):>6} {name:<14} {elapsed * 1000:>10.3f} {len(body):>10}')
@@ -0,0 +1,118 @@
+from django.apps import apps
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import models, transaction
+
+from backend import images
+from backend.storage import HASHED_PREFIX, ContentAddressedStorage, is_hashed
+
+
+def hashed_file_fields():
+    for model in apps.get_models():
+        for field in model._meta.get_fields():
+            if isinstance(field, models.FileField) and isinstance(field.storage, ContentAddressedStorage):
+                yield model, field
+
+
+def stored_names(queryset, field_name):
+    return queryset.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True}).values_list(
+        field_name, flat=True
+    )
+
+
+class Command(BaseCommand):
+    help = 'Move existing media to content-addressed names, storing each distinct file once'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep-originals', action='store_true', help='Leave the old files in place')
+        parser.add_argument('--prune', action='store_true', help='Also remove hashed files no row refers to')
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would change')
+
+    def handle(self, *args, **options):
+        self.dry_run = options['dry_run']
+        # Legacy name -> content-addressed name
+        self.renamed = {}
+        self.missing = set()
+
+        with transaction.atomic():
+            rows = 0
+            for model, field in hashed_file_fields():
+                rows += self.rehash_field(model, field)
+            for model, field_name in images.registry:
+                self.rehash_manifests(model, field_name)
+
+        distinct = len(set(self.renamed.values()))
+        self.stdout.write(
+            f'{len(self.renamed)} files rehashed into {distinct} ({len(self.renamed) - distinct} duplicates), '
+            f'{rows} rows updated, {len(self.missing)} missing'
+        )
+        if self.dry_run:
+            return
+        # Only once every row points at the new names
+        if not options['keep_originals']:
+            for name in self.renamed:
+                default_storage.purge(name)
+        if options['prune']:
+            self.prune()
+
+    def rehash(self, storage, name):
+        """The content-addressed name for a legacy file, storing it unless this is a dry run."""
+        if name not in self.renamed:
+            if not storage.exists(name):
+                self.missing.add(name)
+                self.stderr.write(f'Missing file: {name}')
+                return None
+            with storage.open(name, 'rb') as content:
+                if self.dry_run:
+                    self.renamed[name] = storage.hashed_name(name, content)
+                else:
+                    self.renamed[name] = storage.save(name, content)
+        return self.renamed[name]
+
+    def rehash_field(self, model, field):
+        updated = 0
+        manager = model._default_manager
+        for name in sorted(set(stored_names(manager.all(), field.name))):
+            if is_hashed(name):
+                continue
+            new_name = self.rehash(field.storage, name)
+            if new_name and not self.dry_run:
+                updated += manager.filter(**{field.name: name}).update(**{field.name: new_name})
+        return updated
+
+    def rehash_manifests(self, model, field_name):
+        storage = model._meta.get_field(field_name).storage
+        variants = images.variants_field(field_name)
+        for pk, manifest in model._default_manager.exclude(**{variants: {}}).values_list('pk', variants):
+            paths = images.derivative_files(manifest)
+            if is_hashed(manifest.get('source')) and all(is_hashed(path) for path in paths):
+                continue
+            rehashed = {'source': self.renamed.get(manifest.get('source'), manifest.get('source'))}
+            for key, entries in manifest.items():
+                if key != 'source':
+                    rehashed[key] = {
+                        width: path if is_hashed(path) else self.rehash(storage, path) or path
+                        for width, path in entries.items()
+                    }
+            if not self.dry_run:
+                model._default_manager.filter(pk=pk).update(**{variants: rehashed})
+
+    def prune(self):
+        # Run when no uploads are in flight: a file saved by a request whose
+        # transaction has not committed yet is not referenced by any row
+        referenced = set()
+        for model, field in hashed_file_fields():
+            referenced.update(stored_names(model._default_manager.all(), field.name))
+        for model, field_name in images.registry:
+            for manifest in model._default_manager.values_list(images.variants_field(field_name), flat=True):
+                referenced.update(images.derivative_files(manifest))
+
+        removed = 0
+        if default_storage.exists(HASHED_PREFIX):
+            for directory in default_storage.listdir(HASHED_PREFIX)[0]:
+                for filename in default_storage.listdir(f'{HASHED_PREFIX}{directory}')[1]:
+                    name = f'{HASHED_PREFIX}{directory}/{filename}'
+                    if name not in referenced:
+                        default_storage.purge(name)
+                        removed += 1
+        self.stdout.write(f'{removed} unreferenced files removed')
@@ -0,0 +1,50 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from backend import images
+
+
+class Command(BaseCommand):
+    help = 'Generate missing or stale image derivatives for every registered ImageField'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--force', action='store_true', help='Regenerate current derivatives too')
+
+    def pending(self, force):
+        for model, field_name in images.registry:
+            variants = images.variants_field(field_name)
+            rows = model._default_manager.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})
+            for row in rows.values('pk', field_name, variants).iterator():
+                if force or not images.is_current(row[variants], row[field_name]):
+                    yield model, field_name, row['pk'], row[field_name], row[variants]
+
+    def handle(self, *args, **options):
+        jobs = list(self.pending(options['force']))
+        if not jobs:
+            self.stdout.write('All derivatives are up to date')
+            return
+
+        # Workers only read and write files; all database writes happen here
+        connections.close_all()
+        done = failed = 0
+        with ProcessPoolExecutor(max_workers=options['workers'], initializer=django.setup) as pool:
+            futures = {}
+            for job in jobs:
+                model, field_name, pk, name, previous = job
+                futures[pool.submit(images.render_stored, model._meta.label, field_name, name)] = job
+            for future in as_completed(futures):
+                model, field_name, pk, name, previous = futures[future]
+                try:
+                    manifest = future.result()
+                except Exception as exc:
+                    failed += 1
+                    self.stderr.write(f'{name}: {exc}')
+                    continue
+                images.save_manifest(model, pk, field_name, name, manifest, previous)
+                done += 1
+        self.stdout.write(self.style.SUCCESS(f'Generated derivatives for {done} images ({failed} failed)'))
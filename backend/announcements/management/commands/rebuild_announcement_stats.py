@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from announcements import stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute the materialized announcement statistics from scratch'
+
+    def handle(self, *args, **options):
+        current = stats.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt stats: {current.total_announcements} announcements, '
+            f'{current.total_comments} comments, {current.total_likes} likes'
+        ))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from announcements import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the announcement full-text search index from scratch'
+
+    def handle(self, *args, **options):
+        if search.get_backend() is None:
+            self.stdout.write(self.style.WARNING(
+                f'No full-text backend for {connection.vendor}; search falls back to icontains'
+            ))
+            return
+        with transaction.atomic():
+            search.rebuild_index()
+        self.stdout.write(self.style.SUCCESS('Search index rebuilt'))
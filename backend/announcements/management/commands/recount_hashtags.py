@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from announcements import stats
+from announcements.models import Announcement, Hashtag
+
+
+class Command(BaseCommand):
+    help = 'Recompute Hashtag.usage_count from the announcement links to repair drift'
+
+    def handle(self, *args, **options):
+        through = Announcement.hashtags.through
+        with transaction.atomic():
+            # One grouped aggregate over the join table for every tag at once
+            counts = dict(
+                through.objects.values_list('hashtag_id').annotate(total=Count('id')).order_by()
+            )
+            drifted = []
+            for hashtag in Hashtag.objects.select_for_update().only('id', 'usage_count'):
+                actual = counts.get(hashtag.id, 0)
+                if hashtag.usage_count != actual:
+                    hashtag.usage_count = actual
+                    drifted.append(hashtag)
+            Hashtag.objects.bulk_update(drifted, ['usage_count'], batch_size=500)
+            if drifted:
+                stats.adjust(hashtags=True)
+        self.stdout.write(self.style.SUCCESS(f'Recounted hashtags; fixed {len(drifted)} drifted counts'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from announcements.counters import rollup_like_shards
+
+
+class Command(BaseCommand):
+    help = 'Fold pending like counter shards into Announcement.likes (run periodically, e.g. from cron)'
+
+    def handle(self, *args, **options):
+        updated = rollup_like_shards()
+        self.stdout.write(self.style.SUCCESS(f'Rolled up likes for {updated} announcements'))
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-17 20:33
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('announcements', '0003_hashtag_alter_announcement_options_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='announcement',
+            index=models.Index(fields=['-is_pinned', '-timestamp', '-id'], name='announcement_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['announcement', 'timestamp', 'id'], name='comment_thread_idx'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+from django.db import migrations
+
+from announcements.search import BACKENDS, populate_sql
+
+
+SQLITE_CREATE = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS announcement_search USING fts5("
+    "title, description, author_name, hashtags, "
+    "tokenize = 'porter unicode61 remove_diacritics 2')"
+)
+
+MYSQL_CREATE = (
+    "CREATE TABLE IF NOT EXISTS announcement_search ("
+    "announcement_id BIGINT NOT NULL PRIMARY KEY, "
+    "title VARCHAR(255) NOT NULL, "
+    "description LONGTEXT NOT NULL, "
+    "author_name VARCHAR(301) NOT NULL, "
+    "hashtags TEXT NOT NULL, "
+    "FULLTEXT KEY announcement_search_fulltext (title, description, author_name, hashtags)"
+    ") ENGINE=InnoDB DEFAULT CHARSET=utf8mb4"
+)
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(SQLITE_CREATE)
+        schema_editor.execute(populate_sql(BACKENDS['sqlite']))
+    elif vendor == 'mysql':
+        schema_editor.execute(MYSQL_CREATE)
+        schema_editor.execute(populate_sql(BACKENDS['mysql']))
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in ('sqlite', 'mysql'):
+        schema_editor.execute("DROP TABLE IF EXISTS announcement_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('announcements', '0004_feed_keyset_indexes'),
+        ('users', '0002_alter_user_join_date'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
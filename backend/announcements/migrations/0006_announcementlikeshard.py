@@ -0,0 +1,26 @@
+# Generated by Django 5.2.6 on 2026-10-17 20:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('announcements', '0005_announcement_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnnouncementLikeShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard', models.PositiveSmallIntegerField()),
+                ('count', models.IntegerField(default=0)),
+                ('announcement', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='like_shards', to='announcements.announcement')),
+            ],
+            options={
+                'unique_together': {('announcement', 'shard')},
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.6 on 2026-10-17 20:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('announcements', '0006_announcementlikeshard'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnnouncementStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_announcements', models.IntegerField(default=0)),
+                ('total_comments', models.IntegerField(default=0)),
+                ('total_likes', models.IntegerField(default=0)),
+                ('total_categories', models.IntegerField(default=0)),
+                ('total_hashtags', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Announcement stats',
+            },
+        ),
+        migrations.CreateModel(
+            name='CategoryStats',
+            fields=[
+                ('category', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='announcements.category')),
+                ('announcement_count', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'Category stats',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='hashtag',
+            index=models.Index(fields=['-usage_count', 'name'], name='hashtag_usage_idx'),
+        ),
+    ]
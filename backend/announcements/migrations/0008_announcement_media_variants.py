@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-17 21:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('announcements', '0007_announcement_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='announcement',
+            name='media_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.6 on 2026-10-17 21:16
+
+from django.db import migrations, models
+
+
+def log_existing(apps, schema_editor):
+    Announcement = apps.get_model('announcements', 'Announcement')
+    AnnouncementChange = apps.get_model('announcements', 'AnnouncementChange')
+    AnnouncementChange.objects.bulk_create(
+        AnnouncementChange(announcement_id=id, deleted=not is_published)
+        for id, is_published in Announcement.objects.order_by('updated_at', 'id').values_list('id', 'is_published')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('announcements', '0008_announcement_media_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnnouncementChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('announcement_id', models.IntegerField(unique=True)),
+                ('deleted', models.BooleanField(default=False)),
+                ('changed_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(log_existing, migrations.RunPython.noop),
+    ]
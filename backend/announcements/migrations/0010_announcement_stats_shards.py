@@ -0,0 +1,38 @@
+# Generated by Django 5.2.6 on 2026-10-17 21:46
+
+from django.db import migrations, models
+
+
+def drop_stats(apps, schema_editor):
+    # The next stats read rebuilds the row with the category and hashtag lists filled in
+    apps.get_model('announcements', 'AnnouncementStats').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('announcements', '0009_announcement_changes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnnouncementStatsShard',
+            fields=[
+                ('shard', models.PositiveSmallIntegerField(primary_key=True, serialize=False)),
+                ('total_comments', models.IntegerField(default=0)),
+                ('total_likes', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='announcementstats',
+            name='category_stats',
+            field=models.JSONField(default=list),
+        ),
+        migrations.AddField(
+            model_name='announcementstats',
+            name='popular_hashtags',
+            field=models.JSONField(default=list),
+        ),
+        migrations.RunPython(drop_stats, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models import Count, F, IntegerField, OuterRef, Prefetch, Subquery, Sum
+from django.db.models.functions import Coalesce
 from django.conf import settings
 from django.utils import timezone
 
@@ -28,11 +30,94 @@ class Hashtag(models.Model):
     
     class Meta:
         ordering = ['-usage_count', 'name']
+        indexes = [
+            models.Index(fields=['-usage_count', 'name'], name='hashtag_usage_idx'),
+        ]
     
     def __str__(self):
         return f"#{self.name}"
 
 
+class AnnouncementQuerySet(models.QuerySet):
+    def with_like_total(self):
+        # Like deltas not yet rolled up into Announcement.likes
+        pending = AnnouncementLikeShard.objects.filter(announcement=OuterRef('pk')).values(
+            'announcement'
+        ).annotate(total=Sum('count')).values('total')
+        return self.annotate(
+            pending_likes=Coalesce(Subquery(pending, output_field=IntegerField()), 0)
+        ).annotate(
+            # What clients see as the like count, and what ?ordering=likes sorts by
+            like_total=F('likes') + F('pending_likes')
+        )
+    
+    def with_comment_count(self):
+        # A correlated count keeps the row query (and the page COUNT) free of GROUP BY
+        total = Comment.objects.filter(announcement=OuterRef('pk')).values(
+            'announcement'
+        ).annotate(total=Count('id')).values('total')
+        return self.annotate(
+            num_comments=Coalesce(Subquery(total, output_field=IntegerField()), 0)
+        )
+    
+    def with_feed_related(self):
+        # Everything the list serializer touches, in a fixed number of queries
+        return self.select_related('author', 'category').prefetch_related('hashtags').with_comment_count(
+        ).with_like_total()
+    
+    def with_detail_related(self, comments_limit=20):
+        return self.with_feed_related().prefetch_related(first_comments_prefetch(comments_limit))
+    
+    def for_fieldsets(self, sparse, comments_limit=None):
+        """
+        with_feed_related() (or with_detail_related() when comments_limit is
+        given) trimmed to the fields and expansions the client asked for.
+        """
+        if sparse.is_default:
+            if comments_limit is None:
+                return self.with_feed_related()
+            return self.with_detail_related(comments_limit)
+        
+        queryset = self
+        related = [name for name in ('author', 'category') if sparse.expands(name)]
+        if related:
+            queryset = queryset.select_related(*related)
+        if sparse.wants('hashtags') or sparse.wants('hashtag_list'):
+            queryset = queryset.prefetch_related('hashtags')
+        if sparse.wants('comments_count'):
+            queryset = queryset.with_comment_count()
+        if sparse.wants('likes'):
+            queryset = queryset.with_like_total()
+        if comments_limit is not None and (sparse.wants('comments') or sparse.wants('comments_next')):
+            queryset = queryset.prefetch_related(first_comments_prefetch(comments_limit))
+        # Ordering columns stay loaded so keyset cursors never hit deferred fields
+        return queryset.only(*sparse.columns(ANNOUNCEMENT_COLUMNS, always=['id', 'is_pinned', 'timestamp']))
+
+
+def first_comments_prefetch(comments_limit):
+    # Only the head of the thread (+1 to know if there is more); the rest
+    # is paged through CommentListCreateView
+    return Prefetch(
+        'comments',
+        queryset=Comment.objects.select_related('author').order_by('timestamp', 'id')[:comments_limit + 1],
+        to_attr='first_comments'
+    )
+
+
+# Serializer field -> model column, for QuerySet.only()
+ANNOUNCEMENT_COLUMNS = {
+    'title': 'title',
+    'description': 'description',
+    'category': 'category',
+    'author': 'author',
+    'updated_at': 'updated_at',
+    'likes': 'likes',
+    'media': 'media',
+    'media_variants': ('media', 'media_variants'),
+    'is_published': 'is_published',
+}
+
+
 class Announcement(models.Model):
     title = models.CharField(max_length=255)
     description = models.TextField()
@@ -42,30 +127,41 @@ class Announcement(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     likes = models.PositiveIntegerField(default=0)
     media = models.ImageField(upload_to='announcements/', blank=True, null=True)
+    media_variants = models.JSONField(default=dict, blank=True, editable=False)
     hashtags = models.ManyToManyField(Hashtag, blank=True, related_name='announcements')
     is_pinned = models.BooleanField(default=False)
     is_published = models.BooleanField(default=True)
     
+    objects = AnnouncementQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-is_pinned', '-timestamp']
+        indexes = [
+            # Matches the feed ordering plus the keyset pagination tiebreaker
+            models.Index(fields=['-is_pinned', '-timestamp', '-id'], name='announcement_feed_idx'),
+        ]
     
     def __str__(self):
         return self.title
     
     @property
     def comments_count(self):
+        # Prefer the annotation from with_feed_related() over a COUNT per row
+        if hasattr(self, 'num_comments'):
+            return self.num_comments
         return self.comments.count()
     
+    @property
+    def total_likes(self):
+        # Rolled-up count plus whatever is still sitting in the shards
+        if hasattr(self, 'like_total'):
+            return self.like_total
+        pending = self.like_shards.aggregate(total=Sum('count'))['total']
+        return self.likes + (pending or 0)
+    
     @property
     def hashtag_list(self):
         return [tag.name for tag in self.hashtags.all()]
-    
-    def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        # Update hashtag usage counts
-        for hashtag in self.hashtags.all():
-            hashtag.usage_count = hashtag.announcements.count()
-            hashtag.save()
 
 
 class Comment(models.Model):
@@ -77,6 +173,9 @@ class Comment(models.Model):
     
     class Meta:
         ordering = ['timestamp']
+        indexes = [
+            models.Index(fields=['announcement', 'timestamp', 'id'], name='comment_thread_idx'),
+        ]
     
     def __str__(self):
         return f"Comment by {self.author.username} on {self.announcement.title}"
@@ -92,3 +191,86 @@ class AnnouncementLike(models.Model):
     
     def __str__(self):
         return f"{self.user.username} likes {self.announcement.title}"
+
+
+class AnnouncementLikeShard(models.Model):
+    """
+    One of N counter rows per announcement. Likes bump a random shard so hot
+    announcements do not serialize on a single row; rollup_like_shards folds
+    the shards back into Announcement.likes.
+    """
+    announcement = models.ForeignKey(Announcement, on_delete=models.CASCADE, related_name='like_shards')
+    shard = models.PositiveSmallIntegerField()
+    count = models.IntegerField(default=0)
+    
+    class Meta:
+        unique_together = ('announcement', 'shard')
+    
+    def __str__(self):
+        return f"{self.announcement_id}#{self.shard}: {self.count}"
+
+
+class AnnouncementStats(models.Model):
+    """
+    Single-row table of site-wide totals and the rendered category and
+    popular hashtag lists, kept current by signal-driven deltas (see
+    signals.py) and rebuilt by rebuild_announcement_stats. Comment and
+    like totals live in AnnouncementStatsShard rows instead, as they
+    change too often for one row.
+    """
+    total_announcements = models.IntegerField(default=0)
+    total_comments = models.IntegerField(default=0)
+    total_likes = models.IntegerField(default=0)
+    total_categories = models.IntegerField(default=0)
+    total_hashtags = models.IntegerField(default=0)
+    category_stats = models.JSONField(default=list)
+    popular_hashtags = models.JSONField(default=list)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name_plural = 'Announcement stats'
+    
+    def __str__(self):
+        return f"Announcement stats ({self.updated_at:%Y-%m-%d %H:%M})"
+
+
+class AnnouncementStatsShard(models.Model):
+    """
+    One of N rows of comment and like deltas on top of AnnouncementStats;
+    each write bumps a random shard so they do not serialize on one row.
+    """
+    shard = models.PositiveSmallIntegerField(primary_key=True)
+    total_comments = models.IntegerField(default=0)
+    total_likes = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"Stats shard {self.shard}"
+
+
+class CategoryStats(models.Model):
+    category = models.OneToOneField(Category, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    announcement_count = models.IntegerField(default=0)
+    
+    class Meta:
+        verbose_name_plural = 'Category stats'
+    
+    def __str__(self):
+        return f"{self.category.name}: {self.announcement_count}"
+
+
+class AnnouncementChange(models.Model):
+    """
+    Change log behind the delta-sync endpoint, one row per announcement.
+    Each write replaces the announcement's row with a new one, so ids grow
+    with every change and serve as sync tokens while the table stays the
+    size of the announcements table. Deleted and unpublished announcements
+    keep a tombstone row.
+    """
+    # No foreign key: tombstones outlive the announcement
+    announcement_id = models.IntegerField(unique=True)
+    deleted = models.BooleanField(default=False)
+    changed_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"#{self.id}: announcement {self.announcement_id}{' deleted' if self.deleted else ''}"
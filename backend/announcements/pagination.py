@@ -0,0 +1,157 @@
+import base64
+import json
+from types import SimpleNamespace
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(PageNumberPagination):
+    """
+    Page-number pagination by default, with an opt-in keyset (cursor) mode.
+
+    Clients opt in with ``?paginate=cursor`` (or by sending a ``cursor``).
+    Rows are then ordered by the queryset's ordering (e.g. from
+    ``?ordering=``), else the model's ``Meta.ordering``, plus an ``id``
+    tiebreaker and each page seeks past the last row of the previous one, so
+    there is no OFFSET scan or COUNT(*) and concurrent inserts never shift
+    rows between pages. Orderings a cursor cannot carry, such as search
+    relevance, are rejected with a 400.
+    """
+    cursor_query_param = 'cursor'
+    mode_query_param = 'paginate'
+    invalid_cursor_message = 'Invalid cursor'
+    unsupported_ordering_message = 'Cursor pagination needs an ordering by model fields; use page numbers instead'
+    keyset_ordering = None
+    # Other query params that imply keyset mode
+    keyset_query_params = ()
+
+    def use_keyset(self, request):
+        params = request.query_params
+        if any(param in params for param in (self.cursor_query_param,) + tuple(self.keyset_query_params)):
+            return True
+        return params.get(self.mode_query_param) == 'cursor'
+
+    def get_keyset_ordering(self, model):
+        if self.keyset_ordering:
+            return list(self.keyset_ordering)
+        return self.with_tiebreaker(list(model._meta.ordering))
+
+    def with_tiebreaker(self, ordering):
+        if any(name.lstrip('-') == 'id' for name in ordering):
+            return ordering
+        # Tiebreak on the primary key, in the same direction as the last column
+        descending = bool(ordering) and ordering[-1].startswith('-')
+        return ordering + ['-id' if descending else 'id']
+
+    def get_queryset_ordering(self, queryset):
+        ordering = queryset.query.order_by
+        if not ordering:
+            return self.get_keyset_ordering(queryset.model)
+        for name in ordering:
+            # Expressions and extra selects (e.g. search rank) have no field to put in a cursor
+            if not isinstance(name, str) or '__' in name:
+                raise ValidationError({self.mode_query_param: self.unsupported_ordering_message})
+            try:
+                self.get_keyset_field(queryset.model, name.lstrip('-'), queryset.query.annotations)
+            except FieldDoesNotExist:
+                raise ValidationError({self.mode_query_param: self.unsupported_ordering_message})
+        return self.with_tiebreaker(list(ordering))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = self.use_keyset(request)
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view)
+
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        self.request = request
+        self.ordering = self.get_queryset_ordering(queryset)
+        self.fields = self.get_keyset_fields(queryset.model, self.ordering, queryset.query.annotations)
+        queryset = queryset.order_by(*self.ordering)
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            queryset = queryset.filter(self.seek_filter(self.decode_cursor(cursor)))
+
+        rows = list(queryset[:page_size + 1])
+        self.has_next = len(rows) > page_size
+        self.page = rows[:page_size]
+        return self.page
+
+    def get_keyset_fields(self, model, ordering, annotations=None):
+        return [self.get_keyset_field(model, name.lstrip('-'), annotations or {}) for name in ordering]
+
+    def get_keyset_field(self, model, name, annotations):
+        if name in annotations:
+            # An annotation (e.g. a like total) goes into the cursor through its output field
+            field = annotations[name].output_field.clone()
+            field.set_attributes_from_name(name)
+            return field
+        return model._meta.get_field(name)
+
+    @classmethod
+    def cursor_for(cls, instance):
+        """Cursor that resumes right after instance, e.g. to link to the next page."""
+        paginator = cls()
+        model = type(instance)
+        fields = paginator.get_keyset_fields(model, paginator.get_keyset_ordering(model))
+        return paginator.encode_cursor(instance, fields)
+
+    def seek_filter(self, values):
+        # (a, b, c) "after" (x, y, z) expanded into
+        # a > x OR (a = x AND b > y) OR (a = x AND b = y AND c > z)
+        condition = Q()
+        for index, name in enumerate(self.ordering):
+            column = name.lstrip('-')
+            lookup = 'lt' if name.startswith('-') else 'gt'
+            clause = Q(**{f'{column}__{lookup}': values[index]})
+            for previous in range(index):
+                clause &= Q(**{self.ordering[previous].lstrip('-'): values[previous]})
+            condition |= clause
+        return condition
+
+    def encode_cursor(self, instance, fields=None):
+        if isinstance(instance, dict):
+            # values() rows from a fast path; value_to_string only needs attributes
+            instance = SimpleNamespace(**instance)
+        values = [field.value_to_string(instance) for field in fields or self.fields]
+        data = json.dumps(values, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(data).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            if not isinstance(values, list) or len(values) != len(self.fields):
+                raise ValueError
+            return [field.to_python(value) for field, value in zip(self.fields, values)]
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        return Response({
+            'next': self.get_next_link(),
+            'results': data
+        })
+
+
+class CommentPagination(KeysetPagination):
+    # Live refreshes (?since= / ?after_id=) never need a COUNT(*)
+    keyset_query_params = ('since', 'after_id')
@@ -0,0 +1,205 @@
+import re
+
+from django.db import connection
+from django.utils.html import escape
+from rest_framework import filters
+
+SEARCH_TABLE = 'announcement_search'
+
+
+def search_terms(query):
+    # Only plain word tokens reach the engine, so user input can never
+    # inject FTS5 operators or break MySQL boolean syntax
+    return re.findall(r'\w+', query or '')[:16]
+
+
+def make_snippet(text, query, width=160):
+    """Highlight search terms in text, for backends without native snippets."""
+    terms = search_terms(query)
+    if not text or not terms:
+        return text or ''
+    pattern = re.compile('|'.join(re.escape(term) for term in terms), re.IGNORECASE)
+    match = pattern.search(text)
+    start = max(0, match.start() - width // 3) if match else 0
+    excerpt = text[start:start + width]
+    highlighted = pattern.sub(lambda m: f'<mark>{m.group(0)}</mark>', escape(excerpt))
+    return ('…' if start else '') + highlighted + ('…' if start + width < len(text) else '')
+
+
+def populate_sql(backend):
+    """INSERT ... SELECT filling the index from every announcement, in the backend's dialect."""
+    return (
+        f'INSERT INTO {SEARCH_TABLE} ({backend.id_column}, title, description, author_name, hashtags) '
+        f'SELECT a.id, a.title, a.description, {backend.author_name_sql}, '
+        f'COALESCE((SELECT {backend.hashtags_sql} FROM announcements_announcement_hashtags ah '
+        "JOIN announcements_hashtag h ON h.id = ah.hashtag_id WHERE ah.announcement_id = a.id), '') "
+        'FROM announcements_announcement a JOIN users_user u ON u.id = a.author_id'
+    )
+
+
+class SQLiteSearchBackend:
+    """FTS5 virtual table keyed by announcement id (its rowid)."""
+    native_snippets = True
+    id_column = 'rowid'
+    author_name_sql = "u.first_name || ' ' || u.last_name"
+    hashtags_sql = "group_concat(h.name, ' ')"
+
+    def match_expression(self, terms):
+        return ' '.join(f'"{term}"*' for term in terms)
+
+    def upsert(self, cursor, doc):
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [doc['id']])
+        cursor.execute(
+            f'INSERT INTO {SEARCH_TABLE} (rowid, title, description, author_name, hashtags) '
+            'VALUES (%s, %s, %s, %s, %s)',
+            [doc['id'], doc['title'], doc['description'], doc['author_name'], doc['hashtags']]
+        )
+
+    def delete(self, cursor, announcement_id):
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [announcement_id])
+
+    def rename_author(self, cursor, author_id, author_name):
+        cursor.execute(
+            f'UPDATE {SEARCH_TABLE} SET author_name = %s WHERE rowid IN '
+            '(SELECT id FROM announcements_announcement WHERE author_id = %s)',
+            [author_name, author_id]
+        )
+
+    def rebuild(self, cursor):
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+        cursor.execute(populate_sql(self))
+
+    def annotate(self, queryset, terms):
+        table = queryset.model._meta.db_table
+        # One join and one MATCH for the whole query. extra() select columns
+        # are dropped from COUNT and aggregate queries, so only the page rows
+        # pay for bm25() and snippet()
+        return queryset.extra(
+            tables=[SEARCH_TABLE],
+            where=[f'{SEARCH_TABLE} MATCH %s', f'{SEARCH_TABLE}.rowid = {table}.id'],
+            params=[self.match_expression(terms)],
+            select={
+                # bm25() is lower-is-better; negate so higher rank means more relevant
+                'search_rank': f'-bm25({SEARCH_TABLE}, 10.0, 1.0, 2.0, 5.0)',
+                'search_snippet': f"snippet({SEARCH_TABLE}, -1, '<mark>', '</mark>', '…', 24)",
+            },
+        )
+
+
+class MySQLSearchBackend:
+    """InnoDB side table with a FULLTEXT index over all searchable columns."""
+    native_snippets = False
+    columns = 'title, description, author_name, hashtags'
+    id_column = 'announcement_id'
+    author_name_sql = "CONCAT(u.first_name, ' ', u.last_name)"
+    hashtags_sql = "GROUP_CONCAT(h.name SEPARATOR ' ')"
+
+    def match_expression(self, terms):
+        return ' '.join(f'+{term}*' for term in terms)
+
+    def upsert(self, cursor, doc):
+        cursor.execute(
+            f'REPLACE INTO {SEARCH_TABLE} (announcement_id, title, description, author_name, hashtags) '
+            'VALUES (%s, %s, %s, %s, %s)',
+            [doc['id'], doc['title'], doc['description'], doc['author_name'], doc['hashtags']]
+        )
+
+    def delete(self, cursor, announcement_id):
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE announcement_id = %s', [announcement_id])
+
+    def rename_author(self, cursor, author_id, author_name):
+        cursor.execute(
+            f'UPDATE {SEARCH_TABLE} s JOIN announcements_announcement a ON a.id = s.announcement_id '
+            'SET s.author_name = %s WHERE a.author_id = %s',
+            [author_name, author_id]
+        )
+
+    def rebuild(self, cursor):
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+        cursor.execute(populate_sql(self))
+
+    def annotate(self, queryset, terms):
+        match = self.match_expression(terms)
+        table = queryset.model._meta.db_table
+        # Joined once, as for SQLite; the rank is left out of COUNT and aggregates
+        return queryset.extra(
+            tables=[SEARCH_TABLE],
+            where=[
+                f'MATCH({self.columns}) AGAINST (%s IN BOOLEAN MODE)',
+                f'{SEARCH_TABLE}.announcement_id = {table}.id',
+            ],
+            params=[match],
+            select={'search_rank': f'MATCH({self.columns}) AGAINST (%s IN BOOLEAN MODE)'},
+            select_params=[match],
+        )
+
+
+BACKENDS = {
+    'sqlite': SQLiteSearchBackend,
+    'mysql': MySQLSearchBackend,
+}
+
+
+def get_backend(conn=None):
+    backend = BACKENDS.get((conn or connection).vendor)
+    return backend() if backend else None
+
+
+def build_document(announcement):
+    author = announcement.author
+    return {
+        'id': announcement.id,
+        'title': announcement.title,
+        'description': announcement.description,
+        'author_name': f'{author.first_name} {author.last_name}',
+        'hashtags': ' '.join(tag.name for tag in announcement.hashtags.all()),
+    }
+
+
+def index_announcement(announcement):
+    backend = get_backend()
+    if backend:
+        with connection.cursor() as cursor:
+            backend.upsert(cursor, build_document(announcement))
+
+
+def remove_announcement(announcement_id):
+    backend = get_backend()
+    if backend:
+        with connection.cursor() as cursor:
+            backend.delete(cursor, announcement_id)
+
+
+def rename_author(user):
+    backend = get_backend()
+    if backend:
+        with connection.cursor() as cursor:
+            backend.rename_author(cursor, user.id, f'{user.first_name} {user.last_name}')
+
+
+def rebuild_index():
+    backend = get_backend()
+    if backend:
+        with connection.cursor() as cursor:
+            backend.rebuild(cursor)
+
+
+class FullTextSearchFilter(filters.SearchFilter):
+    """
+    Drop-in replacement for SearchFilter backed by the announcement search
+    index. Results are ranked by relevance unless the client asks for an
+    explicit ?ordering=. Falls back to SearchFilter on other databases.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '')
+        terms = search_terms(query)
+        if not terms:
+            return queryset
+        backend = get_backend()
+        if backend is None:
+            return super().filter_queryset(request, queryset, view)
+        queryset = backend.annotate(queryset, terms)
+        if filters.OrderingFilter.ordering_param not in request.query_params:
+            queryset = queryset.order_by('-search_rank', '-timestamp')
+        return queryset
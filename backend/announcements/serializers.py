@@ -1,7 +1,15 @@
 from rest_framework import serializers
+from rest_framework.reverse import reverse
+from rest_framework.utils.urls import replace_query_param
+from django.db import transaction
 from django.utils.text import slugify
 from .models import Announcement, Comment, AnnouncementLike, Category, Hashtag
+from backend.images import ImageVariantsField
+from backend.sparse import SparseFieldsetMixin
 from users.serializers import UserSerializer
+from . import stats
+from .pagination import KeysetPagination
+from .search import make_snippet
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -22,6 +30,40 @@ class HashtagSerializer(serializers.ModelSerializer):
         read_only_fields = ['slug', 'usage_count']
 
 
+def resolve_hashtags(names):
+    """
+    Map raw hashtag names to Hashtag rows, creating missing ones in bulk.
+    Costs one lookup, plus one insert and one re-read when new tags appear.
+    Raises ValidationError for a new name whose slug is already taken by
+    another tag, e.g. "exam results" next to "exam-results".
+    """
+    cleaned = [name.strip().lower().replace('#', '') for name in names]
+    cleaned = list(dict.fromkeys(name for name in cleaned if name))
+    if not cleaned:
+        return []
+    
+    hashtags = {tag.name: tag for tag in Hashtag.objects.filter(name__in=cleaned)}
+    missing = [name for name in cleaned if name not in hashtags]
+    if missing:
+        Hashtag.objects.bulk_create(
+            [Hashtag(name=name, slug=slugify(name)) for name in missing],
+            ignore_conflicts=True
+        )
+        # ignore_conflicts leaves pks unset and tolerates concurrent creators
+        created = {tag.name: tag for tag in Hashtag.objects.filter(name__in=missing)}
+        # ...but also skips names whose slug collided rather than their name
+        clashing = [name for name in missing if name not in created]
+        if clashing:
+            raise serializers.ValidationError({
+                'hashtag_names': [f'"{name}" clashes with an existing hashtag' for name in clashing]
+            })
+        hashtags.update(created)
+        # bulk_create sends no post_save, so count the new tags here
+        stats.adjust(total_hashtags=len(created))
+    
+    return [hashtags[name] for name in cleaned]
+
+
 class CommentSerializer(serializers.ModelSerializer):
     author = UserSerializer(read_only=True)
     
@@ -31,39 +73,86 @@ class CommentSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'timestamp', 'updated_at']
 
 
-class AnnouncementSerializer(serializers.ModelSerializer):
+class AnnouncementSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     author = UserSerializer(read_only=True)
+    likes = serializers.IntegerField(source='total_likes', read_only=True)
     category = CategorySerializer(read_only=True)
     hashtags = HashtagSerializer(many=True, read_only=True)
-    comments = CommentSerializer(many=True, read_only=True)
+    media_variants = ImageVariantsField('media')
+    comments = serializers.SerializerMethodField()
+    comments_next = serializers.SerializerMethodField()
     comments_count = serializers.ReadOnlyField()
     hashtag_list = serializers.ReadOnlyField()
     
+    # Detail responses embed only the start of the thread
+    comments_limit = 20
+    expandable_fields = ['author', 'category', 'hashtags']
+    
     class Meta:
         model = Announcement
         fields = [
             'id', 'title', 'description', 'category', 'author', 
-            'timestamp', 'updated_at', 'likes', 'media', 'hashtags', 
-            'hashtag_list', 'comments', 'comments_count', 'is_pinned', 'is_published'
+            'timestamp', 'updated_at', 'likes', 'media', 'media_variants', 'hashtags', 
+            'hashtag_list', 'comments', 'comments_next', 'comments_count', 'is_pinned', 'is_published'
         ]
         read_only_fields = ['id', 'timestamp', 'updated_at', 'likes', 'author']
-
-
-class AnnouncementListSerializer(serializers.ModelSerializer):
+    
+    def first_comments(self, obj):
+        # Prefetched by with_detail_related(); fetched here otherwise
+        if not hasattr(obj, 'first_comments'):
+            obj.first_comments = list(
+                obj.comments.select_related('author').order_by('timestamp', 'id')[:self.comments_limit + 1]
+            )
+        return obj.first_comments
+    
+    def get_comments(self, obj):
+        comments = self.first_comments(obj)[:self.comments_limit]
+        return CommentSerializer(comments, many=True, context=self.context).data
+    
+    def get_comments_next(self, obj):
+        comments = self.first_comments(obj)
+        if len(comments) <= self.comments_limit:
+            return None
+        url = reverse('comment-list-create', args=[obj.id])
+        request = self.context.get('request')
+        if request is not None:
+            url = request.build_absolute_uri(url)
+        cursor = KeysetPagination.cursor_for(comments[self.comments_limit - 1])
+        return replace_query_param(url, KeysetPagination.cursor_query_param, cursor)
+
+
+class AnnouncementListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     author = UserSerializer(read_only=True)
+    likes = serializers.IntegerField(source='total_likes', read_only=True)
     category = CategorySerializer(read_only=True)
     hashtags = HashtagSerializer(many=True, read_only=True)
+    media_variants = ImageVariantsField('media')
     comments_count = serializers.ReadOnlyField()
     hashtag_list = serializers.ReadOnlyField()
     
+    expandable_fields = ['author', 'category', 'hashtags']
+    
     class Meta:
         model = Announcement
         fields = [
             'id', 'title', 'description', 'category', 'author', 
-            'timestamp', 'updated_at', 'likes', 'media', 'hashtags',
+            'timestamp', 'updated_at', 'likes', 'media', 'media_variants', 'hashtags',
             'hashtag_list', 'comments_count', 'is_pinned', 'is_published'
         ]
         read_only_fields = ['id', 'timestamp', 'updated_at', 'likes', 'author']
+    
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # Only present on rows matched by FullTextSearchFilter
+        if hasattr(instance, 'search_rank'):
+            snippet = getattr(instance, 'search_snippet', None)
+            if snippet is None:
+                request = self.context.get('request')
+                query = request.query_params.get('search', '') if request else ''
+                snippet = make_snippet(instance.description, query)
+            data['search_rank'] = instance.search_rank
+            data['search_snippet'] = snippet
+        return data
 
 
 class AnnouncementCreateUpdateSerializer(serializers.ModelSerializer):
@@ -82,6 +171,7 @@ class AnnouncementCreateUpdateSerializer(serializers.ModelSerializer):
             'hashtag_names', 'is_pinned', 'is_published'
         ]
     
+    @transaction.atomic
     def create(self, validated_data):
         hashtag_names = validated_data.pop('hashtag_names', [])
         category_id = validated_data.pop('category_id', None)
@@ -98,25 +188,12 @@ class AnnouncementCreateUpdateSerializer(serializers.ModelSerializer):
         
         # Handle hashtags
         if hashtag_names:
-            hashtags = []
-            for name in hashtag_names:
-                name = name.strip().lower().replace('#', '')
-                if name:
-                    hashtag, created = Hashtag.objects.get_or_create(
-                        name=name,
-                        defaults={'slug': slugify(name)}
-                    )
-                    hashtags.append(hashtag)
-            
-            announcement.hashtags.set(hashtags)
-            
-            # Update usage counts
-            for hashtag in hashtags:
-                hashtag.usage_count = hashtag.announcements.count()
-                hashtag.save()
+            # Hashtag.usage_count is kept in step by the m2m_changed handler
+            announcement.hashtags.add(*resolve_hashtags(hashtag_names))
         
         return announcement
     
+    @transaction.atomic
     def update(self, instance, validated_data):
         hashtag_names = validated_data.pop('hashtag_names', None)
         category_id = validated_data.pop('category_id', None)
@@ -132,32 +209,13 @@ class AnnouncementCreateUpdateSerializer(serializers.ModelSerializer):
         # Update announcement fields
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
-        instance.save()
+        # Only the edited fields, so a stale likes value is never written back
+        instance.save(update_fields=[*validated_data, 'updated_at'])
         
         # Handle hashtags if provided
         if hashtag_names is not None:
-            # Remove old hashtags and update their counts
-            old_hashtags = list(instance.hashtags.all())
-            instance.hashtags.clear()
-            
-            # Add new hashtags
-            hashtags = []
-            for name in hashtag_names:
-                name = name.strip().lower().replace('#', '')
-                if name:
-                    hashtag, created = Hashtag.objects.get_or_create(
-                        name=name,
-                        defaults={'slug': slugify(name)}
-                    )
-                    hashtags.append(hashtag)
-            
-            instance.hashtags.set(hashtags)
-            
-            # Update usage counts for all affected hashtags
-            all_hashtags = set(old_hashtags + hashtags)
-            for hashtag in all_hashtags:
-                hashtag.usage_count = hashtag.announcements.count()
-                hashtag.save()
+            # set() only adds/removes the difference, so unchanged tags keep their counts
+            instance.hashtags.set(resolve_hashtags(hashtag_names))
         
         return instance
 
@@ -0,0 +1,356 @@
+from django.db.models import Count, F, IntegerField, OuterRef, QuerySet, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from users.models import User
+from users.notifications import broadcast
+from . import changes, events, search, stats
+from .counters import bump_likes
+from .fastpath import FEED_VALUES
+from .models import Announcement, AnnouncementLike, Category, CategoryStats, Comment, Hashtag
+
+
+@receiver(post_save, sender=Announcement)
+def index_saved_announcement(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.index_announcement(instance)
+
+
+@receiver(post_delete, sender=Announcement)
+def unindex_deleted_announcement(sender, instance, **kwargs):
+    search.remove_announcement(instance.id)
+
+
+@receiver(m2m_changed, sender=Announcement.hashtags.through)
+def reindex_announcement_hashtags(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == 'pre_clear':
+        # post_clear carries no pk_set, so remember who is about to lose the tag
+        instance._search_cleared_ids = list(instance.announcements.values_list('id', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        search.index_announcement(instance)
+        return
+    # Changed from the hashtag side; reindex every announcement touched
+    if action == 'post_clear':
+        # Popped by log_announcement_hashtags
+        pk_set = instance.__dict__.get('_search_cleared_ids', [])
+    announcements = Announcement.objects.filter(id__in=pk_set).select_related('author')
+    for announcement in announcements.prefetch_related('hashtags'):
+        search.index_announcement(announcement)
+
+
+@receiver(post_save, sender=User)
+def reindex_author_name(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if created or raw:
+        return
+    # Logins save only last_login; skip anything that cannot touch the name
+    if update_fields is not None and not {'first_name', 'last_name'} & set(update_fields):
+        return
+    search.rename_author(instance)
+
+
+# Author columns embedded in every feed row
+FEED_AUTHOR_FIELDS = {name.split('__', 1)[1] for name in FEED_VALUES if name.startswith('author__')}
+
+
+@receiver(post_save, sender=User)
+def touch_feed_for_author(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if created or raw:
+        return
+    if update_fields is not None and not FEED_AUTHOR_FIELDS & set(update_fields):
+        return
+    # Their name, avatar etc. are in cached feeds; move the feed validators on
+    if instance.announcements.exists():
+        stats.adjust()
+
+
+def adjust_usage_counts(hashtag_ids, delta):
+    # One UPDATE ... SET usage_count = usage_count +/- n WHERE id IN (...)
+    if hashtag_ids and delta:
+        Hashtag.objects.filter(id__in=hashtag_ids).update(
+            usage_count=Greatest(F('usage_count') + delta, Value(0))
+        )
+        # Usage counts are shown in every feed row and the popular list; invalidate cached feeds
+        stats.adjust(hashtags=True)
+
+
+@receiver(m2m_changed, sender=Announcement.hashtags.through)
+def track_hashtag_usage(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_remove':
+        # pk_set may name rows that were never linked; count only real ones
+        links = sender.objects.filter(**{
+            'hashtag_id' if reverse else 'announcement_id': instance.id,
+            'announcement_id__in' if reverse else 'hashtag_id__in': pk_set,
+        })
+        instance._usage_removed_ids = set(
+            links.values_list('announcement_id' if reverse else 'hashtag_id', flat=True)
+        )
+    elif action == 'pre_clear' and not reverse:
+        instance._usage_removed_ids = set(instance.hashtags.values_list('id', flat=True))
+    elif action == 'post_add':
+        if reverse:
+            adjust_usage_counts([instance.id], len(pk_set))
+        else:
+            adjust_usage_counts(pk_set, 1)
+    elif action in ('post_remove', 'post_clear'):
+        if reverse and action == 'post_clear':
+            Hashtag.objects.filter(id=instance.id).update(usage_count=0)
+            stats.adjust(hashtags=True)
+            return
+        removed = instance.__dict__.pop('_usage_removed_ids', set())
+        if reverse:
+            adjust_usage_counts([instance.id], -len(removed))
+        else:
+            adjust_usage_counts(removed, -1)
+
+
+@receiver(pre_delete, sender=Announcement)
+def release_hashtags_on_delete(sender, instance, **kwargs):
+    # The cascade removes through rows without sending m2m_changed
+    released = Hashtag.objects.filter(announcements=instance).update(
+        usage_count=Greatest(F('usage_count') - 1, Value(0))
+    )
+    if released:
+        stats.adjust(hashtags=True)
+
+
+# Materialized stats: every write applies a delta instead of a recount
+
+@receiver(pre_save, sender=Announcement)
+@receiver(pre_save, sender=Category)
+def remember_stats_state(sender, instance, raw=False, **kwargs):
+    if raw or instance.pk is None:
+        instance._stats_previous = None
+        return
+    fields = ['is_published', 'category_id', 'is_pinned'] if sender is Announcement else ['is_active']
+    instance._stats_previous = sender.objects.filter(pk=instance.pk).values(*fields).first()
+
+
+@receiver(post_save, sender=Announcement)
+def count_saved_announcement(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    # Shared by several receivers; remember_stats_state resets it on every save
+    previous = instance.__dict__.get('_stats_previous')
+    was_published = bool(previous and previous['is_published'])
+    old_category = previous['category_id'] if was_published else None
+    new_category = instance.category_id if instance.is_published else None
+    if old_category != new_category:
+        stats.adjust_category(old_category, -1)
+        stats.adjust_category(new_category, 1)
+    stats.adjust(
+        total_announcements=int(instance.is_published) - int(was_published),
+        categories=old_category != new_category
+    )
+
+
+@receiver(post_delete, sender=Announcement)
+def count_deleted_announcement(sender, instance, **kwargs):
+    if instance.is_published:
+        stats.adjust_category(instance.category_id, -1)
+        stats.adjust(total_announcements=-1, categories=bool(instance.category_id))
+
+
+@receiver(post_save, sender=Category)
+def count_saved_category(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = instance.__dict__.pop('_stats_previous', None)
+    was_active = bool(previous and previous['is_active'])
+    if created:
+        CategoryStats.objects.get_or_create(category=instance)
+    # Name, colour and active flag are all part of the rendered list
+    stats.adjust(total_categories=int(instance.is_active) - int(was_active), categories=True)
+
+
+@receiver(post_delete, sender=Category)
+def count_deleted_category(sender, instance, **kwargs):
+    stats.adjust(total_categories=-int(instance.is_active), categories=True)
+
+
+# Comments and likes are frequent enough to land on stats shards instead of the single row.
+# When they go in a cascade, the announcement or user being deleted accounts for all of
+# them at once in its pre_delete, and the per-row receivers below step aside.
+
+def cascaded(sender, origin):
+    """Whether a row is being deleted as part of deleting something else."""
+    if origin is None:
+        return False
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return model is not sender
+
+
+@receiver(pre_delete, sender=Announcement)
+def count_cascaded_reactions(sender, instance, **kwargs):
+    # Clients drop the whole announcement, so only the totals need the delta
+    counts = Announcement.objects.filter(id=instance.id).annotate(
+        comment_total=count_of(Comment, 'announcement'),
+        like_total=count_of(AnnouncementLike, 'announcement'),
+    ).values_list('comment_total', 'like_total').first()
+    if counts and any(counts):
+        stats.bump(total_comments=-counts[0], total_likes=-counts[1])
+
+
+@receiver(pre_delete, sender=User)
+def release_user_reactions(sender, instance, **kwargs):
+    # Reactions on the user's own announcements are counted with those announcements
+    comments = reaction_counts(Comment.objects.filter(author=instance), instance)
+    likes = reaction_counts(AnnouncementLike.objects.filter(user=instance), instance)
+    if comments or likes:
+        stats.bump(total_comments=-sum(comments.values()), total_likes=-sum(likes.values()))
+    for announcement_id, total in likes.items():
+        bump_likes(announcement_id, -total)
+        events.publish('likes', {'id': announcement_id, 'delta': -total})
+    for announcement_id, total in comments.items():
+        events.publish('comments', {'id': announcement_id, 'delta': -total})
+    record_published(comments)
+
+
+def count_of(model, field):
+    rows = model.objects.filter(**{field: OuterRef('pk')}).values(field).annotate(total=Count('id')).values('total')
+    return Coalesce(Subquery(rows, output_field=IntegerField()), 0)
+
+
+def reaction_counts(queryset, user):
+    """{announcement id: rows} for a user's reactions on other people's announcements."""
+    return dict(
+        queryset.exclude(announcement__author=user).values_list('announcement_id').annotate(total=Count('id')).order_by()
+    )
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_save, sender=AnnouncementLike)
+def count_created_row(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        stats.bump(**{STATS_FIELDS[sender]: 1})
+
+
+@receiver(post_delete, sender=Comment)
+@receiver(post_delete, sender=AnnouncementLike)
+def count_deleted_row(sender, instance, origin=None, **kwargs):
+    if not cascaded(sender, origin):
+        stats.bump(**{STATS_FIELDS[sender]: -1})
+
+
+STATS_FIELDS = {
+    Comment: 'total_comments',
+    AnnouncementLike: 'total_likes',
+}
+
+
+@receiver(post_save, sender=Hashtag)
+def count_saved_hashtag(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    # A new tag is unused, so only a rename can change the popular list
+    stats.adjust(total_hashtags=int(created), hashtags=not created)
+
+
+@receiver(post_delete, sender=Hashtag)
+def count_deleted_hashtag(sender, instance, **kwargs):
+    stats.adjust(total_hashtags=-1, hashtags=True)
+
+
+# Live events: pushed to SSE streams once the write commits
+
+def announcement_event(instance):
+    return {
+        'id': instance.id,
+        'title': instance.title,
+        'is_pinned': instance.is_pinned,
+        'timestamp': instance.timestamp.isoformat() if instance.timestamp else None,
+    }
+
+
+@receiver(post_save, sender=Announcement)
+def publish_saved_announcement(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = instance.__dict__.get('_stats_previous')
+    was_published = bool(previous and previous['is_published'])
+    if instance.is_published and not was_published:
+        events.publish('announcement.created', announcement_event(instance))
+    elif was_published and not instance.is_published:
+        events.publish('announcement.removed', {'id': instance.id})
+    elif instance.is_published and previous['is_pinned'] != instance.is_pinned:
+        events.publish('announcement.pinned', {'id': instance.id, 'is_pinned': instance.is_pinned})
+
+
+@receiver(post_delete, sender=Announcement)
+def publish_deleted_announcement(sender, instance, **kwargs):
+    if instance.is_published:
+        events.publish('announcement.removed', {'id': instance.id})
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_save, sender=AnnouncementLike)
+def publish_created_reaction(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        events.publish(EVENT_NAMES[sender], {'id': instance.announcement_id, 'delta': 1})
+
+
+@receiver(post_delete, sender=Comment)
+@receiver(post_delete, sender=AnnouncementLike)
+def publish_deleted_reaction(sender, instance, origin=None, **kwargs):
+    if not cascaded(sender, origin):
+        events.publish(EVENT_NAMES[sender], {'id': instance.announcement_id, 'delta': -1})
+
+
+EVENT_NAMES = {
+    Comment: 'comments',
+    AnnouncementLike: 'likes',
+}
+
+
+@receiver(post_save, sender=Announcement)
+def notify_published_announcement(sender, instance, raw=False, **kwargs):
+    previous = instance.__dict__.get('_stats_previous')
+    if not raw and instance.is_published and not (previous and previous['is_published']):
+        # One row for everyone; users' read cursors do the rest
+        broadcast(f'New announcement: {instance.title}')
+
+
+# Delta sync: log every change a client has to pick up
+
+@receiver(post_save, sender=Announcement)
+def log_saved_announcement(sender, instance, raw=False, **kwargs):
+    if not raw:
+        previous = instance.__dict__.get('_stats_previous')
+        changes.record_announcement(instance, was_published=bool(previous and previous['is_published']))
+
+
+@receiver(post_delete, sender=Announcement)
+def log_deleted_announcement(sender, instance, **kwargs):
+    changes.record([instance.id], deleted=True)
+
+
+@receiver(m2m_changed, sender=Announcement.hashtags.through)
+def log_announcement_hashtags(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        changes.record_announcement(instance)
+        return
+    if action == 'post_clear':
+        pk_set = instance.__dict__.pop('_search_cleared_ids', [])
+    record_published(pk_set)
+
+
+@receiver(post_save, sender=Comment)
+def log_commented_announcement(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        record_published([instance.announcement_id])
+
+
+@receiver(post_delete, sender=Comment)
+def log_uncommented_announcement(sender, instance, origin=None, **kwargs):
+    if not cascaded(sender, origin):
+        record_published([instance.announcement_id])
+
+
+def record_published(announcement_ids):
+    # Comments and tags on drafts (or on an announcement being deleted) change nothing clients hold
+    changes.record(Announcement.objects.filter(id__in=announcement_ids, is_published=True).values_list('id', flat=True))
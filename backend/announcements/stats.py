@@ -0,0 +1,144 @@
+import random
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Func, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import (
+    Announcement, AnnouncementLike, AnnouncementStats, AnnouncementStatsShard, Category, CategoryStats,
+    Comment, Hashtag
+)
+
+STATS_PK = 1
+POPULAR_HASHTAGS = 10
+
+
+def adjust(categories=False, hashtags=False, **deltas):
+    """
+    Apply counter deltas, e.g. adjust(total_announcements=1), in one UPDATE,
+    re-rendering the category and/or popular hashtag lists if asked to.
+    Always bumps updated_at, which doubles as a content version for
+    conditional GETs on the feed; adjust() with no arguments just touches it.
+    """
+    changes = {field: F(field) + delta for field, delta in deltas.items() if delta}
+    if categories:
+        changes['category_stats'] = category_payload()
+    if hashtags:
+        changes['popular_hashtags'] = hashtag_payload()
+    # A missing row is fine: current_stats() rebuilds it from the tables
+    AnnouncementStats.objects.filter(pk=STATS_PK).update(updated_at=timezone.now(), **changes)
+
+
+def bump(**deltas):
+    """Add comment or like deltas, e.g. bump(total_likes=1), to one randomly chosen stats shard."""
+    shard = random.randrange(settings.STATS_COUNTER_SHARDS)
+    shards = AnnouncementStatsShard.objects.filter(shard=shard)
+    changes = {field: F(field) + delta for field, delta in deltas.items()}
+    if shards.update(updated_at=timezone.now(), **changes):
+        return
+    try:
+        with transaction.atomic():
+            AnnouncementStatsShard.objects.create(shard=shard, **deltas)
+    except IntegrityError:
+        # Another writer created the shard first
+        shards.update(updated_at=timezone.now(), **changes)
+
+
+def over_shards(function, field):
+    # SUM/MAX over every stats shard, as a scalar subquery of the stats row read
+    shards = AnnouncementStatsShard.objects.annotate(value=Func(F(field), function=function)).values('value')
+    return Subquery(shards)
+
+
+def lists_changed():
+    # The stats row's own stamp, as a scalar subquery of another read: it moves
+    # whenever a category or hashtag that announcements embed changes
+    return Subquery(AnnouncementStats.objects.filter(pk=STATS_PK).values('updated_at'))
+
+
+def last_changed():
+    row = AnnouncementStats.objects.filter(pk=STATS_PK).annotate(
+        shards_changed=over_shards('MAX', 'updated_at')
+    ).values_list('updated_at', 'shards_changed').first()
+    if row is None:
+        return None
+    return max(stamp for stamp in row if stamp is not None)
+
+
+def adjust_category(category_id, delta):
+    """Apply a delta to a category's count; callers re-render the list with adjust(categories=True)."""
+    if not category_id or not delta:
+        return
+    updated = CategoryStats.objects.filter(category_id=category_id).update(
+        announcement_count=F('announcement_count') + delta
+    )
+    if not updated and Category.objects.filter(id=category_id).exists():
+        # First announcement for a category created before stats existed
+        CategoryStats.objects.get_or_create(
+            category_id=category_id,
+            defaults={'announcement_count': published_count(category_id)}
+        )
+
+
+def published_count(category_id):
+    return Announcement.objects.filter(category_id=category_id, is_published=True).count()
+
+
+def category_payload():
+    return [
+        {
+            'id': row.category.id,
+            'name': row.category.name,
+            'slug': row.category.slug,
+            'color': row.category.color,
+            'count': row.announcement_count
+        }
+        for row in CategoryStats.objects.filter(category__is_active=True).select_related('category').order_by('category__name')
+    ]
+
+
+def hashtag_payload():
+    popular = Hashtag.objects.filter(usage_count__gt=0).order_by('-usage_count', 'name')[:POPULAR_HASHTAGS]
+    return list(popular.values('id', 'name', 'usage_count'))
+
+
+@transaction.atomic
+def rebuild():
+    stats, _ = AnnouncementStats.objects.select_for_update().get_or_create(pk=STATS_PK)
+    stats.total_announcements = Announcement.objects.filter(is_published=True).count()
+    stats.total_comments = Comment.objects.count()
+    stats.total_likes = AnnouncementLike.objects.count()
+    stats.total_categories = Category.objects.filter(is_active=True).count()
+    stats.total_hashtags = Hashtag.objects.count()
+    # The shard deltas are part of the counts above
+    AnnouncementStatsShard.objects.all().delete()
+    
+    # Per-category counts in one grouped query
+    counts = dict(
+        Announcement.objects.filter(is_published=True, category__isnull=False)
+        .values_list('category').annotate(total=Count('id')).order_by()
+    )
+    CategoryStats.objects.all().delete()
+    CategoryStats.objects.bulk_create([
+        CategoryStats(category_id=category_id, announcement_count=counts.get(category_id, 0))
+        for category_id in Category.objects.values_list('id', flat=True)
+    ])
+    stats.category_stats = category_payload()
+    stats.popular_hashtags = hashtag_payload()
+    stats.save()
+    return stats
+
+
+def current_stats():
+    """The stats row with the shard deltas folded in, in one query."""
+    stats = AnnouncementStats.objects.filter(pk=STATS_PK).annotate(
+        pending_comments=Coalesce(over_shards('SUM', 'total_comments'), 0),
+        pending_likes=Coalesce(over_shards('SUM', 'total_likes'), 0),
+    ).first()
+    if stats is None:
+        return rebuild()
+    stats.total_comments += stats.pending_comments
+    stats.total_likes += stats.pending_likes
+    return stats
@@ -1,3 +1,1205 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import json
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+import msgpack
+from PIL import Image
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import close_old_connections, connection
+from django.http import FileResponse, Http404, HttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from backend import media
+from backend.middleware import CompressionMiddleware
+from backend.renderers import ORJSONRenderer
+from backend.storage import is_hashed, is_hashed_static
+from users import activity
+from users.models import User
+from . import events
+from .counters import bump_likes, rollup_like_shards
+from .models import Announcement, AnnouncementChange, AnnouncementLike, Category, Comment, Hashtag
+from .serializers import AnnouncementCreateUpdateSerializer, AnnouncementSerializer, resolve_hashtags
+from .views import AnnouncementListCreateView
+
+
+def create_author(**fields):
+    return User.objects.create_user(**{
+        'username': 'author', 'email': 'author@example.com', 'password': 'secret123',
+        'first_name': 'Ann', 'last_name': 'Author', **fields
+    })
+
+
+class AuthorTestCase(TestCase):
+    """Starts each test with an author (self.user) and an anonymous API client."""
+    author_fields = {}
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_author(**self.author_fields)
+
+
+class AnnouncementFeedQueryTests(AuthorTestCase):
+    def setUp(self):
+        super().setUp()
+        self.category = Category.objects.create(name='General', slug='general')
+        self.tags = [Hashtag.objects.create(name=f'tag{i}', slug=f'tag{i}') for i in range(3)]
+
+    def create_announcements(self, count):
+        for i in range(count):
+            announcement = Announcement.objects.create(
+                title=f'Announcement {i}', description='Body',
+                author=self.user, category=self.category
+            )
+            announcement.hashtags.set(self.tags)
+            Comment.objects.create(announcement=announcement, author=self.user, content='Hi')
+
+    def count_list_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('announcement-list-create'))
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response
+
+    def test_feed_query_count_is_constant(self):
+        self.create_announcements(2)
+        small, _ = self.count_list_queries()
+        self.create_announcements(8)
+        large, response = self.count_list_queries()
+        self.assertEqual(small, large)
+        first = response.data['results'][0]
+        self.assertEqual(first['comments_count'], 1)
+        self.assertEqual(sorted(first['hashtag_list']), ['tag0', 'tag1', 'tag2'])
+
+    def test_detail_query_count_is_constant(self):
+        self.create_announcements(1)
+        announcement = Announcement.objects.get()
+        url = reverse('announcement-detail', args=[announcement.id])
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(url)
+        before = len(ctx.captured_queries)
+        for _ in range(5):
+            Comment.objects.create(announcement=announcement, author=self.user, content='More')
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(before, len(ctx.captured_queries))
+        self.assertEqual(response.data['comments_count'], 6)
+
+
+class KeysetPaginationTests(AuthorTestCase):
+    def setUp(self):
+        super().setUp()
+        for i in range(25):
+            Announcement.objects.create(
+                title=f'Announcement {i}', description='Body',
+                author=self.user, is_pinned=(i % 7 == 0)
+            )
+
+    def walk(self, url):
+        seen = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            seen.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+        return seen
+
+    def test_cursor_pages_cover_feed_in_order(self):
+        seen = self.walk(reverse('announcement-list-create') + '?paginate=cursor')
+        expected = list(
+            Announcement.objects.order_by('-is_pinned', '-timestamp', '-id').values_list('id', flat=True)
+        )
+        self.assertEqual(seen, expected)
+
+    def test_cursor_pages_follow_requested_ordering(self):
+        totals = {}
+        for announcement in Announcement.objects.all():
+            Announcement.objects.filter(id=announcement.id).update(likes=announcement.id % 4)
+            # Shard deltas not yet rolled up count towards the order too
+            bump_likes(announcement.id, announcement.id % 3)
+            totals[announcement.id] = announcement.id % 4 + announcement.id % 3
+        seen = self.walk(reverse('announcement-list-create') + '?paginate=cursor&ordering=-likes')
+        self.assertEqual(seen, sorted(totals, key=lambda id: (-totals[id], -id)))
+
+        response = self.client.get(reverse('announcement-list-create') + '?ordering=likes')
+        likes = [row['likes'] for row in response.data['results']]
+        self.assertEqual(likes, sorted(totals.values())[:len(likes)])
+
+    def test_cursor_cannot_page_by_search_rank(self):
+        response = self.client.get(reverse('announcement-list-create') + '?paginate=cursor&search=announcement')
+        self.assertEqual(response.status_code, 400)
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get(reverse('announcement-list-create') + '?cursor=bogus')
+        self.assertEqual(response.status_code, 404)
+
+    def test_page_number_mode_is_default(self):
+        response = self.client.get(reverse('announcement-list-create'))
+        self.assertEqual(response.data['count'], 25)
+
+
+class FullTextSearchTests(AuthorTestCase):
+    def setUp(self):
+        super().setUp()
+        self.exam = Announcement.objects.create(
+            title='Exam timetable released', description='Semester exams begin on Monday.',
+            author=self.user
+        )
+        self.sports = Announcement.objects.create(
+            title='Sports day', description='Football and netball finals, exams are over.',
+            author=self.user
+        )
+        self.sports.hashtags.set([Hashtag.objects.create(name='athletics', slug='athletics')])
+
+    def search(self, query):
+        response = self.client.get(reverse('announcement-list-create'), {'search': query})
+        self.assertEqual(response.status_code, 200)
+        return response.data['results']
+
+    def test_results_are_ranked_and_highlighted(self):
+        results = self.search('exam')
+        self.assertEqual([row['id'] for row in results], [self.exam.id, self.sports.id])
+        self.assertIn('<mark>', results[0]['search_snippet'])
+
+    def test_index_follows_hashtags_author_and_deletes(self):
+        self.assertEqual([row['id'] for row in self.search('athletics')], [self.sports.id])
+        self.user.first_name = 'Zawadi'
+        self.user.save()
+        self.assertEqual(len(self.search('zawadi')), 2)
+        self.sports.delete()
+        self.assertEqual(self.search('athletics'), [])
+
+    def test_rank_and_snippet_are_computed_only_for_page_rows(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.search('exam')
+        searched = [q['sql'] for q in queries if 'MATCH' in q['sql']]
+        # validators aggregate, page COUNT, page rows
+        self.assertEqual(len(searched), 3)
+        self.assertTrue(all(sql.count('MATCH') == 1 for sql in searched))
+        self.assertEqual(len([sql for sql in searched if 'bm25' in sql]), 1)
+
+    def test_operators_in_query_are_treated_as_words(self):
+        self.assertEqual([row['id'] for row in self.search('"timetable* -(')], [self.exam.id])
+
+
+class HashtagUsageCountTests(AuthorTestCase):
+    def setUp(self):
+        super().setUp()
+        self.a, self.b, self.c = [Hashtag.objects.create(name=n, slug=n) for n in ('a', 'b', 'c')]
+        self.post = Announcement.objects.create(title='Post', description='Body', author=self.user)
+
+    def counts(self):
+        return dict(Hashtag.objects.values_list('name', 'usage_count'))
+
+    def test_counts_follow_m2m_changes(self):
+        self.post.hashtags.set([self.a, self.b])
+        other = Announcement.objects.create(title='Other', description='Body', author=self.user)
+        other.hashtags.add(self.a)
+        self.assertEqual(self.counts(), {'a': 2, 'b': 1, 'c': 0})
+
+        self.post.hashtags.set([self.b, self.c])
+        self.post.hashtags.remove(self.a)  # no longer linked; must not decrement
+        self.assertEqual(self.counts(), {'a': 1, 'b': 1, 'c': 1})
+
+        self.c.announcements.add(other)
+        self.post.delete()
+        self.assertEqual(self.counts(), {'a': 1, 'b': 0, 'c': 1})
+
+        other.hashtags.clear()
+        self.assertEqual(self.counts(), {'a': 0, 'b': 0, 'c': 0})
+
+    def test_recount_command_repairs_drift(self):
+        self.post.hashtags.set([self.a, self.b])
+        Hashtag.objects.update(usage_count=7)
+        call_command('recount_hashtags', stdout=StringIO())
+        self.assertEqual(self.counts(), {'a': 1, 'b': 1, 'c': 0})
+
+    def test_names_clashing_on_slug_are_rejected(self):
+        Hashtag.objects.create(name='exam-results', slug='exam-results')
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.post(reverse('announcement-list-create'), {
+            'title': 'Clash', 'description': 'Body', 'hashtag_names': ['a', 'exam results']
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('exam results', response.data['hashtag_names'][0])
+        self.assertFalse(Announcement.objects.filter(title='Clash').exists())
+        with self.assertRaises(ValidationError):
+            resolve_hashtags(['new tag', 'new-tag'])
+
+
+class LikeTests(TestCase):
+    def setUp(self):
+        # Likes buffer activity once their callbacks run; start and end with an empty queue
+        activity.buffer.take()
+        self.addCleanup(activity.buffer.take)
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='fan', email='fan@example.com', password='secret123',
+            first_name='Fan', last_name='User'
+        )
+        self.client.force_authenticate(self.user)
+        self.post = Announcement.objects.create(title='Post', description='Body', author=self.user)
+        self.url = reverse('toggle-like', args=[self.post.id])
+
+    def test_like_and_unlike_are_idempotent(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.post(self.url).data['likes'], 1)
+            response = self.client.post(self.url)
+            self.assertEqual((response.data['likes'], response.data['changed']), (1, False))
+            self.assertEqual(self.client.delete(self.url).data['likes'], 0)
+            response = self.client.delete(self.url)
+            self.assertEqual((response.data['likes'], response.data['changed']), (0, False))
+        # Activity is buffered off the request path
+        activity.flush()
+        self.assertEqual(self.user.activities.filter(type='like').count(), 1)
+
+    def test_missing_announcement(self):
+        url = reverse('toggle-like', args=[self.post.id + 100])
+        self.assertEqual(self.client.post(url).status_code, 404)
+        self.assertEqual(self.client.delete(url).status_code, 404)
+        self.assertFalse(AnnouncementLike.objects.exists())
+
+
+@override_settings(ACTIVITY_FLUSH_SECONDS=0)
+class LikeConcurrencyTests(TransactionTestCase):
+    clients = 6
+    rounds = 10
+    attempts = 50
+
+    def setUp(self):
+        # Really committed, so activity is buffered; keep it and any spool to this test
+        activity.buffer.take()
+        self.spool = tempfile.mkdtemp()
+        self.settings_override = override_settings(ACTIVITY_SPOOL_DIR=self.spool)
+        self.settings_override.enable()
+        self.author = create_author()
+        self.post = Announcement.objects.create(title='Hot post', description='Body', author=self.author)
+        self.users = [
+            User.objects.create_user(
+                username=f'fan{i}', email=f'fan{i}@example.com', password='secret123',
+                first_name='Fan', last_name=str(i)
+            )
+            for i in range(self.clients)
+        ]
+
+    def tearDown(self):
+        activity.buffer.take()
+        self.settings_override.disable()
+        shutil.rmtree(self.spool, ignore_errors=True)
+
+    def hammer(self, user, errors, statuses):
+        client = APIClient()
+        # Collect what a real client would get instead of re-raising in the thread
+        client.raise_request_exception = False
+        client.force_authenticate(user)
+        url = reverse('toggle-like', args=[self.post.id])
+        try:
+            for _ in range(self.rounds):
+                send = client.post if random.random() < 0.6 else client.delete
+                for _attempt in range(self.attempts):
+                    response = send(url)
+                    statuses.append(response.status_code)
+                    if response.status_code != 503:
+                        break
+                    # SQLite rejects concurrent writers outright ("database is locked");
+                    # back off and retry like a client honouring Retry-After would
+                    if 'Retry-After' not in response.headers:
+                        errors.append('no Retry-After')
+                    time.sleep(random.uniform(0, 0.02))
+                else:
+                    errors.append('locked')
+                    continue
+                if response.status_code != 200:
+                    errors.append(response.status_code)
+        finally:
+            close_old_connections()
+
+    def test_counter_stays_exact_under_parallel_clients(self):
+        errors, statuses = [], []
+        threads = [threading.Thread(target=self.hammer, args=(user, errors, statuses)) for user in self.users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        # Every request either succeeded or was told to come back; nothing else reaches clients
+        self.assertLessEqual(set(statuses), {200, 503})
+        expected = AnnouncementLike.objects.filter(announcement=self.post).count()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.total_likes, expected)
+        rollup_like_shards()
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.likes, self.post.total_likes), (expected, expected))
+
+
+class LikeShardTests(TestCase):
+    def setUp(self):
+        self.author = create_author()
+        self.post = Announcement.objects.create(title='Post', description='Body', author=self.author)
+
+    def test_feed_shows_rolled_up_plus_pending_likes(self):
+        for i in range(5):
+            fan = User.objects.create_user(
+                username=f'fan{i}', email=f'fan{i}@example.com', password='secret123',
+                first_name='Fan', last_name=str(i)
+            )
+            client = APIClient()
+            client.force_authenticate(fan)
+            client.post(reverse('toggle-like', args=[self.post.id]))
+        feed = APIClient().get(reverse('announcement-list-create')).data['results']
+        self.assertEqual(feed[0]['likes'], 5)
+
+        self.assertEqual(rollup_like_shards(), 1)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes, 5)
+        self.assertFalse(self.post.like_shards.exclude(count=0).exists())
+        feed = APIClient().get(reverse('announcement-list-create')).data['results']
+        self.assertEqual(feed[0]['likes'], 5)
+
+    def test_edits_do_not_write_back_stale_likes(self):
+        stale = Announcement.objects.get(id=self.post.id)
+        # A roll-up lands between reading the row and saving the edit
+        Announcement.objects.filter(id=self.post.id).update(likes=5)
+        serializer = AnnouncementCreateUpdateSerializer(stale, data={'title': 'Edited'}, partial=True)
+        self.assertTrue(serializer.is_valid())
+        serializer.save()
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.title, self.post.likes), ('Edited', 5))
+
+    def test_pinning_does_not_write_likes(self):
+        self.author.role = 'admin'
+        self.author.save()
+        client = APIClient()
+        client.force_authenticate(self.author)
+        with CaptureQueriesContext(connection) as queries:
+            response = client.post(reverse('toggle-pin', args=[self.post.id]))
+        self.assertTrue(response.data['is_pinned'])
+        updates = [q['sql'] for q in queries if q['sql'].startswith('UPDATE "announcements_announcement"')]
+        self.assertTrue(updates)
+        self.assertFalse([sql for sql in updates if '"likes"' in sql])
+
+
+class MaterializedStatsTests(AuthorTestCase):
+    def setUp(self):
+        super().setUp()
+        self.news = Category.objects.create(name='News', slug='news')
+        self.sport = Category.objects.create(name='Sport', slug='sport')
+        Announcement.objects.create(title='Seed', description='Body', author=self.user, category=self.news)
+        # Stats start materialized; everything below must be applied as deltas
+        self.client.get(reverse('announcement-stats'))
+
+    def fetch(self):
+        response = self.client.get(reverse('announcement-stats'))
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_deltas_match_a_full_rebuild(self):
+        post = Announcement.objects.create(title='Post', description='Body', author=self.user, category=self.news)
+        draft = Announcement.objects.create(
+            title='Draft', description='Body', author=self.user, category=self.news, is_published=False
+        )
+        Comment.objects.create(announcement=post, author=self.user, content='Hi')
+        AnnouncementLike.objects.create(announcement=post, user=self.user)
+        post.hashtags.add(*resolve_hashtags(['exams', 'fees']))
+        post.category = self.sport
+        post.save()
+        draft.is_published = True
+        draft.save()
+        self.sport.is_active = False
+        self.sport.save()
+        Announcement.objects.get(title='Seed').delete()
+
+        incremental = self.fetch()
+        call_command('rebuild_announcement_stats', stdout=StringIO())
+        self.assertEqual(incremental, self.fetch())
+        self.assertEqual(incremental['total_announcements'], 2)
+        self.assertEqual(incremental['total_hashtags'], 2)
+        self.assertEqual([row['count'] for row in incremental['category_stats']], [1])
+
+    def add_reactions(self, post, count):
+        fans = [
+            create_author(username=f'fan{post.id}-{i}', email=f'fan{post.id}-{i}@example.com')
+            for i in range(count)
+        ]
+        Comment.objects.bulk_create(Comment(announcement=post, author=fan, content='Hi') for fan in fans)
+        AnnouncementLike.objects.bulk_create(AnnouncementLike(announcement=post, user=fan) for fan in fans)
+        bump_likes(post.id, count)
+        return fans
+
+    def test_cascaded_deletes_apply_one_delta(self):
+        def delete_cost(count):
+            post = Announcement.objects.create(title=f'Post {count}', description='Body', author=self.user)
+            self.add_reactions(post, count)
+            call_command('rebuild_announcement_stats', stdout=StringIO())
+            with CaptureQueriesContext(connection) as queries:
+                post.delete()
+            return len(queries)
+
+        self.assertEqual(delete_cost(2), delete_cost(20))
+        incremental = self.fetch()
+        call_command('rebuild_announcement_stats', stdout=StringIO())
+        self.assertEqual(incremental, self.fetch())
+
+    def test_deleting_a_user_removes_their_reactions_everywhere(self):
+        fan = self.add_reactions(Announcement.objects.get(title='Seed'), 2)[0]
+        own = Announcement.objects.create(title='Own', description='Body', author=fan)
+        Comment.objects.create(announcement=own, author=fan, content='Mine')
+        AnnouncementLike.objects.create(announcement=own, user=self.user)
+        # bulk_create() above sent no signals
+        call_command('rebuild_announcement_stats', stdout=StringIO())
+        fan.delete()
+        incremental = self.fetch()
+        call_command('rebuild_announcement_stats', stdout=StringIO())
+        self.assertEqual(incremental, self.fetch())
+        self.assertEqual((incremental['total_comments'], incremental['total_likes']), (1, 1))
+        rollup_like_shards()
+        self.assertEqual(Announcement.objects.get(title='Seed').likes, 1)
+
+    def test_endpoint_query_count_is_constant(self):
+        for i in range(5):
+            Category.objects.create(name=f'Extra {i}', slug=f'extra-{i}')
+        with self.assertNumQueries(1):
+            self.fetch()
+
+    def test_comments_and_likes_do_not_write_the_stats_row(self):
+        post = Announcement.objects.get(title='Seed')
+        with CaptureQueriesContext(connection) as queries:
+            Comment.objects.create(announcement=post, author=self.user, content='Hi')
+            AnnouncementLike.objects.create(announcement=post, user=self.user)
+        self.assertFalse([q for q in queries if 'announcementstats"' in q['sql'] and 'UPDATE' in q['sql']])
+        data = self.fetch()
+        self.assertEqual((data['total_comments'], data['total_likes']), (1, 1))
+
+
+class ConditionalGetTests(AuthorTestCase):
+    def setUp(self):
+        super().setUp()
+        self.post = Announcement.objects.create(title='Post', description='Body', author=self.user)
+        self.client.get(reverse('announcement-stats'))
+
+    def assert_revalidates(self, url, change):
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        etag = first.headers['ETag']
+        self.assertTrue(etag.startswith('W/'))
+        with self.assertNumQueries(2 if url.endswith('/announcements/') else 1):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_MODIFIED_SINCE=first.headers['Last-Modified']).status_code, 304
+        )
+        change()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_list_revalidates_and_sees_new_comments(self):
+        self.assert_revalidates(
+            reverse('announcement-list-create'),
+            lambda: Comment.objects.create(announcement=self.post, author=self.user, content='Hi')
+        )
+
+    def rename_author(self):
+        self.user.first_name = 'Renamed'
+        self.user.save()
+
+    def test_list_sees_author_profile_edits(self):
+        self.assert_revalidates(reverse('announcement-list-create'), self.rename_author)
+
+    def test_detail_sees_author_profile_edits(self):
+        self.assert_revalidates(reverse('announcement-detail', args=[self.post.id]), self.rename_author)
+
+    def test_detail_revalidates_and_sees_likes(self):
+        fan = APIClient()
+        fan.force_authenticate(self.user)
+        self.assert_revalidates(
+            reverse('announcement-detail', args=[self.post.id]),
+            lambda: fan.post(reverse('toggle-like', args=[self.post.id]))
+        )
+
+    def test_detail_sees_category_edits(self):
+        self.post.category = Category.objects.create(name='News', slug='news')
+        self.post.save()
+
+        def rename():
+            self.post.category.name = 'Renamed'
+            self.post.category.save()
+        self.assert_revalidates(reverse('announcement-detail', args=[self.post.id]), rename)
+
+    def test_detail_sees_hashtag_usage_from_other_posts(self):
+        tag = Hashtag.objects.create(name='news', slug='news')
+        self.post.hashtags.add(tag)
+        other = Announcement.objects.create(title='Other', description='Body', author=self.user)
+        self.assert_revalidates(
+            reverse('announcement-detail', args=[self.post.id]), lambda: other.hashtags.add(tag)
+        )
+
+
+class DetailCommentsTests(AuthorTestCase):
+    def setUp(self):
+        super().setUp()
+        self.post = Announcement.objects.create(title='Post', description='Body', author=self.user)
+        self.url = reverse('announcement-detail', args=[self.post.id])
+
+    def test_detail_embeds_head_of_thread_with_cursor_to_rest(self):
+        limit = AnnouncementSerializer.comments_limit
+        comments = [
+            Comment.objects.create(announcement=self.post, author=self.user, content=str(i))
+            for i in range(limit + 5)
+        ]
+        data = self.client.get(self.url).data
+        self.assertEqual([c['id'] for c in data['comments']], [c.id for c in comments[:limit]])
+        self.assertEqual(data['comments_count'], limit + 5)
+        rest = self.client.get(data['comments_next']).data
+        self.assertEqual([c['id'] for c in rest['results']], [c.id for c in comments[limit:]])
+        self.assertIsNone(rest['next'])
+
+    def test_short_thread_has_no_cursor(self):
+        Comment.objects.create(announcement=self.post, author=self.user, content='Only')
+        data = self.client.get(self.url).data
+        self.assertEqual(len(data['comments']), 1)
+        self.assertIsNone(data['comments_next'])
+
+
+class IncrementalCommentsTests(AuthorTestCase):
+    def setUp(self):
+        super().setUp()
+        self.post = Announcement.objects.create(title='Post', description='Body', author=self.user)
+        self.comments = [
+            Comment.objects.create(announcement=self.post, author=self.user, content=str(i)) for i in range(6)
+        ]
+        self.url = reverse('comment-list-create', args=[self.post.id])
+
+    def test_after_id_returns_only_newer_comments_in_one_query(self):
+        with self.assertNumQueries(1):
+            data = self.client.get(self.url, {'after_id': self.comments[3].id}).data
+        self.assertNotIn('count', data)
+        self.assertEqual([c['id'] for c in data['results']], [c.id for c in self.comments[4:]])
+        self.assertEqual(data['results'][0]['author']['firstName'], 'Ann')
+
+    def test_since_filters_by_timestamp(self):
+        since = self.comments[2].timestamp.isoformat()
+        data = self.client.get(self.url, {'since': since}).data
+        self.assertEqual([c['id'] for c in data['results']], [c.id for c in self.comments[3:]])
+
+    def test_invalid_since_is_rejected(self):
+        self.assertEqual(self.client.get(self.url, {'since': 'yesterday'}).status_code, 400)
+
+
+class SparseFieldsetTests(AuthorTestCase):
+    def setUp(self):
+        super().setUp()
+        category = Category.objects.create(name='General', slug='general')
+        for i in range(3):
+            post = Announcement.objects.create(
+                title=f'Post {i}', description='Long body', author=self.user, category=category
+            )
+            post.hashtags.add(*resolve_hashtags(['news']))
+
+    def test_fields_limit_output_and_queryset(self):
+        url = reverse('announcement-list-create')
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, {'fields': 'id,title,comments_count'})
+        rows = response.data['results']
+        self.assertEqual(set(rows[0]), {'id', 'title', 'comments_count'})
+        feed_sql = ctx.captured_queries[-1]['sql']
+        self.assertNotIn('"description"', feed_sql)
+        self.assertNotIn('users_user', feed_sql)
+        self.assertFalse(any('announcements_hashtag' in q['sql'] for q in ctx.captured_queries))
+
+    def test_unexpanded_relations_collapse_to_ids(self):
+        response = self.client.get(reverse('announcement-list-create'), {'expand': 'category'})
+        row = response.data['results'][0]
+        self.assertEqual(row['author'], self.user.id)
+        self.assertEqual(row['category']['slug'], 'general')
+        self.assertEqual(row['hashtags'], [Hashtag.objects.get().id])
+
+    def test_detail_supports_fieldsets(self):
+        post = Announcement.objects.first()
+        response = self.client.get(reverse('announcement-detail', args=[post.id]), {'fields': 'id,likes'})
+        self.assertEqual(response.data, {'id': post.id, 'likes': 0})
+
+
+class FeedFastPathTests(AuthorTestCase):
+    def setUp(self):
+        super().setUp()
+        User.objects.filter(pk=self.user.pk).update(avatar='avatars/ann.png')
+        category = Category.objects.create(name='General', slug='general')
+        for i in range(12):
+            post = Announcement.objects.create(
+                title=f'Post {i}', description='Body', author=self.user,
+                category=category if i % 2 else None, is_pinned=i == 2
+            )
+            post.hashtags.add(*resolve_hashtags(['news', f'tag{i}']))
+            Comment.objects.create(announcement=post, author=self.user, content='Hi')
+        Announcement.objects.filter(title='Post 1').update(media='announcements/photo.jpg')
+        bump_likes(Announcement.objects.get(title='Post 3').id, 2)
+
+    def get_both(self, params=None):
+        url = reverse('announcement-list-create')
+        fast = self.client.get(url, params)
+        with mock.patch.object(AnnouncementListCreateView, 'fast_path', False):
+            slow = self.client.get(url, params)
+        return fast, slow
+
+    def test_fast_path_matches_serializer_output(self):
+        fast, slow = self.get_both()
+        self.assertEqual(fast.content, slow.content)
+        self.assertEqual(fast['ETag'], slow['ETag'])
+
+    def test_fast_path_matches_on_later_pages(self):
+        first = self.client.get(reverse('announcement-list-create'), {'paginate': 'cursor'})
+        cursor = first.data['next'].split('cursor=')[1]
+        fast, slow = self.get_both({'cursor': cursor})
+        self.assertEqual(fast.content, slow.content)
+
+    def test_fast_path_skips_per_row_queries(self):
+        # validators (2), count, feed rows, hashtags
+        with self.assertNumQueries(5):
+            self.client.get(reverse('announcement-list-create'))
+
+
+class RendererTests(AuthorTestCase):
+    author_fields = {'first_name': 'Zoë'}
+
+    def setUp(self):
+        super().setUp()
+        self.post = Announcement.objects.create(
+            title='Ünïcode\u2028line', description='Body', author=self.user
+        )
+        self.post.hashtags.add(*resolve_hashtags(['news']))
+
+    def test_orjson_output_matches_drf_json(self):
+        response = self.client.get(reverse('announcement-list-create'))
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(response.content, JSONRenderer().render(response.data))
+
+    def test_orjson_encodes_non_json_types_like_drf(self):
+        data = {
+            'when': timezone.now(),
+            'day': date(2024, 1, 31),
+            'price': Decimal('12.50'),
+            'label': gettext_lazy('Published'),
+            'ids': Announcement.objects.values_list('id', flat=True),
+            1: 'numeric key',
+        }
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_msgpack_is_negotiated_from_accept(self):
+        url = reverse('announcement-list-create')
+        as_json = self.client.get(url)
+        packed = self.client.get(url, HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(packed['Content-Type'], 'application/msgpack')
+        self.assertEqual(msgpack.unpackb(packed.content), json.loads(as_json.content))
+        self.assertNotEqual(packed['ETag'], as_json['ETag'])
+        self.assertIn('Accept', packed['Vary'])
+
+    def test_msgpack_request_bodies_are_parsed(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.post(
+            reverse('comment-list-create', args=[self.post.id]),
+            msgpack.packb({'content': 'Packed hello'}), content_type='application/msgpack'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(Comment.objects.filter(content='Packed hello').exists())
+
+    def test_malformed_json_is_a_400(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.post(
+            reverse('comment-list-create', args=[self.post.id]), '{"content": ', content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class CompressionTests(AuthorTestCase):
+    def setUp(self):
+        super().setUp()
+        for i in range(10):
+            Announcement.objects.create(title=f'Post {i}', description='Body text ' * 20, author=self.user)
+        self.url = reverse('announcement-list-create')
+
+    def test_feed_is_gzipped_for_clients_that_accept_it(self):
+        plain = self.client.get(self.url)
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='br;q=0, gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        self.assertEqual(int(response['X-Compression-Saved']), len(plain.content) - len(response.content))
+
+    def test_refused_or_missing_encodings_are_sent_plain(self):
+        for header in ('', 'gzip;q=0', 'identity'):
+            response = self.client.get(self.url, HTTP_ACCEPT_ENCODING=header)
+            self.assertFalse(response.has_header('Content-Encoding'), header)
+            self.assertIn('Accept-Encoding', response['Vary'])
+
+    def test_small_bodies_are_not_compressed(self):
+        response = self.client.get(reverse('announcement-stats'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertLess(len(response.content), 512)
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_conditional_get_still_matches_compressed_etag(self):
+        first = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(first['Content-Encoding'], 'gzip')
+        second = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 304)
+
+    def test_only_allowlisted_and_unencoded_types_are_compressed(self):
+        middleware = CompressionMiddleware(lambda request: None)
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip')
+        image = HttpResponse(b'\x89PNG' * 500, content_type='image/png')
+        self.assertFalse(middleware.process_response(request, image).has_header('Content-Encoding'))
+        encoded = HttpResponse(b'x' * 2000, content_type='application/json', headers={'Content-Encoding': 'br'})
+        self.assertEqual(middleware.process_response(request, encoded).content, b'x' * 2000)
+        strong = HttpResponse(b'x' * 2000, content_type='application/json', headers={'ETag': '"abc"'})
+        self.assertEqual(middleware.process_response(request, strong)['ETag'], 'W/"abc"')
+
+    def test_brotli_is_preferred_when_available(self):
+        fake_brotli = mock.Mock(compress=lambda content, quality: b'br:' + gzip.compress(content))
+        with mock.patch('backend.middleware.brotli', fake_brotli):
+            response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertTrue(response.content.startswith(b'br:'))
+
+    def test_requests_with_credentials_are_gzipped_instead_of_brotli(self):
+        middleware = CompressionMiddleware(lambda request: None)
+        factory = RequestFactory(HTTP_ACCEPT_ENCODING='gzip, br')
+        signed_in = factory.get('/', HTTP_AUTHORIZATION='Token abc')
+        with_cookie = factory.get('/')
+        with_cookie.COOKIES['sessionid'] = 'abc'
+        with mock.patch('backend.middleware.brotli', mock.Mock()):
+            self.assertEqual(middleware.choose_encoding(factory.get('/')), 'br')
+            for request in (signed_in, with_cookie):
+                response = HttpResponse(b'{"secret": 1}' * 100, content_type='application/json')
+                self.assertEqual(middleware.process_response(request, response)['Content-Encoding'], 'gzip')
+
+
+@override_settings(IMAGE_DERIVATIVES_ASYNC=False, IMAGE_DERIVATIVE_WIDTHS=[320, 640, 1280])
+class ImageDerivativeTests(AuthorTestCase):
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def photo(self, size=(800, 400), orientation=None):
+        exif = Image.Exif()
+        exif[0x010F] = 'PhoneMaker'
+        if orientation:
+            exif[0x0112] = orientation
+        buffer = BytesIO()
+        Image.new('RGB', size, 'red').save(buffer, 'JPEG', exif=exif)
+        return SimpleUploadedFile('photo.jpg', buffer.getvalue(), content_type='image/jpeg')
+
+    def create_post(self, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            post = Announcement.objects.create(title='Photo', description='Body', author=self.user, **kwargs)
+        post.refresh_from_db()
+        return post
+
+    def open_derivative(self, path):
+        return Image.open(default_storage.open(path))
+
+    def test_upload_generates_resized_stripped_derivatives(self):
+        post = self.create_post(media=self.photo())
+        manifest = post.media_variants
+        self.assertEqual(manifest['source'], post.media.name)
+        # Never upscaled past the 800px original
+        self.assertEqual(list(manifest['webp']), ['320w', '640w', '800w'])
+        self.assertEqual(list(manifest['jpeg']), ['320w', '640w', '800w'])
+        small = self.open_derivative(manifest['jpeg']['320w'])
+        self.assertEqual(small.size, (320, 160))
+        self.assertEqual(len(small.getexif()), 0)
+        self.assertEqual(self.open_derivative(manifest['webp']['640w']).format, 'WEBP')
+
+    def test_exif_orientation_is_applied(self):
+        post = self.create_post(media=self.photo(orientation=6))
+        self.assertEqual(self.open_derivative(post.media_variants['jpeg']['400w']).size, (400, 800))
+
+    def test_api_exposes_absolute_urls_and_hides_stale_manifests(self):
+        post = self.create_post(media=self.photo())
+        url = reverse('announcement-detail', args=[post.id])
+        variants = APIClient().get(url).data['media_variants']
+        self.assertTrue(variants['webp']['320w'].startswith('http://testserver/'))
+        self.assertTrue(variants['webp']['320w'].endswith('.webp'))
+
+        Announcement.objects.filter(pk=post.pk).update(media='announcements/replaced.jpg')
+        self.assertEqual(APIClient().get(url).data['media_variants'], {})
+
+    def test_backfill_command_processes_existing_media(self):
+        post = self.create_post()
+        name = default_storage.save('announcements/old.jpg', self.photo())
+        Announcement.objects.filter(pk=post.pk).update(media=name)
+        out = StringIO()
+        call_command('generate_image_derivatives', workers=1, stdout=out)
+        post.refresh_from_db()
+        self.assertEqual(post.media_variants['source'], name)
+        self.assertIn('1 images', out.getvalue())
+
+
+class ContentAddressedStorageTests(AuthorTestCase):
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_identical_uploads_are_stored_once(self):
+        first = Announcement.objects.create(
+            title='A', description='Body', author=self.user,
+            media=SimpleUploadedFile('poster.JPG', b'same bytes')
+        )
+        second = Announcement.objects.create(
+            title='B', description='Body', author=self.user,
+            media=SimpleUploadedFile('copy-of-poster.jpg', b'same bytes')
+        )
+        other = default_storage.save('announcements/other.jpg', ContentFile(b'other bytes'))
+        self.assertEqual(first.media.name, second.media.name)
+        self.assertTrue(is_hashed(first.media.name))
+        self.assertTrue(first.media.name.endswith('.jpg'))
+        self.assertNotEqual(other, first.media.name)
+        self.assertEqual(len(os.listdir(os.path.dirname(first.media.path))), 1)
+
+    def test_shared_files_survive_delete(self):
+        name = default_storage.save('avatars/me.png', ContentFile(b'avatar'))
+        default_storage.delete(name)
+        self.assertTrue(default_storage.exists(name))
+
+    def test_hashed_media_is_served_as_immutable(self):
+        name = default_storage.save('avatars/me.png', ContentFile(b'avatar'))
+        request = RequestFactory().get('/media/' + name)
+        response = media.serve(request, name, document_root=self.media_root)
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+
+    def test_dedupe_media_rehashes_legacy_files(self):
+        legacy = FileSystemStorage()
+        for name in ('announcements/a.jpg', 'announcements/b.jpg'):
+            legacy.save(name, ContentFile(b'poster'))
+        for title, name in (('A', 'announcements/a.jpg'), ('B', 'announcements/b.jpg')):
+            Announcement.objects.create(title=title, description='Body', author=self.user, media=name)
+        orphan = default_storage.save('announcements/orphan.jpg', ContentFile(b'orphan'))
+
+        out = StringIO()
+        call_command('dedupe_media', '--prune', stdout=out)
+        names = set(Announcement.objects.values_list('media', flat=True))
+        self.assertEqual(len(names), 1)
+        self.assertTrue(is_hashed(names.pop()))
+        self.assertFalse(legacy.exists('announcements/a.jpg'))
+        self.assertFalse(default_storage.exists(orphan))
+        self.assertIn('2 files rehashed into 1 (1 duplicates)', out.getvalue())
+
+
+class MediaServingTests(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        os.makedirs(os.path.join(self.root, 'leaders'))
+        with open(os.path.join(self.root, 'leaders', 'report.txt'), 'wb') as file:
+            file.write(b'0123456789')
+        self.factory = RequestFactory()
+
+    def get(self, path='leaders/report.txt', **headers):
+        request = self.factory.get('/media/' + path, **headers)
+        return media.serve(request, path, document_root=self.root)
+
+    def body(self, response):
+        content = b''.join(response.streaming_content)
+        response.close()
+        return content
+
+    def test_full_file_is_streamed_with_validators(self):
+        response = self.get()
+        self.assertIsInstance(response, FileResponse)
+        self.assertEqual(self.body(response), b'0123456789')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=86400')
+        self.assertTrue(response.has_header('Last-Modified'))
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_byte_ranges(self):
+        response = self.get(HTTP_RANGE='bytes=2-5')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 2-5/10')
+        self.assertEqual(response['Content-Length'], '4')
+        self.assertEqual(self.body(response), b'2345')
+
+        self.assertEqual(self.body(self.get(HTTP_RANGE='bytes=-3')), b'789')
+        self.assertEqual(self.body(self.get(HTTP_RANGE='bytes=7-')), b'789')
+        unsatisfiable = self.get(HTTP_RANGE='bytes=20-30')
+        self.assertEqual(unsatisfiable.status_code, 416)
+        self.assertEqual(unsatisfiable['Content-Range'], 'bytes */10')
+
+    def test_stale_if_range_gets_the_whole_file(self):
+        response = self.get(HTTP_RANGE='bytes=2-5', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.body(response), b'0123456789')
+
+    @override_settings(FILE_SENDFILE='x-sendfile')
+    def test_x_sendfile_offload(self):
+        response = self.get()
+        self.assertEqual(response['X-Sendfile'], os.path.join(self.root, 'leaders', 'report.txt'))
+        self.assertEqual(response['Content-Type'], 'text/plain')
+        self.assertEqual(response.content, b'')
+
+    @override_settings(FILE_SENDFILE='x-accel-redirect', FILE_ACCEL_REDIRECT_PREFIX='/protected/')
+    def test_x_accel_redirect_offload(self):
+        self.assertEqual(self.get()['X-Accel-Redirect'], '/protected/media/leaders/report.txt')
+
+    def test_paths_outside_the_root_are_not_found(self):
+        for path in ('../secret.txt', 'leaders', 'missing.txt'):
+            with self.assertRaises(Http404):
+                self.get(path)
+
+
+class PrecompressedStaticTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.static_root = tempfile.mkdtemp()
+        cls.settings_override = override_settings(STATIC_ROOT=cls.static_root)
+        cls.settings_override.enable()
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings_override.disable()
+        shutil.rmtree(cls.static_root, ignore_errors=True)
+        super().tearDownClass()
+
+    def serve(self, path, **headers):
+        request = RequestFactory().get('/static/' + path, **headers)
+        return media.serve(
+            request, path, document_root=self.static_root, immutable=is_hashed_static, precompressed=True
+        )
+
+    def test_collectstatic_writes_hashed_and_compressed_files(self):
+        name = staticfiles_storage.stored_name('admin/css/base.css')
+        self.assertNotEqual(name, 'admin/css/base.css')
+        with staticfiles_storage.open(name) as original, staticfiles_storage.open(name + '.gz') as packed:
+            self.assertEqual(gzip.decompress(packed.read()), original.read())
+        # Below COMPRESSION_MIN_SIZE: not worth a sibling
+        small = staticfiles_storage.stored_name('admin/img/icon-yes.svg')
+        self.assertFalse(staticfiles_storage.exists(small + '.gz'))
+
+    def test_precompressed_variant_is_chosen_by_accept_encoding(self):
+        name = staticfiles_storage.stored_name('admin/css/base.css')
+        response = self.serve(name, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        with staticfiles_storage.open(name) as original:
+            self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), original.read())
+
+        plain = self.serve(name)
+        self.assertFalse(plain.has_header('Content-Encoding'))
+        self.assertNotEqual(plain['ETag'], response['ETag'])
+
+    def test_range_requests_and_unhashed_names_use_the_plain_file(self):
+        name = staticfiles_storage.stored_name('admin/css/base.css')
+        ranged = self.serve(name, HTTP_ACCEPT_ENCODING='gzip', HTTP_RANGE='bytes=0-9')
+        self.assertEqual(ranged.status_code, 206)
+        self.assertFalse(ranged.has_header('Content-Encoding'))
+        self.assertEqual(self.serve('admin/css/base.css')['Cache-Control'], 'public, max-age=86400')
+
+
+class LiveEventTests(AuthorTestCase):
+    def read(self, source, count, last_event_id=None, publish=()):
+        """The first ``count`` chunks of a stream, publishing ``publish`` once it is subscribed."""
+        async def collect():
+            body = events.stream(last_event_id, heartbeat=0.05, source=source)
+            chunks = [await body.__anext__()]
+            for name, data in publish:
+                source.publish(name, data)
+            while len(chunks) < count:
+                chunks.append(await body.__anext__())
+            await body.aclose()
+            return chunks
+        return asyncio.run(asyncio.wait_for(collect(), 5))
+
+    def test_live_events_reach_every_stream(self):
+        source = events.Broadcaster()
+        chunks = self.read(source, 3, publish=[('likes', {'id': 1, 'delta': 1}), ('comments', {'id': 1, 'delta': -1})])
+        self.assertEqual(chunks[0], 'retry: 3000\n\n')
+        self.assertEqual(chunks[1], f'id: {source.epoch}-1\nevent: likes\ndata: {{"id":1,"delta":1}}\n\n')
+        self.assertIn('event: comments', chunks[2])
+        # Streams unsubscribe when the client goes away
+        self.assertEqual(source.subscribers, set())
+
+    def test_reconnect_replays_missed_events(self):
+        source = events.Broadcaster(history_size=3)
+        for i in range(5):
+            source.publish('likes', {'id': i, 'delta': 1})
+        chunks = self.read(source, 3, last_event_id=f'{source.epoch}-3')
+        self.assertEqual([chunk.split('\n')[0] for chunk in chunks[1:]], [f'id: {source.epoch}-4', f'id: {source.epoch}-5'])
+
+        # Fell out of the buffer, or the id is from before a restart
+        for stale in (f'{source.epoch}-1', 'abc-4', 'garbage'):
+            self.assertEqual(self.read(source, 2, last_event_id=stale)[1], 'event: reset\ndata: {}\n\n')
+        self.assertEqual(self.read(source, 2)[1], ': keep-alive\n\n')
+
+    def test_overflowing_stream_is_reset(self):
+        source = events.Broadcaster()
+        with mock.patch.object(events, 'QUEUE_SIZE', 2):
+            chunks = self.read(source, 3, publish=[('likes', {'id': i, 'delta': 1}) for i in range(5)])
+        # The reset takes the place of the oldest queued event, then the stream ends
+        self.assertIn('"id":1', chunks[1])
+        self.assertEqual(chunks[2], 'event: reset\ndata: {}\n\n')
+
+    def test_writes_publish_after_commit(self):
+        published = []
+        with mock.patch.object(events.broadcaster, 'publish', lambda name, data: published.append((name, data))):
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                announcement = Announcement.objects.create(title='Hello', description='Body', author=self.user)
+            self.assertEqual(len(callbacks), 1)
+            with self.captureOnCommitCallbacks(execute=True):
+                announcement.is_pinned = True
+                announcement.save()
+                AnnouncementLike.objects.create(announcement=announcement, user=self.user)
+                Comment.objects.create(announcement=announcement, author=self.user, content='Hi').delete()
+                Announcement.objects.create(title='Draft', description='Body', author=self.user, is_published=False)
+            with self.captureOnCommitCallbacks(execute=True):
+                announcement.save()
+
+        self.assertEqual(published[0][0], 'announcement.created')
+        self.assertEqual(published[0][1]['title'], 'Hello')
+        self.assertEqual([event for event, _ in published[1:]], ['announcement.pinned', 'likes', 'comments', 'comments'])
+        self.assertEqual(published[1][1], {'id': announcement.id, 'is_pinned': True})
+        self.assertEqual([data['delta'] for _, data in published[3:]], [1, -1])
+
+    async def test_events_endpoint_streams_published_events(self):
+        response = await self.async_client.get(reverse('announcement-events'))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+        body = aiter(response.streaming_content)
+        # The first chunk means the stream has subscribed
+        self.assertEqual(await anext(body), b'retry: 3000\n\n')
+        events.broadcaster.publish('likes', {'id': 7, 'delta': 1})
+        chunk = await asyncio.wait_for(anext(body), 5)
+        self.assertIn(b'event: likes\ndata: {"id":7,"delta":1}', chunk)
+        # A client disconnect cancels the task sending the body, as ASGIHandler does
+        waiting = asyncio.ensure_future(anext(body))
+        await asyncio.sleep(0)
+        waiting.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await waiting
+        self.assertEqual(events.broadcaster.subscribers, set())
+
+    def test_events_endpoint_needs_asgi(self):
+        # Under WSGI the endless body would be buffered, never sent
+        response = self.client.get(reverse('announcement-events'))
+        self.assertEqual(response.status_code, 501)
+
+
+@override_settings(ANNOUNCEMENT_CHANGES_LAG_SECONDS=0)
+class DeltaSyncTests(AuthorTestCase):
+    def setUp(self):
+        super().setUp()
+        self.tag = Hashtag.objects.create(name='news', slug='news')
+        self.announcements = [
+            Announcement.objects.create(title=f'Announcement {i}', description='Body', author=self.user)
+            for i in range(3)
+        ]
+
+    def sync(self, since=None):
+        url = reverse('announcement-changes') + (f'?since={since}' if since is not None else '')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_full_sync_then_only_changes(self):
+        first = self.sync()
+        self.assertEqual([row['title'] for row in first['results']], ['Announcement 0', 'Announcement 1', 'Announcement 2'])
+        self.assertEqual(first['deleted'], [])
+        self.assertFalse(first['has_more'])
+        self.assertEqual(self.sync(first['next'])['results'], [])
+
+        edited, unpublished, removed = self.announcements
+        removed_id = removed.id
+        edited.title = 'Edited'
+        edited.save()
+        unpublished.is_published = False
+        unpublished.save()
+        removed.delete()
+        created = Announcement.objects.create(title='New', description='Body', author=self.user)
+        created.hashtags.add(self.tag)
+
+        delta = self.sync(first['next'])
+        self.assertEqual([row['id'] for row in delta['results']], [edited.id, created.id])
+        self.assertEqual(delta['results'][1]['hashtags'][0]['name'], 'news')
+        self.assertEqual(delta['deleted'], [unpublished.id, removed_id])
+
+    def test_rows_match_the_feed(self):
+        feed = self.client.get(reverse('announcement-list-create')).data['results']
+        results = self.sync()['results']
+        self.assertEqual(sorted(results, key=lambda row: row['id']), sorted(feed, key=lambda row: row['id']))
+
+    def test_log_keeps_one_row_per_announcement(self):
+        announcement = self.announcements[0]
+        for i in range(3):
+            announcement.title = f'Edit {i}'
+            announcement.save()
+        Comment.objects.create(announcement=announcement, author=self.user, content='Hi')
+        self.assertEqual(AnnouncementChange.objects.count(), 3)
+        self.assertEqual(
+            AnnouncementChange.objects.latest('id').announcement_id, announcement.id
+        )
+
+    def test_pages_through_large_deltas(self):
+        with mock.patch('announcements.changes.PAGE_SIZE', 2):
+            page = self.sync()
+            self.assertEqual(len(page['results']), 2)
+            self.assertTrue(page['has_more'])
+            page = self.sync(page['next'])
+            self.assertEqual(len(page['results']), 1)
+            self.assertFalse(page['has_more'])
+
+    @override_settings(ANNOUNCEMENT_CHANGES_LAG_SECONDS=60)
+    def test_recent_changes_wait_for_the_lag(self):
+        settled, recent = self.announcements[0], self.announcements[1]
+        AnnouncementChange.objects.exclude(announcement_id=recent.id).update(
+            changed_at=timezone.now() - timedelta(minutes=5)
+        )
+        page = self.sync()
+        # Announcement 2 is old enough, but waits behind the newer row below it
+        self.assertEqual([row['id'] for row in page['results']], [settled.id])
+        self.assertTrue(page['has_more'])
+        AnnouncementChange.objects.update(changed_at=timezone.now() - timedelta(minutes=5))
+        self.assertEqual(
+            [row['id'] for row in self.sync(page['next'])['results']], [recent.id, self.announcements[2].id]
+        )
+
+    def test_drafts_never_reach_sync_clients(self):
+        token = self.sync()['next']
+        draft = Announcement.objects.create(title='Draft', description='Body', author=self.user, is_published=False)
+        draft.hashtags.add(self.tag)
+        draft.title = 'Still a draft'
+        draft.save()
+        delta = self.sync(token)
+        self.assertEqual(delta['results'], [])
+        self.assertEqual(delta['deleted'], [])
+
+    def test_invalid_token(self):
+        response = self.client.get(reverse('announcement-changes') + '?since=abc')
+        self.assertEqual(response.status_code, 400)
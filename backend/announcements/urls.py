@@ -9,6 +9,8 @@ urlpatterns = [
     path('<int:announcement_id>/like/', views.toggle_like, name='toggle-like'),
     path('<int:announcement_id>/pin/', views.toggle_pin, name='toggle-pin'),
     path('stats/', views.announcement_stats, name='announcement-stats'),
+    path('changes/', views.announcement_changes, name='announcement-changes'),
+    path('events/', views.announcement_events, name='announcement-events'),
     
     # Categories
     path('categories/', views.CategoryListCreateView.as_view(), name='category-list-create'),
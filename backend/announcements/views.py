@@ -1,16 +1,31 @@
 from rest_framework import generics, status, permissions, filters
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import F, Q
+from django.core.handlers.asgi import ASGIRequest
+from django.db import IntegrityError, OperationalError, transaction
+from django.db.models import Q, Subquery
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from backend.fastpath import list_response
+from backend.sparse import SparseFieldsets
 from .models import Announcement, Comment, AnnouncementLike, Category, Hashtag
+from . import changes, events
+from .conditional import announcement_validators, feed_validators, not_modified, set_validators
+from .counters import bump_likes, like_total
+from .fastpath import feed_values, render_feed
+from .pagination import CommentPagination, KeysetPagination
+from .search import FullTextSearchFilter
+from .stats import current_stats
 from .serializers import (
     AnnouncementSerializer, AnnouncementListSerializer,
     AnnouncementCreateUpdateSerializer, CommentSerializer,
-    CommentCreateSerializer, AnnouncementLikeSerializer,
-    CategorySerializer, CategoryCreateUpdateSerializer, HashtagSerializer
+    CommentCreateSerializer, CategorySerializer,
+    CategoryCreateUpdateSerializer, HashtagSerializer
 )
-from users.models import UserActivity
+from users import activity
 
 
 class CategoryListCreateView(generics.ListCreateAPIView):
@@ -84,14 +99,29 @@ class HashtagListView(generics.ListAPIView):
     ordering = ['-usage_count', 'name']
 
 
+class FeedOrderingFilter(filters.OrderingFilter):
+    """?ordering=likes sorts by the count clients see, pending shard deltas included."""
+    aliases = {'likes': 'like_total', '-likes': '-like_total'}
+    
+    def filter_queryset(self, request, queryset, view):
+        ordering = self.get_ordering(request, queryset, view)
+        if not ordering or not any(name in self.aliases for name in ordering):
+            return super().filter_queryset(request, queryset, view)
+        return queryset.with_like_total().order_by(*(self.aliases.get(name, name) for name in ordering))
+
+
 class AnnouncementListCreateView(generics.ListCreateAPIView):
     queryset = Announcement.objects.filter(is_published=True)
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    pagination_class = KeysetPagination
+    # Full-text search runs last so relevance ranking can replace the default ordering
+    filter_backends = [DjangoFilterBackend, FeedOrderingFilter, FullTextSearchFilter]
     filterset_fields = ['category', 'author', 'is_pinned']
     search_fields = ['title', 'description', 'author__first_name', 'author__last_name', 'hashtags__name']
     ordering_fields = ['timestamp', 'likes', 'updated_at']
     ordering = ['-is_pinned', '-timestamp']
+    # Serve plain feed reads from values() rows instead of ModelSerializer
+    fast_path = True
     
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -114,20 +144,51 @@ class AnnouncementListCreateView(generics.ListCreateAPIView):
         
         return queryset
     
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        
+        # Answer polls with 304 before touching the serializers
+        etag, last_modified = feed_validators(request, queryset)
+        response = not_modified(request, etag, last_modified)
+        if response is not None:
+            return response
+        
+        sparse = SparseFieldsets.from_request(request)
+        if self.fast_path and sparse.is_default and not request.query_params.get('search'):
+            # Same JSON as AnnouncementListSerializer, built from values() rows
+            response = list_response(self, feed_values(queryset), render_feed)
+            return set_validators(response, etag, last_modified)
+        
+        # Joins and prefetches only for the rows and fields actually serialized
+        queryset = queryset.for_fieldsets(sparse)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            response = self.get_paginated_response(serializer.data)
+        else:
+            serializer = self.get_serializer(queryset, many=True)
+            response = Response(serializer.data)
+        return set_validators(response, etag, last_modified)
+    
     def perform_create(self, serializer):
         announcement = serializer.save(author=self.request.user)
-        # Add user activity
-        UserActivity.objects.create(
-            user=self.request.user,
-            type='post',
-            title=f'Posted announcement: {announcement.title}'
-        )
+        # Add user activity; buffered, so not written on the request path
+        activity.record(self.request.user, 'post', f'Posted announcement: {announcement.title}')
 
 
 class AnnouncementDetailView(generics.RetrieveUpdateDestroyAPIView):
     queryset = Announcement.objects.all()
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
     
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.method != 'GET':
+            return queryset
+        return queryset.for_fieldsets(
+            SparseFieldsets.from_request(self.request),
+            comments_limit=AnnouncementSerializer.comments_limit
+        )
+    
     def get_serializer_class(self):
         if self.request.method in ['PUT', 'PATCH']:
             return AnnouncementCreateUpdateSerializer
@@ -138,6 +199,14 @@ class AnnouncementDetailView(generics.RetrieveUpdateDestroyAPIView):
             return [permissions.IsAuthenticated()]
         return [permissions.IsAuthenticatedOrReadOnly()]
     
+    def retrieve(self, request, *args, **kwargs):
+        etag, last_modified = announcement_validators(request, self.kwargs['pk'])
+        response = not_modified(request, etag, last_modified)
+        if response is not None:
+            return response
+        response = super().retrieve(request, *args, **kwargs)
+        return set_validators(response, etag, last_modified)
+    
     def perform_update(self, serializer):
         # Only allow author or admin to update
         if (self.request.user == self.get_object().author or 
@@ -163,6 +232,7 @@ class AnnouncementDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 class CommentListCreateView(generics.ListCreateAPIView):
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = CommentPagination
     
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -171,7 +241,29 @@ class CommentListCreateView(generics.ListCreateAPIView):
     
     def get_queryset(self):
         announcement_id = self.kwargs['announcement_id']
-        return Comment.objects.filter(announcement_id=announcement_id)
+        queryset = Comment.objects.filter(announcement_id=announcement_id).select_related('author')
+        
+        # Only comments newer than a timestamp, served by comment_thread_idx
+        since = self.request.query_params.get('since')
+        if since:
+            since_time = parse_datetime(since)
+            if since_time is None:
+                raise ValidationError({'since': 'Expected an ISO 8601 datetime'})
+            if timezone.is_naive(since_time):
+                since_time = timezone.make_aware(since_time)
+            queryset = queryset.filter(timestamp__gt=since_time)
+        
+        # Only comments after a given comment, in thread order
+        after_id = self.request.query_params.get('after_id')
+        if after_id:
+            if not after_id.isdigit():
+                raise ValidationError({'after_id': 'Expected a comment id'})
+            after = Comment.objects.filter(id=after_id, announcement_id=announcement_id).values('timestamp')
+            queryset = queryset.filter(
+                Q(timestamp__gt=Subquery(after)) | Q(timestamp=Subquery(after), id__gt=after_id)
+            )
+        
+        return queryset
     
     def perform_create(self, serializer):
         announcement_id = self.kwargs['announcement_id']
@@ -182,11 +274,7 @@ class CommentListCreateView(generics.ListCreateAPIView):
                 announcement=announcement
             )
             # Add user activity
-            UserActivity.objects.create(
-                user=self.request.user,
-                type='comment',
-                title=f'Commented on: {announcement.title}'
-            )
+            activity.record(self.request.user, 'comment', f'Commented on: {announcement.title}')
         except Announcement.DoesNotExist:
             return Response(
                 {'error': 'Announcement not found'}, 
@@ -197,84 +285,71 @@ class CommentListCreateView(generics.ListCreateAPIView):
 @api_view(['POST', 'DELETE'])
 @permission_classes([permissions.IsAuthenticated])
 def toggle_like(request, announcement_id):
+    # POST likes and DELETE unlikes; both are idempotent and never recount
     try:
-        announcement = Announcement.objects.get(id=announcement_id)
-        like, created = AnnouncementLike.objects.get_or_create(
-            announcement=announcement,
-            user=request.user
-        )
+        with transaction.atomic():
+            title = Announcement.objects.filter(id=announcement_id).values_list('title', flat=True).first()
+            if title is None:
+                return Response(
+                    {'error': 'Announcement not found'}, 
+                    status=status.HTTP_404_NOT_FOUND
+                )
         
-        if created:
-            # Like was created
-            # Add user activity
-            UserActivity.objects.create(
-                user=request.user,
-                type='like',
-                title=f'Liked: {announcement.title}'
-            )
-            action = 'liked'
-        else:
-            # Like already existed, remove it
-            like.delete()
-            action = 'unliked'
+            if request.method == 'POST':
+                try:
+                    with transaction.atomic():
+                        # The unique (announcement, user) constraint makes the insert conditional
+                        AnnouncementLike.objects.create(announcement_id=announcement_id, user=request.user)
+                    changed = True
+                except IntegrityError:
+                    changed = False
+                action = 'liked'
+            else:
+                deleted, _ = AnnouncementLike.objects.filter(
+                    announcement_id=announcement_id, user=request.user
+                ).delete()
+                changed = bool(deleted)
+                action = 'unliked'
         
-        # Recalculate likes count based on actual AnnouncementLike records
-        actual_likes_count = AnnouncementLike.objects.filter(announcement=announcement).count()
-        Announcement.objects.filter(id=announcement_id).update(likes=actual_likes_count)
+            if changed:
+                # Counted on a random shard so hot announcements don't contend on one row
+                bump_likes(announcement_id, 1 if action == 'liked' else -1)
         
-        return Response({
-            'success': True,
-            'action': action,
-            'likes': actual_likes_count
-        })
-            
-    except Announcement.DoesNotExist:
+            if changed and action == 'liked':
+                # Add user activity
+                activity.record(request.user, 'like', f'Liked: {title}')
+        
+            likes = like_total(announcement_id)
+    except OperationalError:
+        # SQLite admits one writer at a time, so a contended like can find the
+        # database locked; that is worth retrying, not a server error
         return Response(
-            {'error': 'Announcement not found'}, 
-            status=status.HTTP_404_NOT_FOUND
+            {'error': 'Too many concurrent writes, try again'},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            headers={'Retry-After': '1'}
         )
 
+    return Response({
+        'success': True,
+        'action': action,
+        'changed': changed,
+        'likes': likes
+    })
+
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticatedOrReadOnly])
 def announcement_stats(request):
-    total_announcements = Announcement.objects.filter(is_published=True).count()
-    total_comments = Comment.objects.count()
-    total_likes = AnnouncementLike.objects.count()
-    total_categories = Category.objects.filter(is_active=True).count()
-    total_hashtags = Hashtag.objects.count()
-    
-    # Category statistics
-    categories = Category.objects.filter(is_active=True)
-    category_stats = []
-    for category in categories:
-        category_stats.append({
-            'id': category.id,
-            'name': category.name,
-            'slug': category.slug,
-            'color': category.color,
-            'count': category.announcements.filter(is_published=True).count()
-        })
-    
-    # Popular hashtags
-    popular_hashtags = Hashtag.objects.filter(usage_count__gt=0).order_by('-usage_count')[:10]
-    hashtag_stats = [
-        {
-            'id': tag.id,
-            'name': tag.name,
-            'usage_count': tag.usage_count
-        }
-        for tag in popular_hashtags
-    ]
-    
+    # Everything comes from the materialized stats row: one query, no per-request COUNT(*)s
+    totals = current_stats()
     return Response({
-        'total_announcements': total_announcements,
-        'total_comments': total_comments,
-        'total_likes': total_likes,
-        'total_categories': total_categories,
-        'total_hashtags': total_hashtags,
-        'category_stats': category_stats,
-        'popular_hashtags': hashtag_stats
+        'total_announcements': totals.total_announcements,
+        'total_comments': totals.total_comments,
+        'total_likes': totals.total_likes,
+        'total_categories': totals.total_categories,
+        'total_hashtags': totals.total_hashtags,
+        'category_stats': totals.category_stats,
+        'popular_hashtags': totals.popular_hashtags
     })
 
 
@@ -291,7 +366,8 @@ def toggle_pin(request, announcement_id):
     try:
         announcement = Announcement.objects.get(id=announcement_id)
         announcement.is_pinned = not announcement.is_pinned
-        announcement.save()
+        # Not a full save: likes may have moved since the row was read
+        announcement.save(update_fields=['is_pinned', 'updated_at'])
         
         action = 'pinned' if announcement.is_pinned else 'unpinned'
         return Response({
@@ -305,3 +381,52 @@ def toggle_pin(request, announcement_id):
             {'error': 'Announcement not found'}, 
             status=status.HTTP_404_NOT_FOUND
         )
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticatedOrReadOnly])
+def announcement_changes(request):
+    """
+    Announcements created, updated or unpublished since a change token,
+    plus the ids of deleted or unpublished ones. Start with no token for a
+    full sync, then pass back ``next``; while ``has_more`` is true, ask again.
+    """
+    since = request.query_params.get('since') or '0'
+    if not since.isdigit():
+        raise ValidationError({'since': 'Expected a change token'})
+    changed, deleted, next_token, has_more = changes.changes_since(int(since))
+    
+    # Rows unpublished since the log was read get their tombstone on the next call
+    rows = feed_values(Announcement.objects.filter(id__in=changed, is_published=True))
+    position = {announcement_id: index for index, announcement_id in enumerate(changed)}
+    rows = sorted(rows, key=lambda row: position[row['id']])
+    
+    return Response({
+        'results': render_feed(rows, request),
+        'deleted': deleted,
+        'next': str(next_token),
+        'has_more': has_more,
+    })
+
+
+async def announcement_events(request):
+    """
+    Server-Sent Events stream of new announcements, pin changes and
+    like/comment deltas, replacing feed polling. EventSource resends the
+    last id it saw as Last-Event-ID when it reconnects.
+    
+    Only served under ASGI: a WSGI worker would buffer the endless body
+    instead of sending it. Events are fanned out in-process, so the whole
+    app (every view that writes) must run in that one ASGI process.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse(
+            {'error': 'Live updates need the ASGI server; use /api/announcements/changes/ instead'},
+            status=status.HTTP_501_NOT_IMPLEMENTED
+        )
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    response = StreamingHttpResponse(events.stream(last_event_id), content_type='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
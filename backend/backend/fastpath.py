@@ -0,0 +1,59 @@
+"""
+Helpers for building list responses straight from values() rows.
+
+The fast paths in each app skip ModelSerializer instantiation but must
+produce exactly what the serializers would, so scalar formatting is
+delegated to the same DRF field classes the serializers use.
+"""
+from rest_framework import serializers
+from rest_framework.response import Response
+
+from .images import variant_urls
+
+_datetime = serializers.DateTimeField()
+_date = serializers.DateField()
+
+
+def format_datetime(value):
+    return None if value is None else _datetime.to_representation(value)
+
+
+def format_date(value):
+    return None if value is None else _date.to_representation(value)
+
+
+def file_url(model, field_name, name, request):
+    """What serializers.ImageField renders for a stored file name."""
+    if not name:
+        return None
+    url = model._meta.get_field(field_name).storage.url(name)
+    if request is not None:
+        return request.build_absolute_uri(url)
+    return url
+
+
+def file_variants(model, field_name, name, manifest, request):
+    """What ImageVariantsField renders for a stored file name and manifest."""
+    storage = model._meta.get_field(field_name).storage
+
+    def url_for(path):
+        url = storage.url(path)
+        return request.build_absolute_uri(url) if request is not None else url
+
+    return variant_urls(manifest, name, url_for)
+
+
+def group_rows(rows, key):
+    grouped = {}
+    for row in rows:
+        grouped.setdefault(row[key], []).append(row)
+    return grouped
+
+
+def list_response(view, queryset, render):
+    """ListModelMixin.list() for values() rows rendered by render(rows, request)."""
+    page = view.paginate_queryset(queryset)
+    rows = render(page if page is not None else queryset, view.request)
+    if page is not None:
+        return view.get_paginated_response(rows)
+    return Response(rows)
@@ -0,0 +1,195 @@
+"""
+Resized, EXIF-stripped derivatives of uploaded images.
+
+Each registered ImageField ``<name>`` has a JSONField ``<name>_variants``
+holding a manifest of the derivatives generated from the current file:
+
+    {"source": "announcements/photo.jpg",
+     "webp": {"320w": "derivatives/announcements/photo-320.webp", ...},
+     "jpeg": {"320w": "derivatives/announcements/photo-320.jpg", ...}}
+
+Derivatives are generated after the saving transaction commits, on a
+background thread, so uploads never wait for Pillow. The
+generate_image_derivatives command backfills anything missing or stale
+(e.g. work lost when a worker process was recycled) with a process pool.
+Serializers expose the manifest as absolute URLs via ImageVariantsField.
+"""
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models.signals import post_save
+from PIL import Image, ImageOps
+from rest_framework import serializers
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {
+    'webp': ('WEBP', 'webp'),
+    'jpeg': ('JPEG', 'jpg'),
+}
+
+# (model, field name) pairs passed to register()
+registry = []
+_executor = None
+
+
+def derivative_widths():
+    return getattr(settings, 'IMAGE_DERIVATIVE_WIDTHS', [320, 640, 1280])
+
+
+def derivative_formats():
+    return getattr(settings, 'IMAGE_DERIVATIVE_FORMATS', ['webp', 'jpeg'])
+
+
+def variants_field(field_name):
+    return f'{field_name}_variants'
+
+
+def is_current(manifest, name):
+    return bool(name) and bool(manifest) and manifest.get('source') == name
+
+
+def derivative_name(name, width, extension):
+    stem, _ = os.path.splitext(name)
+    return f'derivatives/{stem}-{width}.{extension}'
+
+
+def prepare(image, pil_format):
+    # Apply the EXIF orientation before the metadata is dropped on save
+    image = ImageOps.exif_transpose(image)
+    has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+    if pil_format == 'WEBP' and has_alpha:
+        return image.convert('RGBA')
+    if has_alpha:
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image.convert('RGBA'), mask=image.convert('RGBA').getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def render_derivatives(storage, name):
+    """Write every derivative of the stored image ``name`` and return its manifest."""
+    with storage.open(name, 'rb') as source:
+        original = Image.open(source)
+        original.load()
+
+    manifest = {'source': name}
+    quality = getattr(settings, 'IMAGE_DERIVATIVE_QUALITY', 80)
+    for format_key in derivative_formats():
+        pil_format, extension = FORMATS[format_key]
+        image = prepare(original, pil_format)
+        # Never upscale: widths above the original collapse onto it
+        widths = sorted({min(width, image.width) for width in derivative_widths()})
+        manifest[format_key] = {}
+        for width in widths:
+            height = max(1, round(image.height * width / image.width))
+            resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+            buffer = BytesIO()
+            # No exif= argument, so no metadata is carried over
+            resized.save(buffer, pil_format, quality=quality, optimize=True)
+            target = derivative_name(name, width, extension)
+            if storage.exists(target):
+                storage.delete(target)
+            manifest[format_key][f'{width}w'] = storage.save(target, ContentFile(buffer.getvalue()))
+    return manifest
+
+
+def derivative_files(manifest):
+    return {path for key, paths in (manifest or {}).items() if key != 'source' for path in paths.values()}
+
+
+def save_manifest(model, pk, field_name, name, manifest, previous=None):
+    """Store a manifest unless the image changed meanwhile; drop files it replaces."""
+    updated = model._default_manager.filter(pk=pk, **{field_name: name}).update(
+        **{variants_field(field_name): manifest}
+    )
+    if updated:
+        storage = model._meta.get_field(field_name).storage
+        for path in derivative_files(previous) - derivative_files(manifest):
+            storage.delete(path)
+    return bool(updated)
+
+
+def render_stored(label, field_name, name):
+    """Process-pool entry point: render derivatives without touching the database."""
+    from django.apps import apps
+    storage = apps.get_model(label)._meta.get_field(field_name).storage
+    return render_derivatives(storage, name)
+
+
+def generate(model, pk, field_name):
+    row = model._default_manager.filter(pk=pk).values(field_name, variants_field(field_name)).first()
+    if row is None or not row[field_name] or is_current(row[variants_field(field_name)], row[field_name]):
+        return False
+    storage = model._meta.get_field(field_name).storage
+    try:
+        manifest = render_derivatives(storage, row[field_name])
+    except Exception:
+        logger.exception('Could not generate derivatives for %s', row[field_name])
+        return False
+    return save_manifest(model, pk, field_name, row[field_name], manifest, row[variants_field(field_name)])
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='image-derivatives')
+    return _executor
+
+
+def schedule(model, pk, field_name):
+    if getattr(settings, 'IMAGE_DERIVATIVES_ASYNC', True):
+        transaction.on_commit(lambda: get_executor().submit(generate, model, pk, field_name))
+    else:
+        transaction.on_commit(lambda: generate(model, pk, field_name))
+
+
+def register(model, field_name):
+    """Generate derivatives for ``model.<field_name>`` whenever a new file is saved."""
+    def image_saved(sender, instance, update_fields=None, **kwargs):
+        if update_fields is not None and field_name not in update_fields:
+            return
+        name = getattr(instance, field_name).name
+        if name and not is_current(getattr(instance, variants_field(field_name)), name):
+            schedule(sender, instance.pk, field_name)
+
+    registry.append((model, field_name))
+    post_save.connect(
+        image_saved, sender=model, weak=False,
+        dispatch_uid=f'image_derivatives_{model._meta.label_lower}_{field_name}'
+    )
+
+
+def variant_urls(manifest, name, url_for):
+    """The manifest as {format: {"<width>w": url}}, or {} while it is missing or stale."""
+    if not is_current(manifest, name):
+        return {}
+    return {
+        key: {width: url_for(path) for width, path in paths.items()}
+        for key, paths in manifest.items() if key != 'source'
+    }
+
+
+class ImageVariantsField(serializers.Field):
+    """Read-only srcset-style map of an ImageField's derivatives."""
+
+    def __init__(self, image_field, **kwargs):
+        self.image_field = image_field
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, instance):
+        file = getattr(instance, self.image_field)
+        request = self.context.get('request')
+
+        def url_for(path):
+            url = file.storage.url(path)
+            return request.build_absolute_uri(url) if request is not None else url
+
+        return variant_urls(getattr(instance, variants_field(self.image_field)), file.name, url_for)
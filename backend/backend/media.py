@@ -0,0 +1,185 @@
+"""
+Serving uploaded media and collected static files.
+
+Replaces django.views.static.serve, which reads whole files into a Python
+worker. Responses carry ETag/Last-Modified validators (If-None-Match and
+If-Modified-Since give 304) and long-lived Cache-Control headers. With
+FILE_SENDFILE set, the body is handed off to the web server:
+
+- ``'x-sendfile'``: Apache mod_xsendfile / LiteSpeed, via X-Sendfile with the absolute path;
+- ``'x-accel-redirect'``: nginx, via X-Accel-Redirect to FILE_ACCEL_REDIRECT_PREFIX + the request path.
+
+Otherwise files are streamed with FileResponse (wsgi.file_wrapper, i.e.
+sendfile(2) where the server supports it), and single byte ranges are
+answered with 206 Partial Content. Static files can be served from
+precompressed siblings, so they cost no compression CPU per request.
+"""
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+
+from .middleware import accepted_encodings
+from .storage import IMMUTABLE_CACHE_CONTROL, is_hashed
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+# Sibling files written by CompressedManifestStaticFilesStorage, best first
+PRECOMPRESSED = [('br', '.br'), ('gzip', '.gz')]
+
+
+class FileRange:
+    """Read-only view of ``length`` bytes of a file starting at ``start``."""
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.remaining = length
+        file.seek(start)
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def file_etag(stat):
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def parse_range(header, size):
+    """(start, end) for a single satisfiable byte range; None to send the whole file; False if unsatisfiable."""
+    match = RANGE_RE.match(header.replace(' ', ''))
+    if not match or not any(match.groups()):
+        # Malformed or multi-range: ignoring the header is always allowed
+        return None
+    first, last = match.groups()
+    if not first:
+        # Suffix range: the final N bytes
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def range_applies(request, etag, mtime):
+    """If-Range: only honour Range while the client's copy is still current."""
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith('"'):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == int(mtime)
+
+
+def cache_control(path, immutable):
+    if immutable(path):
+        return IMMUTABLE_CACHE_CONTROL
+    return f"public, max-age={getattr(settings, 'FILE_CACHE_MAX_AGE', 86400)}"
+
+
+def offload(request, full_path, content_type, suffix=''):
+    backend = getattr(settings, 'FILE_SENDFILE', '')
+    if backend == 'x-sendfile':
+        response = HttpResponse(content_type=content_type)
+        response.headers['X-Sendfile'] = full_path
+        return response
+    if backend == 'x-accel-redirect':
+        response = HttpResponse(content_type=content_type)
+        prefix = getattr(settings, 'FILE_ACCEL_REDIRECT_PREFIX', '/internal').rstrip('/')
+        response.headers['X-Accel-Redirect'] = prefix + request.path + suffix
+        return response
+    return None
+
+
+def precompressed_variant(request, full_path):
+    """(Content-Encoding, file suffix) of the best precompressed sibling the client accepts."""
+    accepted = accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    for encoding, suffix in PRECOMPRESSED:
+        if encoding in accepted and os.path.isfile(full_path + suffix):
+            return encoding, suffix
+    return None, ''
+
+
+def set_headers(response, headers):
+    for name, value in headers.items():
+        response.headers[name] = value
+    return response
+
+
+def serve(request, path, document_root=None, immutable=is_hashed, precompressed=False):
+    """
+    precompressed: serve ``.br``/``.gz`` siblings written at collectstatic
+    time to clients that accept them (not for Range requests, whose offsets
+    refer to the uncompressed file).
+    """
+    try:
+        full_path = safe_join(document_root, path)
+    except SuspiciousFileOperation:
+        raise Http404('File not found')
+    if not os.path.isfile(full_path):
+        raise Http404('File not found')
+
+    encoding, suffix = None, ''
+    if precompressed and 'HTTP_RANGE' not in request.META:
+        encoding, suffix = precompressed_variant(request, full_path)
+    stat = os.stat(full_path + suffix)
+
+    etag = file_etag(stat)
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(stat.st_mtime),
+        'Cache-Control': cache_control(path, immutable),
+    }
+    if precompressed:
+        headers['Vary'] = 'Accept-Encoding'
+    response = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+    if response is not None:
+        return set_headers(response, headers)
+
+    content_type = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+    response = offload(request, full_path + suffix, content_type, suffix)
+    if response is None:
+        response = stream(request, full_path + suffix, stat, etag, content_type, os.path.basename(full_path))
+    if encoding:
+        headers['Content-Encoding'] = encoding
+    headers['Accept-Ranges'] = 'bytes'
+    return set_headers(response, headers)
+
+
+def stream(request, full_path, stat, etag, content_type, filename):
+    header = request.META.get('HTTP_RANGE')
+    byte_range = parse_range(header, stat.st_size) if header else None
+    if byte_range is not None and not range_applies(request, etag, stat.st_mtime):
+        byte_range = None
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response.headers['Content-Range'] = f'bytes */{stat.st_size}'
+        return response
+    if byte_range is None:
+        return FileResponse(open(full_path, 'rb'), content_type=content_type, filename=filename)
+
+    start, end = byte_range
+    length = end - start + 1
+    response = FileResponse(
+        FileRange(open(full_path, 'rb'), start, length), status=206,
+        content_type=content_type, filename=filename
+    )
+    response.headers['Content-Length'] = str(length)
+    response.headers['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+    return response
@@ -0,0 +1,101 @@
+"""
+Response compression for the API.
+
+Extends Django's GZipMiddleware with brotli (when the ``brotli`` package
+is installed), a minimum body size, a content-type allowlist and an
+``X-Compression-Saved`` header with the bytes saved. Configured through
+the COMPRESSION_* settings.
+
+Brotli is only used for requests that carry no credentials. A response to
+a signed-in user may hold secrets next to reflected input, which BREACH
+can recover from the compressed length. Those responses are gzipped, and
+Django's gzip adds random bytes that hide the length.
+"""
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_string
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+
+def accepted_encodings(header):
+    """Codings from an Accept-Encoding header that the client did not refuse with q=0."""
+    accepted = set()
+    for item in header.split(','):
+        coding, _, params = item.strip().partition(';')
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name.lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding and quality > 0:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+class CompressionMiddleware(GZipMiddleware):
+    @property
+    def min_size(self):
+        return getattr(settings, 'COMPRESSION_MIN_SIZE', 512)
+
+    @property
+    def content_types(self):
+        return getattr(settings, 'COMPRESSION_CONTENT_TYPES', ['application/json', 'text/html'])
+
+    def is_compressible(self, response):
+        content_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+        return content_type in self.content_types and not response.has_header('Content-Encoding')
+
+    def has_credentials(self, request):
+        # Session and token auth, plus any other cookie a response might echo
+        return bool(request.COOKIES) or 'HTTP_AUTHORIZATION' in request.META
+
+    def choose_encoding(self, request):
+        accepted = accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if brotli is not None and 'br' in accepted and not self.has_credentials(request):
+            return 'br'
+        if 'gzip' in accepted or '*' in accepted:
+            return 'gzip'
+        return None
+
+    def compress(self, encoding, content):
+        if encoding == 'br':
+            return brotli.compress(content, quality=getattr(settings, 'COMPRESSION_BROTLI_QUALITY', 5))
+        return compress_string(content, max_random_bytes=self.max_random_bytes)
+
+    def process_response(self, request, response):
+        if not self.is_compressible(response) or response.status_code in (206, 304):
+            return response
+        if response.streaming:
+            # Streamed bodies are gzipped chunk by chunk, as by GZipMiddleware
+            return super().process_response(request, response)
+        if len(response.content) < self.min_size:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = self.choose_encoding(request)
+        if encoding is None:
+            return response
+
+        compressed = self.compress(encoding, response.content)
+        saved = len(response.content) - len(compressed)
+        if saved <= 0:
+            return response
+        response.content = compressed
+        response.headers['Content-Length'] = str(len(compressed))
+        response.headers['Content-Encoding'] = encoding
+        response.headers['X-Compression-Saved'] = str(saved)
+
+        # Keep conditional requests working: the compressed body is a
+        # different byte sequence, so a strong ETag becomes weak (RFC 9110 8.8.1)
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        return response
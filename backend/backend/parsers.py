@@ -0,0 +1,28 @@
+"""
+Request body parsers matching backend.renderers.
+"""
+from rest_framework import parsers
+from rest_framework.exceptions import ParseError
+
+from .renderers import msgpack, orjson
+
+
+class ORJSONParser(parsers.JSONParser):
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None:
+            return super().parse(stream, media_type, parser_context)
+        try:
+            # orjson rejects NaN/Infinity, like JSONParser under STRICT_JSON
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
+
+
+class MessagePackParser(parsers.BaseParser):
+    media_type = 'application/msgpack'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False, strict_map_key=True)
+        except ValueError as exc:
+            raise ParseError('MessagePack parse error - %s' % str(exc))
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 from pathlib import Path
+import importlib.util
 import os
 from dotenv import load_dotenv
 
@@ -60,6 +61,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'backend.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -164,8 +166,16 @@ STATICFILES_DIRS = [
     BASE_DIR / 'static',
 ]
 
-# Static files storage
-STATICFILES_STORAGE = 'django.contrib.staticfiles.storage.StaticFilesStorage'
+# Uploads are stored once per distinct content, under hash-based names;
+# collectstatic writes hashed names plus .gz/.br siblings
+STORAGES = {
+    'default': {
+        'BACKEND': 'backend.storage.ContentAddressedStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'backend.storage.CompressedManifestStaticFilesStorage',
+    },
+}
 
 # Media files
 MEDIA_URL = '/media/'
@@ -178,6 +188,14 @@ else:
     # Production settings for cPanel subdomain
     MEDIA_ROOT = os.path.join(BASE_DIR, '..', 'media')
 
+# How backend.media hands file bodies to the web server: '' streams them
+# from Django, 'x-sendfile' (Apache/LiteSpeed) or 'x-accel-redirect' (nginx,
+# with an internal location at FILE_ACCEL_REDIRECT_PREFIX) offload them
+FILE_SENDFILE = os.getenv('FILE_SENDFILE', '')
+FILE_ACCEL_REDIRECT_PREFIX = os.getenv('FILE_ACCEL_REDIRECT_PREFIX', '/internal')
+# Cache lifetime for files whose names are not content hashes
+FILE_CACHE_MAX_AGE = 86400
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -199,8 +217,68 @@ REST_FRAMEWORK = {
         'rest_framework.filters.SearchFilter',
         'rest_framework.filters.OrderingFilter',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'backend.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'backend.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
+# MessagePack is offered through content negotiation when msgpack is installed
+if importlib.util.find_spec('msgpack'):
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'].insert(1, 'backend.renderers.MessagePackRenderer')
+    REST_FRAMEWORK['DEFAULT_PARSER_CLASSES'].insert(1, 'backend.parsers.MessagePackParser')
+
+# Response compression (backend.middleware.CompressionMiddleware). Brotli is
+# used for clients that accept it when the brotli package is installed, but
+# only on requests without cookies or an Authorization header (BREACH).
+COMPRESSION_MIN_SIZE = 512
+COMPRESSION_BROTLI_QUALITY = 5
+COMPRESSION_CONTENT_TYPES = [
+    'application/json',
+    'application/msgpack',
+    'text/html',
+    'text/plain',
+    'text/css',
+    'text/javascript',
+    'application/javascript',
+    'image/svg+xml',
+]
+
+# Resized copies of uploaded images (backend.images), exposed as *_variants
+IMAGE_DERIVATIVE_WIDTHS = [320, 640, 1280]
+IMAGE_DERIVATIVE_FORMATS = ['webp', 'jpeg']
+IMAGE_DERIVATIVE_QUALITY = 80
+
+# Number of counter rows per announcement that likes are spread across.
+# rollup_like_shards folds them back into Announcement.likes.
+LIKE_COUNTER_SHARDS = int(os.getenv('LIKE_COUNTER_SHARDS', '8'))
+
+# Number of rows the site-wide comment and like totals are spread across
+# (announcements.stats).
+STATS_COUNTER_SHARDS = int(os.getenv('STATS_COUNTER_SHARDS', '8'))
+
+# Delta sync (announcements.changes) only hands out log rows at least this
+# old, so a slow transaction that took a lower id cannot commit behind a
+# token a client already holds.
+ANNOUNCEMENT_CHANGES_LAG_SECONDS = 2
+
+# User activity is buffered per worker (users.activity) and written in
+# batches of ACTIVITY_BUFFER_SIZE rows or every ACTIVITY_FLUSH_SECONDS.
+# Batches that fail transiently (e.g. SQLite busy) wait in ACTIVITY_SPOOL_DIR
+# for a later flush; a batch claimed by a worker that died, or that has held
+# it for ACTIVITY_SPOOL_CLAIM_SECONDS, is taken over by the next flush.
+ACTIVITY_BUFFER_SIZE = 100
+ACTIVITY_FLUSH_SECONDS = 5
+ACTIVITY_SPOOL_DIR = BASE_DIR / 'activity_spool'
+ACTIVITY_SPOOL_CLAIM_SECONDS = 300
+# archive_user_activity moves older rows to the archive table
+ACTIVITY_RETENTION_DAYS = int(os.getenv('ACTIVITY_RETENTION_DAYS', '180'))
+
 # CORS settings
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
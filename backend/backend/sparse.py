@@ -0,0 +1,97 @@
+"""
+Sparse fieldsets and on-demand expansion for read endpoints.
+
+``?fields=id,title,likes`` limits the top-level keys of each object and
+``?expand=author,category`` lists which relations are rendered as nested
+objects; relations left out of ``expand`` are rendered as primary keys.
+Without either parameter the output is unchanged. Views use the same
+parsed request to trim their querysets (only(), select_related,
+prefetch_related, annotations) to what was asked for.
+"""
+from rest_framework import serializers
+
+
+class SparseFieldsets:
+    fields_param = 'fields'
+    expand_param = 'expand'
+
+    def __init__(self, request=None):
+        params = request.query_params if request is not None else {}
+        self.fields = self.parse(params.get(self.fields_param))
+        self.expand = self.parse(params.get(self.expand_param))
+
+    @classmethod
+    def from_request(cls, request):
+        # Parsed once per request and shared by the view and its serializers
+        if request is None:
+            return cls()
+        if not hasattr(request, '_sparse_fieldsets'):
+            request._sparse_fieldsets = cls(request)
+        return request._sparse_fieldsets
+
+    @staticmethod
+    def parse(value):
+        if value is None:
+            return None
+        return {name.strip() for name in value.split(',') if name.strip()}
+
+    @property
+    def is_default(self):
+        return self.fields is None and self.expand is None
+
+    def wants(self, name):
+        return self.fields is None or name in self.fields
+
+    def expands(self, name):
+        return self.wants(name) and (self.expand is None or name in self.expand)
+
+    def columns(self, mapping, always=()):
+        """
+        Model columns needed for the requested fields, for QuerySet.only().
+        A field computed from several columns maps to a tuple of them.
+        """
+        columns = list(always)
+        for name, needed in mapping.items():
+            if not self.wants(name):
+                continue
+            for column in needed if isinstance(needed, tuple) else (needed,):
+                if column not in columns:
+                    columns.append(column)
+        return columns
+
+
+class SparseFieldsetMixin:
+    """
+    Serializer mixin applying SparseFieldsets to the top-level resource.
+    expandable_fields lists relations that collapse to primary keys when
+    the client sends ?expand= without them.
+    """
+    expandable_fields = ()
+
+    def is_top_level(self):
+        parent = self.parent
+        if parent is None:
+            return True
+        return isinstance(parent, serializers.ListSerializer) and parent.parent is None
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if not self.is_top_level():
+            return fields
+        sparse = SparseFieldsets.from_request(self.context.get('request'))
+        if sparse.is_default:
+            return fields
+
+        if sparse.fields is not None:
+            fields = {name: field for name, field in fields.items() if name in sparse.fields}
+        for name in self.expandable_fields:
+            if name in fields and not sparse.expands(name):
+                fields[name] = self.collapsed_field(name)
+        return fields
+
+    def collapsed_field(self, name):
+        model_field = self.Meta.model._meta.get_field(name)
+        return serializers.PrimaryKeyRelatedField(
+            read_only=True,
+            many=model_field.one_to_many or model_field.many_to_many
+        )
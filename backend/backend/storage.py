@@ -0,0 +1,114 @@
+"""
+Content-addressed media storage, and precompressed static files.
+
+Files are named by the SHA-256 of their bytes (``hashed/ab/abcd….jpg``),
+so identical uploads are stored once and a URL always refers to the same
+bytes and can be cached forever. Because a stored file may be shared by
+any number of rows, delete() is a no-op; unreferenced files are removed
+by ``dedupe_media --prune``.
+"""
+import gzip
+import hashlib
+import os
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+HASHED_PREFIX = 'hashed/'
+HASHED_NAME = re.compile(r'^hashed/[0-9a-f]{2}/[0-9a-f]{64}(\.[a-z0-9]+)?$')
+# ManifestStaticFilesStorage inserts a 12-digit hash before the extension
+HASHED_STATIC_SUFFIX = re.compile(r'\.[0-9a-f]{12}(\.[^./]+)$')
+
+# Cache-Control for URLs of content-addressed files
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+def is_hashed(name):
+    return bool(name) and bool(HASHED_NAME.match(name.replace('\\', '/')))
+
+
+def content_hash(content):
+    digest = hashlib.sha256()
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    for chunk in content.chunks():
+        digest.update(chunk)
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    return digest.hexdigest()
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    def hashed_name(self, name, content):
+        digest = content_hash(content)
+        extension = os.path.splitext(name)[1].lower()
+        return f'{HASHED_PREFIX}{digest[:2]}/{digest}{extension}'
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.hashed_name(name, content)
+        # Same name means same bytes: nothing to write
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length=max_length)
+
+    def delete(self, name):
+        # Shared by every row with the same content; see dedupe_media --prune
+        if not is_hashed(name):
+            super().delete(name)
+
+    def purge(self, name):
+        """Really remove a stored file."""
+        super().delete(name)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    ManifestStaticFilesStorage that also writes ``.gz`` (and, with the
+    brotli package installed, ``.br``) siblings of every compressible file
+    at collectstatic time, for backend.media to serve as-is.
+    """
+    compressible_extensions = ('.css', '.js', '.mjs', '.map', '.svg', '.json', '.txt', '.html', '.xml', '.ico')
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for name in set(paths) | set(self.hashed_files.values()):
+            self.compress(name)
+
+    def compress(self, name):
+        if not name.lower().endswith(self.compressible_extensions):
+            return
+        with self.open(name) as file:
+            data = file.read()
+        if len(data) < getattr(settings, 'COMPRESSION_MIN_SIZE', 512):
+            return
+        encoded = {'.gz': gzip.compress(data, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            encoded['.br'] = brotli.compress(data, quality=11)
+        for suffix, content in encoded.items():
+            if len(content) >= len(data):
+                continue
+            if self.exists(name + suffix):
+                self.delete(name + suffix)
+            self._save(name + suffix, ContentFile(content))
+
+
+def is_hashed_static(name):
+    """Whether ``name`` is a manifest-hashed file of the static files storage."""
+    hashed_files = getattr(staticfiles_storage, 'hashed_files', None) or {}
+    unhashed = HASHED_STATIC_SUFFIX.sub(r'\1', name)
+    return unhashed != name and hashed_files.get(unhashed) == name
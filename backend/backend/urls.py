@@ -14,12 +14,16 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+import re
+
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
-from django.conf.urls.static import static
 from django.http import JsonResponse
 
+from . import media
+from .storage import is_hashed_static
+
 def landing_view(request):
     """Simple landing response for security"""
     return JsonResponse({
@@ -36,12 +40,18 @@ urlpatterns = [
     path('api/colleges/', include('colleges.urls')),
 ]
 
-# Serve static and media files
-if settings.DEBUG:
-    urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
-else:
-    # For production, you can also serve static files through Django if needed
-    # (though it's better to use a web server like Nginx or Apache)
-    urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+# Serve static and media files. In production the web server normally
+# answers these itself; requests that reach Django are streamed or offloaded
+# by backend.media instead of being read into the worker.
+urlpatterns += [
+    re_path(
+        r'^%s(?P<path>.*)$' % re.escape(settings.MEDIA_URL.lstrip('/')),
+        media.serve, {'document_root': settings.MEDIA_ROOT}, name='media'
+    ),
+    re_path(
+        r'^%s(?P<path>.*)$' % re.escape(settings.STATIC_URL.lstrip('/')),
+        media.serve,
+        {'document_root': settings.STATIC_ROOT, 'immutable': is_hashed_static, 'precompressed': True},
+        name='static'
+    ),
+]
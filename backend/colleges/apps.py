@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class CollegesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'colleges'
+    
+    def ready(self):
+        from backend import images
+        images.register(self.get_model('College'), 'leader_image')
@@ -0,0 +1,49 @@
+"""
+values()-based rendering of the college directory.
+
+Produces the same data as CollegeSerializer for the default fieldset.
+"""
+from backend.fastpath import file_url, file_variants, group_rows
+from .models import College, Department
+
+COLLEGE_VALUES = ['id', 'name', 'leader_name', 'leader_image', 'leader_image_variants']
+DEPARTMENT_VALUES = ['id', 'college_id', 'name', 'leader_name', 'email', 'phone']
+
+
+def departments_by_college(college_ids):
+    # Same query shape (and so the same row order) as prefetch_related('departments')
+    rows = Department.objects.filter(college_id__in=college_ids).values(*DEPARTMENT_VALUES)
+    return group_rows(rows, 'college_id')
+
+
+def render_departments(departments):
+    # Mirrors DepartmentSerializer
+    return [
+        {
+            'id': department['id'],
+            'name': department['name'],
+            'leader_name': department['leader_name'],
+            'email': department['email'],
+            'phone': department['phone'],
+        }
+        for department in departments
+    ]
+
+
+def render_college(college, departments, request):
+    return {
+        'id': college['id'],
+        'name': college['name'],
+        'leader_name': college['leader_name'],
+        'leader_image': file_url(College, 'leader_image', college['leader_image'], request),
+        'leader_image_variants': file_variants(
+            College, 'leader_image', college['leader_image'], college['leader_image_variants'], request
+        ),
+        'departments': render_departments(departments.get(college['id'], [])),
+    }
+
+
+def render_colleges(rows, request):
+    rows = list(rows)
+    departments = departments_by_college([row['id'] for row in rows])
+    return [render_college(row, departments, request) for row in rows]
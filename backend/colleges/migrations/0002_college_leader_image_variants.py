@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-17 21:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('colleges', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='college',
+            name='leader_image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -5,6 +5,7 @@ class College(models.Model):
     name = models.CharField(max_length=255)
     leader_name = models.CharField(max_length=255)
     leader_image = models.ImageField(upload_to='college_leaders/', blank=True, null=True)
+    leader_image_variants = models.JSONField(default=dict, blank=True, editable=False)
     
     def __str__(self):
         return self.name
@@ -1,4 +1,6 @@
 from rest_framework import serializers
+from backend.images import ImageVariantsField
+from backend.sparse import SparseFieldsetMixin
 from .models import College, Department
 
 
@@ -8,12 +10,15 @@ class DepartmentSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'leader_name', 'email', 'phone']
 
 
-class CollegeSerializer(serializers.ModelSerializer):
+class CollegeSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     departments = DepartmentSerializer(many=True, read_only=True)
+    leader_image_variants = ImageVariantsField('leader_image')
+    
+    expandable_fields = ['departments']
     
     class Meta:
         model = College
-        fields = ['id', 'name', 'leader_name', 'leader_image', 'departments']
+        fields = ['id', 'name', 'leader_name', 'leader_image', 'leader_image_variants', 'departments']
 
 
 class CollegeCreateUpdateSerializer(serializers.ModelSerializer):
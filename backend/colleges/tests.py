@@ -1,3 +1,30 @@
+from unittest import mock
+
 from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from .models import College, Department
+from .views import CollegeListCreateView
+
+
+class CollegeFastPathTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        for i in range(3):
+            college = College.objects.create(
+                name=f'College {i}', leader_name='Dean', leader_image='colleges/dean.png' if i else None
+            )
+            for j in range(2):
+                Department.objects.create(
+                    college=college, name=f'Dept {j}', leader_name='Head',
+                    email=f'dept{i}{j}@example.com', phone='1'
+                )
 
-# Create your tests here.
+    def test_fast_path_matches_serializer_output(self):
+        url = reverse('college-list-create')
+        with self.assertNumQueries(3):
+            fast = self.client.get(url)
+        with mock.patch.object(CollegeListCreateView, 'fast_path', False):
+            slow = self.client.get(url)
+        self.assertEqual(fast.content, slow.content)
@@ -2,6 +2,10 @@ from rest_framework import generics, permissions, filters
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
+from django.db.models import Prefetch
+from backend.fastpath import list_response
+from backend.sparse import SparseFieldsets
+from .fastpath import COLLEGE_VALUES, render_colleges
 from .models import College, Department
 from .serializers import (
     CollegeSerializer, CollegeCreateUpdateSerializer,
@@ -9,12 +13,48 @@ from .serializers import (
 )
 
 
+# Serializer field -> model column, for QuerySet.only()
+COLLEGE_COLUMNS = {
+    'name': 'name',
+    'leader_name': 'leader_name',
+    'leader_image': 'leader_image',
+    'leader_image_variants': ('leader_image', 'leader_image_variants'),
+}
+
+
+def college_read_queryset(queryset, sparse):
+    # Prefetch departments only when they will be serialized
+    if sparse.expands('departments'):
+        queryset = queryset.prefetch_related('departments')
+    elif sparse.wants('departments'):
+        queryset = queryset.prefetch_related(
+            Prefetch('departments', queryset=Department.objects.only('id', 'college_id'))
+        )
+    if sparse.is_default:
+        return queryset
+    return queryset.only(*sparse.columns(COLLEGE_COLUMNS, always=['id', 'name']))
+
+
 class CollegeListCreateView(generics.ListCreateAPIView):
     queryset = College.objects.all()
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['name', 'leader_name']
     ordering_fields = ['name']
     ordering = ['name']
+    # Serve default-fieldset reads from values() rows instead of ModelSerializer
+    fast_path = True
+    
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.method != 'GET':
+            return queryset
+        return college_read_queryset(queryset, SparseFieldsets.from_request(self.request))
+    
+    def list(self, request, *args, **kwargs):
+        if not (self.fast_path and SparseFieldsets.from_request(request).is_default):
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        return list_response(self, queryset.values(*COLLEGE_VALUES), render_colleges)
     
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -30,6 +70,12 @@ class CollegeListCreateView(generics.ListCreateAPIView):
 class CollegeDetailView(generics.RetrieveUpdateDestroyAPIView):
     queryset = College.objects.all()
     
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.method != 'GET':
+            return queryset
+        return college_read_queryset(queryset, SparseFieldsets.from_request(self.request))
+    
     def get_serializer_class(self):
         if self.request.method in ['PUT', 'PATCH']:
             return CollegeCreateUpdateSerializer
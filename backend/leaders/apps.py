@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class LeadersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'leaders'
+    
+    def ready(self):
+        from backend import images
+        images.register(self.get_model('Leader'), 'image')
@@ -0,0 +1,60 @@
+"""
+values()-based rendering of the leader directory.
+
+Produces the same data as LeaderSerializer for the default fieldset.
+"""
+from backend.fastpath import file_url, file_variants, format_date, group_rows
+from colleges.fastpath import departments_by_college, render_college
+from .models import Leader, LeaderAchievement
+
+LEADER_VALUES = [
+    'id', 'name', 'position', 'department', 'description', 'email', 'phone',
+    'location', 'join_date', 'team_size', 'image', 'image_variants', 'is_cabinet',
+    'college_id', 'college__name', 'college__leader_name', 'college__leader_image',
+    'college__leader_image_variants',
+]
+
+
+def achievements_by_leader(leader_ids):
+    rows = LeaderAchievement.objects.filter(leader_id__in=leader_ids).values(
+        'id', 'leader_id', 'achievement', 'order'
+    )
+    return group_rows(rows, 'leader_id')
+
+
+def render_leaders(rows, request):
+    rows = list(rows)
+    achievements = achievements_by_leader([row['id'] for row in rows])
+    departments = departments_by_college({row['college_id'] for row in rows if row['college_id']})
+    data = []
+    for row in rows:
+        college = None
+        if row['college_id'] is not None:
+            college = render_college({
+                'id': row['college_id'],
+                'name': row['college__name'],
+                'leader_name': row['college__leader_name'],
+                'leader_image': row['college__leader_image'],
+                'leader_image_variants': row['college__leader_image_variants'],
+            }, departments, request)
+        data.append({
+            'id': row['id'],
+            'name': row['name'],
+            'position': row['position'],
+            'department': row['department'],
+            'description': row['description'],
+            'email': row['email'],
+            'phone': row['phone'],
+            'location': row['location'],
+            'join_date': format_date(row['join_date']),
+            'team_size': row['team_size'],
+            'image': file_url(Leader, 'image', row['image'], request),
+            'image_variants': file_variants(Leader, 'image', row['image'], row['image_variants'], request),
+            'is_cabinet': row['is_cabinet'],
+            'college': college,
+            'achievements': [
+                {'id': item['id'], 'achievement': item['achievement'], 'order': item['order']}
+                for item in achievements.get(row['id'], [])
+            ],
+        })
+    return data
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-17 21:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leaders', '0002_leader_college_leader_is_cabinet_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='leader',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -27,6 +27,7 @@ class Leader(models.Model):
     join_date = models.DateField(default=timezone.now)
     team_size = models.PositiveIntegerField(default=0)
     image = models.ImageField(upload_to='leaders/', blank=True, null=True)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     is_cabinet = models.BooleanField(default=True, help_text="Check if this leader is part of the main cabinet")
     
     def __str__(self):
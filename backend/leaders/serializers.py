@@ -1,5 +1,7 @@
 from rest_framework import serializers
 from .models import Leader, LeaderAchievement
+from backend.images import ImageVariantsField
+from backend.sparse import SparseFieldsetMixin
 from colleges.serializers import CollegeSerializer
 
 
@@ -9,16 +11,19 @@ class LeaderAchievementSerializer(serializers.ModelSerializer):
         fields = ['id', 'achievement', 'order']
 
 
-class LeaderSerializer(serializers.ModelSerializer):
+class LeaderSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     achievements = LeaderAchievementSerializer(many=True, read_only=True)
     college = CollegeSerializer(read_only=True)
+    image_variants = ImageVariantsField('image')
+    
+    expandable_fields = ['college', 'achievements']
     
     class Meta:
         model = Leader
         fields = [
             'id', 'name', 'position', 'department', 'description', 
             'email', 'phone', 'location', 'join_date', 'team_size', 
-            'image', 'is_cabinet', 'college', 'achievements'
+            'image', 'image_variants', 'is_cabinet', 'college', 'achievements'
         ]
 
 
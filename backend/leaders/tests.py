@@ -1,3 +1,48 @@
+from unittest import mock
+
 from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from colleges.models import College, Department
+from .models import Leader, LeaderAchievement
+from .views import LeaderListCreateView
+
+
+class LeaderSparseFieldsetTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        college = College.objects.create(name='Engineering', leader_name='Dean')
+        Department.objects.create(
+            college=college, name='Civil', leader_name='Head', email='civil@example.com', phone='1'
+        )
+        for i in range(4):
+            leader = Leader.objects.create(
+                name=f'Leader {i}', position='Minister', department='Affairs', college=college,
+                description='About', email=f'leader{i}@example.com', phone='1', location='Campus'
+            )
+            LeaderAchievement.objects.create(leader=leader, achievement='Did things')
+
+    def test_default_directory_has_constant_queries(self):
+        # count, leaders + college join, achievements, departments
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('leader-list-create'))
+        self.assertEqual(response.data['results'][0]['college']['departments'][0]['name'], 'Civil')
+
+    def test_sparse_request_skips_unrequested_relations(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('leader-list-create'), {'fields': 'id,name,college', 'expand': ''})
+        row = response.data['results'][0]
+        self.assertEqual(set(row), {'id', 'name', 'college'})
+        self.assertEqual(row['college'], College.objects.get().id)
 
-# Create your tests here.
+    def test_fast_path_matches_serializer_output(self):
+        Leader.objects.create(
+            name='Independent', position='Other', department='Affairs', description='About',
+            email='solo@example.com', phone='1', location='Campus', image='leaders/solo.png'
+        )
+        url = reverse('leader-list-create')
+        fast = self.client.get(url)
+        with mock.patch.object(LeaderListCreateView, 'fast_path', False):
+            slow = self.client.get(url)
+        self.assertEqual(fast.content, slow.content)
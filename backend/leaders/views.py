@@ -2,17 +2,68 @@ from rest_framework import generics, permissions, filters
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
-from .models import Leader
+from django.db.models import Prefetch
+from backend.fastpath import list_response
+from backend.sparse import SparseFieldsets
+from .models import Leader, LeaderAchievement
+from .fastpath import LEADER_VALUES, render_leaders
 from .serializers import LeaderSerializer, LeaderCreateUpdateSerializer
 
 
+# Serializer field -> model column, for QuerySet.only()
+LEADER_COLUMNS = {
+    'name': 'name',
+    'position': 'position',
+    'department': 'department',
+    'description': 'description',
+    'email': 'email',
+    'phone': 'phone',
+    'location': 'location',
+    'join_date': 'join_date',
+    'team_size': 'team_size',
+    'image': 'image',
+    'image_variants': ('image', 'image_variants'),
+    'is_cabinet': 'is_cabinet',
+    'college': 'college',
+}
+
+
+def leader_read_queryset(queryset, sparse):
+    # Join/prefetch only the relations that will be serialized
+    if sparse.expands('college'):
+        queryset = queryset.select_related('college').prefetch_related('college__departments')
+    if sparse.expands('achievements'):
+        queryset = queryset.prefetch_related('achievements')
+    elif sparse.wants('achievements'):
+        queryset = queryset.prefetch_related(
+            Prefetch('achievements', queryset=LeaderAchievement.objects.only('id', 'leader_id'))
+        )
+    if sparse.is_default:
+        return queryset
+    return queryset.only(*sparse.columns(LEADER_COLUMNS, always=['id']))
+
+
 class LeaderListCreateView(generics.ListCreateAPIView):
-    queryset = Leader.objects.all().select_related('college')
+    queryset = Leader.objects.all()
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['department', 'position', 'college', 'is_cabinet']
     search_fields = ['name', 'position', 'department', 'description']
     ordering_fields = ['name', 'join_date', 'team_size']
     ordering = ['name']
+    # Serve default-fieldset reads from values() rows instead of ModelSerializer
+    fast_path = True
+    
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.method != 'GET':
+            return queryset
+        return leader_read_queryset(queryset, SparseFieldsets.from_request(self.request))
+    
+    def list(self, request, *args, **kwargs):
+        if not (self.fast_path and SparseFieldsets.from_request(request).is_default):
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        return list_response(self, queryset.values(*LEADER_VALUES), render_leaders)
     
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -26,7 +77,13 @@ class LeaderListCreateView(generics.ListCreateAPIView):
 
 
 class LeaderDetailView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Leader.objects.all().select_related('college')
+    queryset = Leader.objects.all()
+    
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.method != 'GET':
+            return queryset
+        return leader_read_queryset(queryset, SparseFieldsets.from_request(self.request))
     
     def get_serializer_class(self):
         if self.request.method in ['PUT', 'PATCH']:
@@ -0,0 +1,242 @@
+"""
+Buffered UserActivity logging.
+
+Nothing reads an activity row in the request that produces it, so
+record() only queues the row once the surrounding transaction commits.
+Each worker process writes its queue with one bulk_create when it holds
+ACTIVITY_BUFFER_SIZE rows, when the oldest row is ACTIVITY_FLUSH_SECONDS
+old (checked as requests finish, with a timer for idle workers), and at
+exit, so a crash loses at most that window. Rows from a flush that
+fails transiently (e.g. SQLite busy) are spooled to JSON lines files in
+ACTIVITY_SPOOL_DIR and retried, file by file, by later flushes of any
+worker; a file whose worker died mid-retry, or has held it for
+ACTIVITY_SPOOL_CLAIM_SECONDS, is taken over by the next flush. Rows that can never be written (their user has been deleted, or
+the database rejects the row itself) are dropped with a warning rather
+than retried, so they cannot hold up the rest.
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from django.conf import settings
+from django.core.signals import request_finished
+from django.db import DatabaseError, OperationalError, connection, transaction
+from django.utils import timezone
+
+from .models import User, UserActivity
+
+logger = logging.getLogger(__name__)
+
+
+def buffer_size():
+    return getattr(settings, 'ACTIVITY_BUFFER_SIZE', 100)
+
+
+def flush_seconds():
+    return getattr(settings, 'ACTIVITY_FLUSH_SECONDS', 5)
+
+
+def spool_dir():
+    return getattr(settings, 'ACTIVITY_SPOOL_DIR', os.path.join(settings.BASE_DIR, 'activity_spool'))
+
+
+def spool_claim_seconds():
+    return getattr(settings, 'ACTIVITY_SPOOL_CLAIM_SECONDS', 300)
+
+
+class ActivityBuffer:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.rows = []
+        self.oldest = None
+        self.timer = None
+
+    def add(self, row):
+        with self.lock:
+            if not self.rows:
+                self.oldest = time.monotonic()
+                self.start_timer()
+            self.rows.append(row)
+            full = len(self.rows) >= buffer_size()
+        if full:
+            self.flush()
+
+    def start_timer(self):
+        # Flushes an idle worker's rows; runs on its own thread and connection
+        if self.timer is None and flush_seconds() > 0:
+            self.timer = threading.Timer(flush_seconds(), self.flush_from_timer)
+            self.timer.daemon = True
+            self.timer.start()
+
+    def flush_from_timer(self):
+        try:
+            self.flush()
+        finally:
+            connection.close()
+
+    def due(self):
+        with self.lock:
+            if not self.rows:
+                return False
+            if len(self.rows) >= buffer_size():
+                return True
+            # ACTIVITY_FLUSH_SECONDS = 0 turns the time threshold off
+            return flush_seconds() > 0 and time.monotonic() - self.oldest >= flush_seconds()
+
+    def take(self):
+        """The queued rows, emptying the queue."""
+        with self.lock:
+            rows = self.rows
+            self.rows, self.oldest = [], None
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+        return rows
+
+    def flush(self):
+        """Write the queued rows, then retry spooled ones; returns how many were written."""
+        written, retry = insert(self.take())
+        if retry:
+            write_spool(retry)
+
+        # Each spooled batch on its own, so one batch cannot hold up the others
+        for path in claim_spool():
+            batch_written, retry = insert(list(read_spool(path)))
+            written += batch_written
+            if retry:
+                write_spool(retry)
+            os.remove(path)
+        return written
+
+
+def insert(rows):
+    """Write rows; returns (number written, rows to retry later)."""
+    if not rows:
+        return 0, []
+    # A user deleted since the row was queued would fail the foreign key for the whole batch
+    user_ids = {row['user_id'] for row in rows}
+    existing = set(User.objects.filter(id__in=user_ids).values_list('id', flat=True))
+    if existing != user_ids:
+        logger.warning('Dropping activity rows of deleted users %s', sorted(user_ids - existing))
+        rows = [row for row in rows if row['user_id'] in existing]
+    try:
+        # A savepoint, so a failure cannot break a transaction the caller is in
+        with transaction.atomic():
+            UserActivity.objects.bulk_create(UserActivity(**row) for row in rows)
+        return len(rows), []
+    except OperationalError as error:
+        # Transient (locked, connection lost): the whole batch can succeed later
+        logger.warning('Spooling %d activity rows after a failed flush: %s', len(rows), error)
+        return 0, rows
+    except DatabaseError as error:
+        logger.warning('Writing %d activity rows one by one after a failed flush: %s', len(rows), error)
+
+    written = 0
+    for index, row in enumerate(rows):
+        try:
+            with transaction.atomic():
+                UserActivity.objects.create(**row)
+        except OperationalError:
+            return written, rows[index:]
+        except DatabaseError as error:
+            logger.warning('Dropping activity row %r: %s', row, error)
+            continue
+        written += 1
+    return written, []
+
+
+def write_spool(rows):
+    directory = spool_dir()
+    os.makedirs(directory, exist_ok=True)
+    name = os.path.join(directory, uuid.uuid4().hex)
+    with open(name + '.tmp', 'w') as spool:
+        for row in rows:
+            spool.write(json.dumps({**row, 'timestamp': row['timestamp'].isoformat()}) + '\n')
+        spool.flush()
+        os.fsync(spool.fileno())
+    # Visible to readers only once complete
+    os.replace(name + '.tmp', name + '.jsonl')
+
+
+def claim_spool():
+    """
+    Spool files this process now owns: new ones and abandoned claims.
+    Renaming to name.jsonl.<pid> makes each claim exclusive.
+    """
+    directory = spool_dir()
+    if not os.path.isdir(directory):
+        return []
+    claimed = []
+    for filename in os.listdir(directory):
+        name, extension, owner = filename.partition('.jsonl')
+        if not extension:
+            # Still being written
+            continue
+        path = os.path.join(directory, filename)
+        if owner and not abandoned(path, owner[1:]):
+            continue
+        target = os.path.join(directory, f'{name}.jsonl.{os.getpid()}')
+        try:
+            # Dates the claim, not the rows, for abandoned()
+            os.utime(path)
+            os.rename(path, target)
+        except FileNotFoundError:
+            # Claimed by another worker
+            continue
+        claimed.append(target)
+    return claimed
+
+
+def abandoned(path, owner):
+    """Whether a claimed spool file's worker has died or held it too long."""
+    try:
+        if time.time() - os.path.getmtime(path) >= spool_claim_seconds():
+            return True
+    except FileNotFoundError:
+        return False
+    if not owner.isdigit():
+        return False
+    try:
+        os.kill(int(owner), 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        # Alive, just not ours to signal
+        pass
+    return False
+
+
+def read_spool(path):
+    with open(path) as spool:
+        for line in spool:
+            row = json.loads(line)
+            row['timestamp'] = datetime.fromisoformat(row['timestamp'])
+            yield row
+
+
+buffer = ActivityBuffer()
+
+
+def record(user, type, title):
+    """Log an activity without writing it on the request path."""
+    row = {'user_id': user.pk, 'type': type, 'title': title, 'timestamp': timezone.now()}
+    # Dropped along with the action if its transaction rolls back
+    transaction.on_commit(lambda: buffer.add(row))
+
+
+def flush():
+    return buffer.flush()
+
+
+def flush_if_due(**kwargs):
+    if buffer.due():
+        buffer.flush()
+
+
+request_finished.connect(flush_if_due, dispatch_uid='users.activity.flush_if_due')
+atexit.register(flush)
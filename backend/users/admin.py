@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import User, UserActivity, UserNotification
+from .models import ArchivedUserActivity, BroadcastNotification, User, UserActivity, UserNotification
 
 
 @admin.register(User)
@@ -31,9 +31,23 @@ class UserActivityAdmin(admin.ModelAdmin):
     readonly_fields = ['timestamp']
 
 
+@admin.register(ArchivedUserActivity)
+class ArchivedUserActivityAdmin(admin.ModelAdmin):
+    list_display = ['user_id', 'type', 'title', 'timestamp']
+    list_filter = ['type']
+    search_fields = ['title']
+
+
 @admin.register(UserNotification)
 class UserNotificationAdmin(admin.ModelAdmin):
     list_display = ['user', 'title', 'read', 'timestamp']
     list_filter = ['read', 'timestamp']
     search_fields = ['user__email', 'title']
     readonly_fields = ['timestamp']
+
+
+@admin.register(BroadcastNotification)
+class BroadcastNotificationAdmin(admin.ModelAdmin):
+    list_display = ['title', 'timestamp']
+    search_fields = ['title']
+    readonly_fields = ['timestamp']
@@ -0,0 +1,52 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from users.models import ArchivedUserActivity, UserActivity
+
+ARCHIVED_FIELDS = ['id', 'user_id', 'type', 'title', 'timestamp']
+
+
+class Command(BaseCommand):
+    help = 'Move UserActivity rows older than the retention age into the archive table (run periodically, e.g. from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=getattr(settings, 'ACTIVITY_RETENTION_DAYS', 180),
+            help='Archive rows older than this many days'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows moved per transaction')
+        parser.add_argument('--pause', type=float, default=0.1, help='Seconds to sleep between batches')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the rows that would move')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        old = UserActivity.objects.filter(timestamp__lt=cutoff)
+        if options['dry_run']:
+            self.stdout.write(f'{old.count()} activity rows older than {options["days"]} days')
+            return
+
+        moved = 0
+        while True:
+            batch = self.archive_batch(old, options['batch_size'])
+            moved += batch
+            if batch < options['batch_size']:
+                break
+            # Short transactions with gaps between them, so writers never wait long for the lock
+            time.sleep(options['pause'])
+        self.stdout.write(self.style.SUCCESS(f'Archived {moved} activity rows older than {options["days"]} days'))
+
+    @transaction.atomic
+    def archive_batch(self, queryset, size):
+        # Oldest first by primary key, which follows insertion order
+        rows = list(queryset.order_by('id').values(*ARCHIVED_FIELDS)[:size])
+        if not rows:
+            return 0
+        # Ids are kept, so an archived row can be traced back to its activity
+        ArchivedUserActivity.objects.bulk_create(ArchivedUserActivity(**row) for row in rows)
+        UserActivity.objects.filter(id__in=[row['id'] for row in rows]).delete()
+        return len(rows)
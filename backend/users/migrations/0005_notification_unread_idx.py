@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-17 21:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_broadcast_notifications'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='usernotification',
+            index=models.Index(fields=['user', 'read'], name='notification_unread_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.6 on 2026-10-17 21:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0006_activity_timestamp_default'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedUserActivity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_id', models.BigIntegerField()),
+                ('type', models.CharField(choices=[('comment', 'Comment'), ('like', 'Like'), ('view', 'View'), ('post', 'Post')], max_length=10)),
+                ('title', models.CharField(max_length=255)),
+                ('timestamp', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name_plural': 'Archived user activities',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='useractivity',
+            index=models.Index(fields=['user', '-timestamp', '-id'], name='activity_timeline_idx'),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.db.models import Max
 from django.utils import timezone
 
 
@@ -23,13 +24,22 @@ class User(AbstractUser):
     join_date = models.DateField(default=get_current_date)
     bio = models.TextField(blank=True)
     avatar = models.ImageField(upload_to='avatars/', blank=True, null=True)
+    avatar_variants = models.JSONField(default=dict, blank=True, editable=False)
     role = models.CharField(max_length=10, choices=ROLE_CHOICES, default='user')
+    # Read cursor: broadcasts with an id up to this one count as read
+    broadcasts_seen_id = models.PositiveBigIntegerField(default=0, editable=False)
     
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name']
     
     def __str__(self):
         return f"{self.first_name} {self.last_name} ({self.email})"
+    
+    def save(self, *args, **kwargs):
+        if self._state.adding and not self.broadcasts_seen_id:
+            # New accounts start with every earlier broadcast already read
+            self.broadcasts_seen_id = BroadcastNotification.objects.aggregate(latest=Max('id'))['latest'] or 0
+        super().save(*args, **kwargs)
 
 
 class UserActivity(models.Model):
@@ -43,16 +53,39 @@ class UserActivity(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='activities')
     type = models.CharField(max_length=10, choices=ACTIVITY_TYPES)
     title = models.CharField(max_length=255)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Set when the activity happens, not when the buffered row is written
+    timestamp = models.DateTimeField(default=timezone.now, editable=False)
     
     class Meta:
         ordering = ['-timestamp']
         verbose_name_plural = 'User activities'
+        indexes = [
+            # Per-user timeline in keyset order; also serves ?type= filters
+            models.Index(fields=['user', '-timestamp', '-id'], name='activity_timeline_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.type} - {self.title}"
 
 
+class ArchivedUserActivity(models.Model):
+    """
+    UserActivity rows past the retention age, moved here by
+    archive_user_activity. No foreign key or secondary index, so the
+    archive costs nothing on the write path and keeps only what history needs.
+    """
+    user_id = models.BigIntegerField()
+    type = models.CharField(max_length=10, choices=UserActivity.ACTIVITY_TYPES)
+    title = models.CharField(max_length=255)
+    timestamp = models.DateTimeField()
+    
+    class Meta:
+        verbose_name_plural = 'Archived user activities'
+    
+    def __str__(self):
+        return f"{self.user_id} - {self.type} - {self.title}"
+
+
 class UserNotification(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
     title = models.CharField(max_length=255)
@@ -61,6 +94,25 @@ class UserNotification(models.Model):
     
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            # Unread counts and mark-all-read touch only this index
+            models.Index(fields=['user', 'read'], name='notification_unread_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.title}"
+
+
+class BroadcastNotification(models.Model):
+    """
+    A notification for every user, stored once. Whether a user has read it
+    comes from their broadcasts_seen_id cursor rather than a row per user.
+    """
+    title = models.CharField(max_length=255)
+    timestamp = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-timestamp']
+    
+    def __str__(self):
+        return self.title
@@ -0,0 +1,58 @@
+"""
+Personal and broadcast notifications.
+
+UserNotification holds one row per user per notification. Notifications
+meant for everyone are stored once as BroadcastNotification; a user has
+read every broadcast up to their broadcasts_seen_id cursor. The two are
+merged at read time into one list.
+"""
+from django.db.models import BooleanField, ExpressionWrapper, Max, Q, Value
+
+from .models import BroadcastNotification, User, UserNotification
+
+NOTIFICATION_FIELDS = ['id', 'title', 'timestamp', 'read', 'kind']
+
+
+def broadcast(title):
+    """Notify every user with a single insert."""
+    return BroadcastNotification.objects.create(title=title)
+
+
+def notifications_for(user):
+    """A user's personal and broadcast notifications as one values() queryset, newest first."""
+    personal = UserNotification.objects.filter(user=user).annotate(
+        kind=Value('personal')
+    ).values(*NOTIFICATION_FIELDS)
+    broadcasts = BroadcastNotification.objects.annotate(
+        read=ExpressionWrapper(Q(id__lte=user.broadcasts_seen_id), output_field=BooleanField()),
+        kind=Value('broadcast'),
+    ).values(*NOTIFICATION_FIELDS)
+    return personal.order_by().union(broadcasts.order_by(), all=True).order_by('-timestamp', '-id')
+
+
+def mark_broadcasts_read(user, up_to):
+    """Advance the user's cursor to ``up_to``; it never moves backwards."""
+    if up_to > user.broadcasts_seen_id:
+        User.objects.filter(pk=user.pk, broadcasts_seen_id__lt=up_to).update(broadcasts_seen_id=up_to)
+        user.broadcasts_seen_id = up_to
+
+
+def unread_count(user):
+    # Two index-only counts: (user, read) and a primary key range
+    personal = UserNotification.objects.filter(user=user, read=False).count()
+    broadcasts = BroadcastNotification.objects.filter(id__gt=user.broadcasts_seen_id).count()
+    return personal + broadcasts
+
+
+def mark_read(user, ids):
+    """Mark the given personal notifications read in one UPDATE; returns how many changed."""
+    return UserNotification.objects.filter(user=user, id__in=ids, read=False).update(read=True)
+
+
+def mark_all_read(user):
+    """One UPDATE for personal notifications, one to move the broadcast cursor."""
+    marked = UserNotification.objects.filter(user=user, read=False).update(read=True)
+    latest = BroadcastNotification.objects.aggregate(latest=Max('id'))['latest']
+    if latest:
+        mark_broadcasts_read(user, latest)
+    return marked
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from django.contrib.auth import authenticate
+from backend.images import ImageVariantsField
 from .models import User, UserActivity, UserNotification
 
 
@@ -7,13 +8,14 @@ class UserSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
     firstName = serializers.CharField(source='first_name', read_only=True)
     lastName = serializers.CharField(source='last_name', read_only=True)
+    avatar_variants = ImageVariantsField('avatar')
     
     class Meta:
         model = User
         fields = [
             'id', 'username', 'email', 'firstName', 'lastName', 'first_name', 'last_name',
             'phone', 'location', 'department', 'position', 'join_date', 
-            'bio', 'avatar', 'role', 'password'
+            'bio', 'avatar', 'avatar_variants', 'role', 'password'
         ]
         extra_kwargs = {
             'password': {'write_only': True},
@@ -32,13 +34,14 @@ class UserSerializer(serializers.ModelSerializer):
 class UserProfileSerializer(serializers.ModelSerializer):
     firstName = serializers.CharField(source='first_name')
     lastName = serializers.CharField(source='last_name')
+    avatar_variants = ImageVariantsField('avatar')
     
     class Meta:
         model = User
         fields = [
             'id', 'username', 'email', 'firstName', 'lastName', 
             'phone', 'location', 'department', 'position', 'join_date', 
-            'bio', 'avatar', 'role'
+            'bio', 'avatar', 'avatar_variants', 'role'
         ]
         read_only_fields = ['id', 'username', 'email']
 
@@ -50,9 +53,12 @@ class UserActivitySerializer(serializers.ModelSerializer):
 
 
 class UserNotificationSerializer(serializers.ModelSerializer):
+    # 'broadcast' for notifications sent to every user
+    kind = serializers.CharField(default='personal', read_only=True)
+    
     class Meta:
         model = UserNotification
-        fields = ['id', 'title', 'timestamp', 'read']
+        fields = ['id', 'title', 'timestamp', 'read', 'kind']
 
 
 class LoginSerializer(serializers.Serializer):
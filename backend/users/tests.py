@@ -1,3 +1,339 @@
-from django.test import TestCase
+import logging
+import os
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.management import call_command
+from django.db import DataError, OperationalError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from announcements.models import Announcement
+from . import activity
+from .models import ArchivedUserActivity, BroadcastNotification, User, UserActivity, UserNotification
+from .notifications import broadcast
+
+
+class BroadcastNotificationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='student', email='student@example.com', password='secret123',
+            first_name='Sam', last_name='Student'
+        )
+        self.client.force_authenticate(self.user)
+
+    def notifications(self):
+        response = self.client.get(reverse('notifications'))
+        self.assertEqual(response.status_code, 200)
+        return response.data['results']
+
+    def test_broadcast_is_one_row_for_every_user(self):
+        for i in range(5):
+            User.objects.create_user(
+                username=f'user{i}', email=f'user{i}@example.com', password='secret123',
+                first_name='U', last_name=str(i)
+            )
+        with CaptureQueriesContext(connection) as queries:
+            broadcast('Exams start Monday')
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(self.notifications()[0]['title'], 'Exams start Monday')
+
+    def test_personal_and_broadcast_notifications_are_merged(self):
+        UserNotification.objects.create(user=self.user, title='Your comment got a reply')
+        broadcast('Campus closed')
+        UserNotification.objects.create(user=self.user, title='Welcome', read=True)
+
+        rows = self.notifications()
+        self.assertEqual(
+            [(row['title'], row['kind'], row['read']) for row in rows],
+            [('Welcome', 'personal', True), ('Campus closed', 'broadcast', False),
+             ('Your comment got a reply', 'personal', False)]
+        )
+
+    def test_marking_a_broadcast_read_advances_the_cursor(self):
+        first, second, third = (broadcast(f'Notice {i}') for i in range(3))
+        response = self.client.post(reverse('mark_broadcast_read', args=[second.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            {row['title']: row['read'] for row in self.notifications()},
+            {'Notice 0': True, 'Notice 1': True, 'Notice 2': False}
+        )
+        # Never moves backwards
+        self.client.post(reverse('mark_broadcast_read', args=[first.id]))
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.broadcasts_seen_id, second.id)
+        self.assertEqual(self.client.post(reverse('mark_broadcast_read', args=[third.id + 1])).status_code, 404)
+
+    def test_new_users_start_with_earlier_broadcasts_read(self):
+        broadcast('Before you joined')
+        newcomer = User.objects.create_user(
+            username='new', email='new@example.com', password='secret123',
+            first_name='New', last_name='Comer'
+        )
+        self.client.force_authenticate(newcomer)
+        self.assertEqual([row['read'] for row in self.notifications()], [True])
+
+    def test_publishing_an_announcement_broadcasts_once(self):
+        announcement = Announcement.objects.create(
+            title='Elections', description='Body', author=self.user, is_published=False
+        )
+        self.assertFalse(BroadcastNotification.objects.exists())
+        announcement.is_published = True
+        announcement.save()
+        announcement.save()
+        self.assertEqual(list(BroadcastNotification.objects.values_list('title', flat=True)), ['New announcement: Elections'])
+
+
+class UnreadNotificationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='student', email='student@example.com', password='secret123',
+            first_name='Sam', last_name='Student'
+        )
+        self.other = User.objects.create_user(
+            username='other', email='other@example.com', password='secret123',
+            first_name='Oli', last_name='Other'
+        )
+        self.client.force_authenticate(self.user)
+        self.mine = UserNotification.objects.bulk_create(
+            UserNotification(user=self.user, title=f'Note {i}') for i in range(5)
+        )
+        UserNotification.objects.create(user=self.other, title='Not mine')
+        broadcast('Everyone')
+
+    def unread(self):
+        return self.client.get(reverse('notification_unread_count')).data['unread']
+
+    def test_unread_count_includes_broadcasts(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.unread(), 6)
+        # One count per table
+        self.assertEqual(len(queries), 2)
+
+    def test_mark_listed_ids_in_one_update(self):
+        ids = [self.mine[0].id, self.mine[1].id, UserNotification.objects.get(user=self.other).id]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('mark_notifications_read'), {'ids': ids}, format='json')
+        self.assertEqual(response.data['marked'], 2)
+        self.assertEqual(response.data['unread'], 4)
+        self.assertEqual(sum(query['sql'].startswith('UPDATE') for query in queries), 1)
+        self.assertFalse(UserNotification.objects.get(user=self.other).read)
+
+        response = self.client.post(reverse('mark_notifications_read') + f'?ids={self.mine[2].id}')
+        self.assertEqual(response.data['marked'], 1)
+        self.assertEqual(self.client.post(reverse('mark_notifications_read') + '?ids=1,x').status_code, 400)
+
+    def test_non_object_body_is_rejected(self):
+        response = self.client.post(reverse('mark_notifications_read'), [self.mine[0].id], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(UserNotification.objects.filter(read=True).count(), 0)
+
+    def test_mark_all_read(self):
+        response = self.client.post(reverse('mark_notifications_read'))
+        self.assertEqual(response.data['marked'], 5)
+        self.assertEqual(response.data['unread'], 0)
+        self.assertEqual(UserNotification.objects.filter(read=False).count(), 1)
+
+    def test_mark_single_notification_read(self):
+        url = reverse('mark_notification_read', args=[self.mine[0].id])
+        self.assertEqual(self.client.post(url).status_code, 200)
+        self.assertEqual(self.unread(), 5)
+        other = UserNotification.objects.get(user=self.other)
+        self.assertEqual(self.client.post(reverse('mark_notification_read', args=[other.id])).status_code, 404)
+
+
+@override_settings(ACTIVITY_BUFFER_SIZE=3, ACTIVITY_FLUSH_SECONDS=0)
+class ActivityBufferTests(TestCase):
+    def setUp(self):
+        self.spool = tempfile.mkdtemp()
+        self.settings_override = override_settings(ACTIVITY_SPOOL_DIR=self.spool)
+        self.settings_override.enable()
+        self.user = User.objects.create_user(
+            username='student', email='student@example.com', password='secret123',
+            first_name='Sam', last_name='Student'
+        )
+        activity.buffer.take()
+        # Failed flushes are expected here; keep their warnings out of the output
+        logger = logging.getLogger('users.activity')
+        self.addCleanup(logger.setLevel, logger.level)
+        logger.setLevel(logging.ERROR)
+
+    def tearDown(self):
+        activity.buffer.take()
+        self.settings_override.disable()
+        shutil.rmtree(self.spool, ignore_errors=True)
+
+    def record(self, count):
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(count):
+                activity.record(self.user, 'view', f'Viewed {i}')
+
+    def test_rows_are_written_in_one_batch_at_the_size_threshold(self):
+        self.record(2)
+        self.assertFalse(UserActivity.objects.exists())
+        with CaptureQueriesContext(connection) as queries:
+            self.record(1)
+        # The deleted-user check, then one INSERT for the batch
+        self.assertEqual(
+            [query['sql'].split()[0] for query in queries if 'SAVEPOINT' not in query['sql']], ['SELECT', 'INSERT']
+        )
+        self.assertEqual(UserActivity.objects.filter(user=self.user).count(), 3)
+
+    def test_rolled_back_actions_are_not_recorded(self):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            activity.record(self.user, 'view', 'Never committed')
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(activity.flush(), 0)
+
+    def test_flush_when_the_oldest_row_is_due(self):
+        self.record(1)
+        with override_settings(ACTIVITY_FLUSH_SECONDS=5):
+            activity.flush_if_due()
+            self.assertFalse(UserActivity.objects.exists())
+            with mock.patch('users.activity.time.monotonic', return_value=activity.buffer.oldest + 5):
+                activity.flush_if_due()
+        self.assertEqual(UserActivity.objects.get().title, 'Viewed 0')
+
+    def test_failed_flush_is_spooled_and_retried(self):
+        self.record(2)
+        recorded_at = activity.buffer.rows[0]['timestamp']
+        with mock.patch.object(UserActivity.objects, 'bulk_create', side_effect=OperationalError('locked')):
+            self.assertEqual(activity.flush(), 0)
+        self.assertEqual(len(os.listdir(self.spool)), 1)
+
+        self.assertEqual(activity.flush(), 2)
+        self.assertEqual(os.listdir(self.spool), [])
+        self.assertEqual(UserActivity.objects.order_by('title').first().timestamp, recorded_at)
+
+    def test_rows_of_deleted_users_do_not_block_later_flushes(self):
+        gone = User.objects.create_user(
+            username='gone', email='gone@example.com', password='secret123',
+            first_name='Gone', last_name='User'
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            activity.record(gone, 'view', 'Orphaned')
+            activity.record(self.user, 'view', 'Kept')
+        gone.delete()
+        self.assertEqual(activity.flush(), 1)
+        self.record(1)
+        self.assertEqual(activity.flush(), 1)
+        self.assertEqual(sorted(UserActivity.objects.values_list('title', flat=True)), ['Kept', 'Viewed 0'])
+        self.assertEqual(os.listdir(self.spool), [])
+
+    def test_spooled_batches_are_retried_separately(self):
+        self.record(1)
+        with mock.patch.object(UserActivity.objects, 'bulk_create', side_effect=OperationalError('locked')):
+            activity.flush()
+        # A spooled batch that can never be written as a whole
+        activity.write_spool([
+            {'user_id': self.user.id, 'type': 'view', 'title': 'x' * 300, 'timestamp': timezone.now()},
+        ])
+        real_bulk_create = UserActivity.objects.bulk_create
+
+        def reject_long_titles(objs):
+            objs = list(objs)
+            if any(len(obj.title) > 255 for obj in objs):
+                raise DataError('value too long')
+            return real_bulk_create(objs)
+
+        with mock.patch.object(UserActivity.objects, 'bulk_create', side_effect=reject_long_titles), \
+                mock.patch.object(UserActivity.objects, 'create', side_effect=DataError('value too long')):
+            self.record(1)
+            self.assertEqual(activity.flush(), 2)
+        self.assertEqual(sorted(UserActivity.objects.values_list('title', flat=True)), ['Viewed 0', 'Viewed 0'])
+        self.assertEqual(os.listdir(self.spool), [])
+
+    def spool_claimed_by(self, owner, age=0):
+        activity.write_spool([{'user_id': self.user.id, 'type': 'view', 'title': owner, 'timestamp': timezone.now()}])
+        [filename] = [name for name in os.listdir(self.spool) if name.endswith('.jsonl')]
+        path = os.path.join(self.spool, f'{filename}.{owner}')
+        os.rename(os.path.join(self.spool, filename), path)
+        stamp = time.time() - age
+        os.utime(path, (stamp, stamp))
+
+    def test_claims_of_dead_workers_are_taken_over(self):
+        self.spool_claimed_by('4000001')
+        with mock.patch('users.activity.os.kill', side_effect=ProcessLookupError):
+            self.assertEqual(activity.flush(), 1)
+        self.assertEqual(os.listdir(self.spool), [])
+
+    @override_settings(ACTIVITY_SPOOL_CLAIM_SECONDS=60)
+    def test_only_stale_claims_of_live_workers_are_taken_over(self):
+        self.spool_claimed_by(str(os.getpid()))
+        self.assertEqual(activity.flush(), 0)
+        self.assertEqual(len(os.listdir(self.spool)), 1)
+        self.spool_claimed_by(str(os.getpid()), age=60)
+        self.assertEqual(activity.flush(), 1)
+        self.assertEqual(len(os.listdir(self.spool)), 1)
+
+    def test_likes_do_not_write_activity_on_the_request(self):
+        announcement = Announcement.objects.create(title='Elections', description='Body', author=self.user)
+        client = APIClient()
+        client.force_authenticate(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.post(reverse('toggle-like', args=[announcement.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(UserActivity.objects.exists())
+        activity.flush()
+        self.assertEqual(UserActivity.objects.get().title, 'Liked: Elections')
+
+
+class ActivityTimelineTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='student', email='student@example.com', password='secret123',
+            first_name='Sam', last_name='Student'
+        )
+        self.client.force_authenticate(self.user)
+        now = timezone.now()
+        UserActivity.objects.bulk_create(
+            UserActivity(
+                user=self.user, type='like' if i % 3 else 'comment', title=f'Activity {i}',
+                timestamp=now - timedelta(days=i)
+            )
+            for i in range(25)
+        )
+
+    def test_page_numbers_by_default(self):
+        response = self.client.get(reverse('activities'))
+        self.assertEqual(response.data['count'], 25)
+        self.assertIsNone(response.data['previous'])
+        self.assertEqual(self.client.get(response.data['next']).data['results'][0]['title'], 'Activity 10')
+
+    def test_cursor_pages_without_count(self):
+        url = reverse('activities') + '?paginate=cursor'
+        titles = []
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertFalse(any('COUNT(' in query['sql'] for query in queries))
+            self.assertNotIn('count', response.data)
+            titles += [row['title'] for row in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(titles, [f'Activity {i}' for i in range(25)])
+
+    def test_type_filter(self):
+        response = self.client.get(reverse('activities') + '?type=comment')
+        self.assertEqual([row['title'] for row in response.data['results']], [f'Activity {i}' for i in range(0, 25, 3)])
+
+    def test_archive_moves_old_rows_in_batches(self):
+        out = StringIO()
+        call_command('archive_user_activity', days=10, batch_size=4, pause=0, stdout=out)
+        self.assertIn('Archived 15', out.getvalue())
+        self.assertEqual(UserActivity.objects.count(), 10)
+        self.assertEqual(ArchivedUserActivity.objects.count(), 15)
+        archived = ArchivedUserActivity.objects.get(title='Activity 23')
+        self.assertEqual((archived.user_id, archived.type), (self.user.id, 'like'))
+
+        call_command('archive_user_activity', days=10, stdout=out)
+        self.assertEqual(ArchivedUserActivity.objects.count(), 15)
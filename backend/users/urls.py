@@ -8,5 +8,8 @@ urlpatterns = [
     path('profile/', views.UserProfileView.as_view(), name='profile'),
     path('activities/', views.UserActivityListView.as_view(), name='activities'),
     path('notifications/', views.UserNotificationListView.as_view(), name='notifications'),
+    path('notifications/unread-count/', views.notification_unread_count, name='notification_unread_count'),
+    path('notifications/mark-read/', views.mark_notifications_read, name='mark_notifications_read'),
     path('notifications/<int:notification_id>/read/', views.mark_notification_read, name='mark_notification_read'),
+    path('notifications/broadcasts/<int:notification_id>/read/', views.mark_broadcast_read, name='mark_broadcast_read'),
 ]
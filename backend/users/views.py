@@ -4,7 +4,9 @@ from rest_framework.response import Response
 from rest_framework.authtoken.models import Token
 from django.contrib.auth import login, logout
 from django.contrib.auth.decorators import login_required
-from .models import User, UserActivity, UserNotification
+from announcements.pagination import KeysetPagination
+from .models import BroadcastNotification, User, UserActivity, UserNotification
+from .notifications import mark_all_read, mark_broadcasts_read, mark_read, notifications_for, unread_count
 from .serializers import (
     UserSerializer, UserProfileSerializer, UserActivitySerializer,
     UserNotificationSerializer, LoginSerializer, RegisterSerializer
@@ -86,6 +88,9 @@ class UserProfileView(generics.RetrieveUpdateAPIView):
 class UserActivityListView(generics.ListCreateAPIView):
     serializer_class = UserActivitySerializer
     permission_classes = [permissions.IsAuthenticated]
+    # Long histories can page with ?paginate=cursor, skipping the COUNT(*) and OFFSET
+    pagination_class = KeysetPagination
+    filterset_fields = ['type']
     
     def get_queryset(self):
         return UserActivity.objects.filter(user=self.request.user)
@@ -99,25 +104,79 @@ class UserNotificationListView(generics.ListAPIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        return UserNotification.objects.filter(user=self.request.user)
+        # Personal rows merged with broadcasts, read state from the user's cursor
+        return notifications_for(self.request.user)
 
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def mark_notification_read(request, notification_id):
-    try:
-        notification = UserNotification.objects.get(
-            id=notification_id, 
-            user=request.user
-        )
-        notification.read = True
-        notification.save()
+    # A single UPDATE; no fetch and save
+    updated = UserNotification.objects.filter(id=notification_id, user=request.user).update(read=True)
+    if not updated:
         return Response({
-            'success': True,
-            'message': 'Notification marked as read'
-        })
-    except UserNotification.DoesNotExist:
+            'success': False,
+            'message': 'Notification not found'
+        }, status=status.HTTP_404_NOT_FOUND)
+    return Response({
+        'success': True,
+        'message': 'Notification marked as read'
+    })
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def mark_broadcast_read(request, notification_id):
+    # One cursor per user: this broadcast and every earlier one become read
+    if not BroadcastNotification.objects.filter(id=notification_id).exists():
         return Response({
             'success': False,
             'message': 'Notification not found'
         }, status=status.HTTP_404_NOT_FOUND)
+    mark_broadcasts_read(request.user, notification_id)
+    return Response({
+        'success': True,
+        'message': 'Notification marked as read'
+    })
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def notification_unread_count(request):
+    return Response({'unread': unread_count(request.user)})
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def mark_notifications_read(request):
+    """
+    Mark personal notifications read in one statement: those listed in
+    ``ids`` (request body list or comma-separated query parameter), or all
+    of them, broadcasts included, when no ids are given.
+    """
+    if not hasattr(request.data, 'get'):
+        # e.g. a bare JSON array, which must not fall through to "mark all"
+        return Response({
+            'success': False,
+            'message': 'Expected an object with an ids list'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    ids = request.data.get('ids')
+    if ids is None and request.query_params.get('ids'):
+        ids = request.query_params['ids'].split(',')
+    if ids is None:
+        marked = mark_all_read(request.user)
+    else:
+        if isinstance(ids, (str, int)):
+            ids = str(ids).split(',')
+        ids = [str(value).strip() for value in ids]
+        if not all(value.isdigit() for value in ids):
+            return Response({
+                'success': False,
+                'message': 'ids must be notification ids'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        marked = mark_read(request.user, ids)
+    return Response({
+        'success': True,
+        'marked': marked,
+        'unread': unread_count(request.user)
+    })
@@ -27,9 +27,16 @@ interface Announcement {
   likes: number;
   comments: Comment[];
   media?: string;
+  media_variants?: Record<string, Record<string, string>>;
   avatar?: string;
 }
 
+const toSrcSet = (variants?: Record<string, string>) =>
+  variants ? Object.entries(variants).map(([width, url]) => `${url} ${width}`).join(', ') : undefined;
+
+// Cards are full width on mobile and a third of the grid on desktop
+const CARD_SIZES = '(min-width: 1024px) 33vw, (min-width: 768px) 50vw, 100vw';
+
 interface SimpleAnnouncementCardProps {
   announcement: Announcement;
 }
@@ -45,11 +52,19 @@ const SimpleAnnouncementCard = ({ announcement }: SimpleAnnouncementCardProps) =
         {/* Image */}
         <div className="aspect-video bg-muted rounded-t-lg overflow-hidden">
           {announcement.media ? (
-            <img
-              src={announcement.media}
-              alt={announcement.title}
-              className="w-full h-full object-cover group-hover:scale-105 transition-smooth"
-            />
+            <picture>
+              {announcement.media_variants?.webp && (
+                <source type="image/webp" srcSet={toSrcSet(announcement.media_variants.webp)} sizes={CARD_SIZES} />
+              )}
+              <img
+                src={announcement.media}
+                srcSet={toSrcSet(announcement.media_variants?.jpeg)}
+                sizes={CARD_SIZES}
+                alt={announcement.title}
+                loading="lazy"
+                className="w-full h-full object-cover group-hover:scale-105 transition-smooth"
+              />
+            </picture>
           ) : (
             <div className="w-full h-full bg-gradient-to-br from-primary/20 to-secondary/20 flex items-center justify-center">
               <span className="text-muted-foreground text-sm">No Image</span>
@@ -32,6 +32,8 @@ export interface Announcement {
   comments: Comment[];
   comments_count?: number;
   media?: string;
+  // Resized copies of media by format, keyed by srcset width descriptor ("320w")
+  media_variants?: Record<string, Record<string, string>>;
   avatar?: string;
   content?: string; // Full content for detail view
   excerpt?: string; // Short excerpt
@@ -28,6 +28,8 @@ export interface UserNotification {
   title: string;
   timestamp: string;
   read: boolean;
+  // 'broadcast' notifications go to every user and share one id sequence
+  kind?: 'personal' | 'broadcast';
 }
 
 // Mock current user profile data
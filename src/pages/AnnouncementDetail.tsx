@@ -72,8 +72,9 @@ const AnnouncementDetail = () => {
     if (!announcement) return;
 
     try {
-      // Call backend API directly to toggle like
-      const response = await httpClient.post(API_ENDPOINTS.ANNOUNCEMENTS.LIKE(announcement.id));
+      // POST likes, DELETE unlikes
+      const likeUrl = API_ENDPOINTS.ANNOUNCEMENTS.LIKE(announcement.id);
+      const response = isLiked ? await httpClient.delete(likeUrl) : await httpClient.post(likeUrl);
       
       // Update local state
       const newLikedState = !isLiked;
@@ -358,7 +358,7 @@ const Profile = () => {
                 <CardContent>
                   <div className="space-y-3">
                     {notifications.slice(0, 3).map((notification) => (
-                      <div key={notification.id} className="space-y-1">
+                      <div key={`${notification.kind ?? 'personal'}-${notification.id}`} className="space-y-1">
                         <p className="text-sm font-medium">{notification.title}</p>
                         <p className="text-xs text-muted-foreground">
                           {new Date(notification.timestamp).toLocaleDateString()}
@@ -36,6 +36,29 @@ export interface Hashtag {
   usage_count: number;
 }
 
+export type AnnouncementEventName =
+  | 'announcement.created'
+  | 'announcement.removed'
+  | 'announcement.pinned'
+  | 'likes'
+  | 'comments'
+  | 'reset';
+
+// Live feed updates over Server-Sent Events; returns a function that closes the stream.
+// On 'reset' the client missed events and should refetch the feed.
+export const subscribeToAnnouncementEvents = (
+  onEvent: (name: AnnouncementEventName, data: any) => void
+): (() => void) => {
+  const source = new EventSource(API_ENDPOINTS.ANNOUNCEMENTS.EVENTS);
+  const names: AnnouncementEventName[] = [
+    'announcement.created', 'announcement.removed', 'announcement.pinned', 'likes', 'comments', 'reset',
+  ];
+  names.forEach((name) => {
+    source.addEventListener(name, (event) => onEvent(name, JSON.parse((event as MessageEvent).data)));
+  });
+  return () => source.close();
+};
+
 export const announcementsService = {
   // Get all categories
   getCategories: async (): Promise<ApiResponse<Category[]>> => {
@@ -136,9 +159,10 @@ export const announcementsService = {
   },
 
   // Toggle like on an announcement
-  toggleLike: async (announcementId: string): Promise<ApiResponse<any>> => {
+  toggleLike: async (announcementId: string, liked: boolean): Promise<ApiResponse<any>> => {
     try {
-      const response = await httpClient.post(API_ENDPOINTS.ANNOUNCEMENTS.LIKE(announcementId));
+      const url = API_ENDPOINTS.ANNOUNCEMENTS.LIKE(announcementId);
+      const response = liked ? await httpClient.delete(url) : await httpClient.post(url);
       return {
         success: true,
         data: response,
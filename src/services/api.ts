@@ -12,6 +12,8 @@ export const API_ENDPOINTS = {
     PROFILE: `${API_BASE_URL}/auth/profile/`,
     ACTIVITIES: `${API_BASE_URL}/auth/activities/`,
     NOTIFICATIONS: `${API_BASE_URL}/auth/notifications/`,
+    NOTIFICATIONS_UNREAD_COUNT: `${API_BASE_URL}/auth/notifications/unread-count/`,
+    NOTIFICATIONS_MARK_READ: `${API_BASE_URL}/auth/notifications/mark-read/`,
   },
   
   // Announcements endpoints
@@ -21,6 +23,8 @@ export const API_ENDPOINTS = {
     COMMENTS: (id: string) => `${API_BASE_URL}/announcements/${id}/comments/`,
     LIKE: (id: string) => `${API_BASE_URL}/announcements/${id}/like/`,
     STATS: `${API_BASE_URL}/announcements/stats/`,
+    CHANGES: `${API_BASE_URL}/announcements/changes/`,
+    EVENTS: `${API_BASE_URL}/announcements/events/`,
     CATEGORIES: `${API_BASE_URL}/announcements/categories/`,
     HASHTAGS: `${API_BASE_URL}/announcements/hashtags/`,
   },
@@ -1,5 +1,5 @@
 // Service exports
-export { announcementsService } from './announcementsService';
+export { announcementsService, subscribeToAnnouncementEvents } from './announcementsService';
 export { authService } from './authService';
 export { leadersService } from './leadersService';
 export { collegesService } from './collegesService';
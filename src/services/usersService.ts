@@ -128,9 +128,13 @@ export const usersService = {
   },
 
   // Mark notification as read
-  markNotificationRead: async (notificationId: string): Promise<ApiResponse<boolean>> => {
+  markNotificationRead: async (
+    notificationId: string,
+    kind: UserNotification['kind'] = 'personal'
+  ): Promise<ApiResponse<boolean>> => {
     try {
-      await httpClient.post(`${API_ENDPOINTS.AUTH.NOTIFICATIONS}${notificationId}/read/`);
+      const prefix = kind === 'broadcast' ? 'broadcasts/' : '';
+      await httpClient.post(`${API_ENDPOINTS.AUTH.NOTIFICATIONS}${prefix}${notificationId}/read/`);
       return {
         success: true,
         data: true,
@@ -144,6 +148,39 @@ export const usersService = {
     }
   },
 
+  // Unread notifications, for the navbar badge
+  getUnreadNotificationCount: async (): Promise<ApiResponse<number>> => {
+    try {
+      const response = await httpClient.get(API_ENDPOINTS.AUTH.NOTIFICATIONS_UNREAD_COUNT);
+      return {
+        success: true,
+        data: response.unread,
+      };
+    } catch (error) {
+      return {
+        success: false,
+        error: 'Failed to fetch unread notification count',
+      };
+    }
+  },
+
+  // Mark the given notifications read, or all of them when no ids are given
+  markNotificationsRead: async (ids?: string[]): Promise<ApiResponse<number>> => {
+    try {
+      const response = await httpClient.post(API_ENDPOINTS.AUTH.NOTIFICATIONS_MARK_READ, ids ? { ids } : {});
+      return {
+        success: true,
+        data: response.unread,
+        message: 'Notifications marked as read',
+      };
+    } catch (error) {
+      return {
+        success: false,
+        error: 'Failed to mark notifications as read',
+      };
+    }
+  },
+
   // Upload avatar
   uploadAvatar: async (file: File): Promise<ApiResponse<User>> => {
     try {